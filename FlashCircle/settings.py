@@ -41,6 +41,7 @@ INSTALLED_APPS = [
     'drf_spectacular_sidecar',
     'rest_framework',
     'rest_framework.authtoken',
+    'middleware',
     'user',
     'advertisement',
     'categories',
@@ -58,6 +59,7 @@ INSTALLED_APPS = [
     'tasks',
     'comments',
     'rating',
+    'search',
     'corsheaders',
 ]
 
@@ -65,6 +67,7 @@ AUTH_USER_MODEL = 'user.User'
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'middleware.profiling.QueryProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -188,8 +191,105 @@ USE_TZ = True
 SESSION_COOKIE_AGE = 14400  # 4小时（秒）
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True  # 关闭浏览器时清除会话
 SESSION_SAVE_EVERY_REQUEST = True  # 每次请求都保存会话
+# 接口认证配置：default 保持原有行为；production 下 /api/ 接口只使用 Token 认证，
+# 不读取也不保存会话，会话只给后台管理（/api/admin/）使用，存储改为 cached_db 或 signed_cookies
+API_AUTH_PROFILE = os.getenv('API_AUTH_PROFILE', 'default')
+SESSION_SKIP_PATH_PREFIXES = ('/api/',)
+SESSION_KEEP_PATH_PREFIXES = ('/api/admin/',)
+if API_AUTH_PROFILE == 'production':
+    MIDDLEWARE = [
+        'middleware.session.ApiAwareSessionMiddleware'
+        if item == 'django.contrib.sessions.middleware.SessionMiddleware' else item
+        for item in MIDDLEWARE
+    ]
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'] = [
+        item for item in REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES']
+        if item != 'rest_framework.authentication.SessionAuthentication'
+    ]
+    SESSION_ENGINE = os.getenv('ADMIN_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+    SESSION_SAVE_EVERY_REQUEST = False
 # Token过期配置（如果使用自定义认证类）
 TOKEN_EXPIRE_AFTER_HOURS = 4
+# Token认证缓存配置
+TOKEN_CACHE_ENABLED = os.getenv('TOKEN_CACHE_ENABLED', 'true').lower() == 'true'
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', 60))  # 进程内缓存秒数，也是多进程下禁用用户的最长生效延迟
+TOKEN_CACHE_MAX_SIZE = int(os.getenv('TOKEN_CACHE_MAX_SIZE', 10000))  # 进程内最多缓存的token数
+TOKEN_CACHE_USE_DJANGO_CACHE = os.getenv('TOKEN_CACHE_USE_DJANGO_CACHE', 'false').lower() == 'true'  # 是否同时写入Django缓存
+# 接口SQL统计配置（/api/profiling/ 查看，仅管理员）
+QUERY_PROFILING_ENABLED = os.getenv('QUERY_PROFILING_ENABLED', 'true').lower() == 'true'
+QUERY_PROFILING_N_PLUS_ONE_THRESHOLD = int(os.getenv('QUERY_PROFILING_N_PLUS_ONE_THRESHOLD', 5))  # 同结构SQL重复次数达到该值记为N+1
+QUERY_PROFILING_LOG_INTERVAL = int(os.getenv('QUERY_PROFILING_LOG_INTERVAL', 60))  # 汇总日志输出间隔（秒）
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'middleware': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+# 分页总数配置（?total=estimate 时生效）
+PAGINATION_ESTIMATE_THRESHOLD = int(os.getenv('PAGINATION_ESTIMATE_THRESHOLD', 10000))  # 规划器估算超过该值时直接使用估算总数
+PAGINATION_COUNT_CACHE_TTL = int(os.getenv('PAGINATION_COUNT_CACHE_TTL', 60))  # 精确总数缓存秒数
+# 浏览数、分享数写后缓冲配置
+COUNTER_BUFFER_ENABLED = os.getenv('COUNTER_BUFFER_ENABLED', 'true').lower() == 'true'  # 关闭时每次直接更新数据库
+COUNTER_BUFFER_FLUSH_INTERVAL = float(os.getenv('COUNTER_BUFFER_FLUSH_INTERVAL', 5))  # 后台批量写入间隔（秒）
+COUNTER_BUFFER_MAX_KEYS = int(os.getenv('COUNTER_BUFFER_MAX_KEYS', 10000))  # 待写入行数上限，超过时立即写入
+# 浏览数判重配置（同一观看者同一天同一内容只计一次）
+VIEW_TRACKER_INITIAL_CAPACITY = int(os.getenv('VIEW_TRACKER_INITIAL_CAPACITY', 64))  # 每个内容每天布隆过滤器的初始容量，写满后翻倍扩容
+VIEW_TRACKER_ERROR_RATE = float(os.getenv('VIEW_TRACKER_ERROR_RATE', 0.01))  # 误判率（误判时少计一次浏览）
+VIEW_TRACKER_MAX_FILTERS = int(os.getenv('VIEW_TRACKER_MAX_FILTERS', 50000))  # 进程内最多保留的过滤器数量
+# 后台任务配置（关注流扇出等）
+BACKGROUND_TASK_WORKERS = int(os.getenv('BACKGROUND_TASK_WORKERS', 2))  # 后台线程数
+BACKGROUND_TASKS_SYNC = os.getenv('BACKGROUND_TASKS_SYNC', 'false').lower() == 'true'  # 是否在请求线程内同步执行
+# 关注流收件箱配置（发布时写入粉丝收件箱）
+FEED_INBOX_ENABLED = os.getenv('FEED_INBOX_ENABLED', 'true').lower() == 'true'  # 关闭时关注流按关注的作者实时查询
+FEED_INBOX_DEPTH = int(os.getenv('FEED_INBOX_DEPTH', 500))  # 每个用户每种类型保留的条数
+FEED_FANOUT_BATCH_SIZE = int(os.getenv('FEED_FANOUT_BATCH_SIZE', 1000))  # 扇出时每批写入的粉丝数
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 50))  # 关注时回填被关注者最近的条数
+FEED_TRIM_EVERY = int(os.getenv('FEED_TRIM_EVERY', 20))  # 每多少次扇出裁剪一次涉及的收件箱
+FEED_PULL_FOLLOWER_THRESHOLD = int(os.getenv('FEED_PULL_FOLLOWER_THRESHOLD', 10000))  # 粉丝数达到该值的作者不扇出，读取时拉取；0 表示关闭
+FEED_PULL_RECENT_DEPTH = int(os.getenv('FEED_PULL_RECENT_DEPTH', 100))  # 每个拉取作者缓存的最近内容条数
+FEED_PULL_CACHE_TTL = int(os.getenv('FEED_PULL_CACHE_TTL', 60))  # 拉取作者最近内容缓存秒数
+NOTIFICATION_BATCH_CHUNK_SIZE = int(os.getenv('NOTIFICATION_BATCH_CHUNK_SIZE', 1000))  # 定向发送通知时每批写入的用户数
+COMMENT_THREAD_REPLIES = int(os.getenv('COMMENT_THREAD_REPLIES', 3))  # 楼中楼模式每条父评论默认内联的回复数
+COMMENT_THREAD_MAX_REPLIES = int(os.getenv('COMMENT_THREAD_MAX_REPLIES', 20))  # 楼中楼模式每条父评论最多内联的回复数
+# 热度分配置（ordering=hot），修改后执行 recompute_hot_scores
+HOT_SCORE_WEIGHTS = {
+    'like_count': 1.0,
+    'comment_count': 2.0,
+    'favorite_count': 3.0,
+    'share_count': 4.0,
+    'view_count': 0.1,
+    'downvote_total': -2.0,
+}
+HOT_SCORE_DECAY_HOURS = float(os.getenv('HOT_SCORE_DECAY_HOURS', 12))  # 晚发布这么多小时的内容，互动只需十分之一即可排在同一位置
+HOT_SCORE_EPOCH = 1704067200  # 计算发布时间分的起点（2024-01-01 UTC）
+# 猜你喜欢随机抽样配置
+GUESS_LIKE_POOL_REFRESH = int(os.getenv('GUESS_LIKE_POOL_REFRESH', 300))  # 候选内容ID数组刷新间隔（秒）
+GUESS_LIKE_OVERSAMPLE = int(os.getenv('GUESS_LIKE_OVERSAMPLE', 2))  # 每轮抽取 count 的多少倍，用于补足被排除的内容
+GUESS_LIKE_MAX_ROUNDS = int(os.getenv('GUESS_LIKE_MAX_ROUNDS', 3))  # 排除后数量不足时最多抽取几轮
+GUESS_LIKE_SESSION_TTL = int(os.getenv('GUESS_LIKE_SESSION_TTL', 1800))  # 同一 seed 的抽样结果缓存秒数，保证翻页一致
+GUESS_LIKE_EXPLORE_RATIO = float(os.getenv('GUESS_LIKE_EXPLORE_RATIO', 0.3))  # 个性化推荐中混入随机内容的比例
+# 相似内容推荐配置（build_item_neighbors 离线计算），修改权重后重新执行命令
+RECOMMEND_INTERACTION_WEIGHTS = {
+    'like': 1.0,
+    'favorite': 2.0,
+    'rating': 1.0,  # 乘以 (评分 - 3) / 2，低于3分为负
+    'downvote': -2.0,
+}
+RECOMMEND_NEIGHBORS = int(os.getenv('RECOMMEND_NEIGHBORS', 50))  # 每个内容保存的相似内容数量
+RECOMMEND_RECENT_INTERACTIONS = int(os.getenv('RECOMMEND_RECENT_INTERACTIONS', 20))  # 推荐时参考用户最近的互动条数
+# 全文搜索配置（search 应用），修改分词或索引字段后执行 rebuild_search_index
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'search.backends.PostgresSearchBackend')  # 搜索后端类路径，为空时 search= 退回 ILIKE
+SEARCH_SNIPPET_LENGTH = int(os.getenv('SEARCH_SNIPPET_LENGTH', 80))  # 高亮片段长度
+SEARCH_MAX_TEXT_LENGTH = int(os.getenv('SEARCH_MAX_TEXT_LENGTH', 10000))  # 每个字段最多索引的字符数
+SUGGEST_REBUILD_INTERVAL = int(os.getenv('SUGGEST_REBUILD_INTERVAL', 600))  # 联想索引整体重建间隔（秒），同步其他进程的修改
+SUGGEST_MAX_ITEMS = int(os.getenv('SUGGEST_MAX_ITEMS', 200000))  # 每种类型最多载入联想索引的对象数（按热度）
+SUGGEST_TOP_PREFIX_LENGTH = int(os.getenv('SUGGEST_TOP_PREFIX_LENGTH', 2))  # 不超过该长度的前缀预先保存热度最高的结果
+SUGGEST_TOP_K = int(os.getenv('SUGGEST_TOP_K', 20))  # 每个短前缀保存的结果数，也是单次联想的数量上限
+SUGGEST_SCAN_LIMIT = int(os.getenv('SUGGEST_SCAN_LIMIT', 2000))  # 长前缀最多扫描的键数量
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/5.1/howto/static-files/
 STATIC_URL = 'static/'
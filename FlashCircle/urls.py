@@ -18,7 +18,10 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
 
+from middleware.profiling import QueryProfileView
 from middleware.uploader_data import UploadResourceView
+from middleware.view_tracker import ViewEventView
+from search.views import SearchView, SuggestView
 
 
 urlpatterns = [
@@ -44,5 +47,9 @@ urlpatterns = [
     path('api/comments/', include('comments.urls')),
     path('api/ratings/',include('rating.urls')),
     path('api/upload/', UploadResourceView.as_view(), name='upload_resource'),
+    path('api/profiling/', QueryProfileView.as_view(), name='query_profile'),
+    path('api/views/', ViewEventView.as_view(), name='view_event'),
+    path('api/search/', SearchView.as_view(), name='search'),
+    path('api/search/suggest/', SuggestView.as_view(), name='search-suggest'),
 ]
 
@@ -6,6 +6,7 @@ from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
 from middleware.utils import CustomPagination
 from middleware.utils import ApiResponse
+from search.filters import FullTextSearchFilter
 
 @extend_schema(tags=["广告管理"])
 @extend_schema_view(
@@ -22,7 +23,7 @@ class AdvertisementViewSet(BaseViewSet):
     queryset = Advertisement.objects.all()
     serializer_class = AdvertisementSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['type', 'is_active']
     search_fields = ['name', 'title', 'description']
     ordering_fields = ['create_time', 'update_time', 'sort_order']
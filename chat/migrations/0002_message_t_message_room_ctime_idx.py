@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['receiver_id', 'create_time', 'id'], name='t_message_room_ctime_idx'),
+        ),
+    ]
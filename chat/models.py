@@ -26,6 +26,10 @@ class Message(models.Model):
     class Meta:
         db_table = 't_message'
         ordering = ['create_time']
+        indexes = [
+            # 按房间查询消息并游标分页
+            models.Index(fields=['receiver_id', 'create_time', 'id'], name='t_message_room_ctime_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 自动填充发送者信息
@@ -8,6 +8,7 @@ from chat.models import Message, Session, Settings
 from chat.serializers import MessageSerializer, SessionSerializer, SettingsSerializer
 from middleware.base_views import BaseViewSet
 from middleware.utils import ApiResponse, CustomPagination
+from search.filters import FullTextSearchFilter
 
 @extend_schema(tags=["聊天室功能"])
 @extend_schema_view(
@@ -18,7 +19,8 @@ from middleware.utils import ApiResponse, CustomPagination
                OpenApiParameter(name='type', description='消息类型过滤', required=False, type=str),
                OpenApiParameter(name='sender_nickname', description='发送者姓名', required=False, type=str),
                OpenApiParameter(name='reply_to_id', description='回复消息ID过滤', required=False, type=int),
-               OpenApiParameter(name='search', description='按消息内容搜索', required=False, type=str)
+               OpenApiParameter(name='search', description='按消息内容搜索', required=False, type=str),
+               OpenApiParameter(name='cursor', description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor', required=False, type=str)
                ]),
     retrieve=extend_schema(summary='获取消息详情'),
     create=extend_schema(summary='创建消息'),
@@ -30,11 +32,13 @@ class MessageViewSet(BaseViewSet):
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['receiver_id', 'sender_id', 'type','reply_to_id']
     search_fields = ['content']
     ordering_fields = ['create_time']
     ordering = ['create_time']
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
 
     def get_queryset(self):
         """
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_comment_t_comment_target_ctime_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['parent_comment_id', 'create_time', 'id'], name='t_comment_parent_ctime_idx'),
+        ),
+        # 此前 reply_count 没有维护，按回复重新计算
+        migrations.RunSQL(
+            sql="""
+                UPDATE t_comment SET reply_count = COALESCE(s.reply_count, 0)
+                FROM t_comment AS c LEFT JOIN (
+                    SELECT parent_comment_id, COUNT(*) AS reply_count FROM t_comment
+                    WHERE parent_comment_id > 0 GROUP BY parent_comment_id
+                ) AS s ON s.parent_comment_id = c.id
+                WHERE t_comment.id = c.id AND t_comment.reply_count IS DISTINCT FROM COALESCE(s.reply_count, 0)
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -24,6 +24,12 @@ class Comment(models.Model):
     class Meta:
         db_table = 't_comment'
         ordering = ['create_time']
+        indexes = [
+            # 按目标查询评论并游标分页
+            models.Index(fields=['target_id', 'create_time', 'id'], name='t_comment_target_ctime_idx'),
+            # 按父评论取回复（楼中楼 ROW_NUMBER 窗口、回复游标分页）
+            models.Index(fields=['parent_comment_id', 'create_time', 'id'], name='t_comment_parent_ctime_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 自动填充用户信息
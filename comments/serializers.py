@@ -17,6 +17,6 @@ class CommentSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            liked_comment_ids = self.context.get('liked_comment_ids', [])
+            liked_comment_ids = self.context.get('liked_comment_ids', set())
             return obj.id in liked_comment_ids
         return False
@@ -1,12 +1,20 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from rest_framework.decorators import action
 from comments.models import Comment
 from comments.serializers import CommentSerializer
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 
 from contents.models import Content
 from middleware.base_views import BaseViewSet
+from middleware.counters import apply_counter_deltas
 from middleware.utils import ApiResponse, CustomPagination
+from middleware.viewer_state import build_viewer_context
+from search.filters import FullTextSearchFilter
 from societies.models import Dynamic
 
 
@@ -15,11 +23,14 @@ class CommentViewSet(BaseViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['target_id', 'type', 'parent_comment_id']
     search_fields = ['content', 'user_nickname']
     ordering_fields = ['create_time', 'like_count']
     # ordering = ['-create_time']
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
+    lookup_value_regex = r'\d+'
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -29,8 +40,64 @@ class CommentViewSet(BaseViewSet):
             queryset = queryset.filter(target_id=target_id)
         return queryset
     def perform_create(self, serializer):
-        # 自动设置当前用户信息
-        serializer.save(user_id=self.request.user.id)
+        # 自动设置当前用户信息，回复时父评论的 reply_count 同一事务内加一
+        with transaction.atomic():
+            comment = serializer.save(user_id=self.request.user.id)
+            self.apply_reply_count(comment, 1)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            super().perform_destroy(instance)
+            self.apply_reply_count(instance, -1)
+
+    @staticmethod
+    def apply_reply_count(comment, delta):
+        """回复（parent_comment_id 不为0）创建、删除时原子更新父评论的 reply_count"""
+        if comment.parent_comment_id:
+            apply_counter_deltas(Comment, comment.parent_comment_id, reply_count=delta)
+
+    def is_threaded(self, request):
+        return request.query_params.get('threaded', '').lower() in ('1', 'true')
+
+    def get_thread_reply_count(self, request):
+        """每条父评论内联的回复数"""
+        default = getattr(settings, 'COMMENT_THREAD_REPLIES', 3)
+        try:
+            count = int(request.query_params.get('replies', default))
+        except ValueError:
+            count = default
+        return max(0, min(count, getattr(settings, 'COMMENT_THREAD_MAX_REPLIES', 20)))
+
+    def first_replies(self, parent_ids, count):
+        """
+        每条父评论最早的 count 条回复：ROW_NUMBER() OVER (PARTITION BY parent_comment_id ORDER BY create_time, id)，
+        一次查询取回整页父评论的回复
+        """
+        if not parent_ids or count <= 0:
+            return {}
+        replies = Comment.objects.filter(parent_comment_id__in=parent_ids).annotate(
+            row_number=Window(RowNumber(), partition_by=[F('parent_comment_id')],
+                              order_by=[F('create_time').asc(), F('id').asc()])
+        ).filter(row_number__lte=count).order_by('parent_comment_id', 'create_time', 'id')
+        grouped = {}
+        for reply in replies:
+            grouped.setdefault(reply.parent_comment_id, []).append(reply)
+        return grouped
+
+    def threaded_data(self, request, page):
+        """父评论序列化结果附上前几条回复，以及继续加载回复的游标（replies/ 接口的 cursor 参数）"""
+        grouped = self.first_replies([comment.id for comment in page], self.get_thread_reply_count(request))
+        replies = [reply for items in grouped.values() for reply in items]
+        context_data = self.get_user_context_data(request, list(page) + replies)
+        cursor_paginator = self.pagination_class()
+        cursor_paginator.cursor_field = 'create_time'
+        data = self.get_serializer(page, many=True, context=context_data).data
+        for comment, item in zip(page, data):
+            items = grouped.get(comment.id, [])
+            item['replies'] = self.get_serializer(items, many=True, context=context_data).data
+            has_more = items and (comment.reply_count or 0) > len(items)
+            item['replies_cursor'] = cursor_paginator.encode_cursor(items[-1], reverse=False) if has_more else None
+        return data
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -44,38 +111,52 @@ class CommentViewSet(BaseViewSet):
         if target_id is None:
             return ApiResponse(code=400, message="缺少target_id参数")
         queryset = self.filter_queryset(self.get_queryset())
+        threaded = self.is_threaded(request)
+        if threaded:
+            # 楼中楼模式：分页的是父评论，回复内联在父评论中
+            queryset = queryset.filter(Q(parent_comment_id=0) | Q(parent_comment_id__isnull=True))
         # 获取分页器实例
         page = self.paginate_queryset(queryset)
+        if page is not None and threaded:
+            return self.get_paginated_response(self.threaded_data(request, page))
         if page is not None:
-            # 获取当前用户点赞的评论ID列表
-            context_data = self.get_user_context_data(request)
+            # 获取当前用户对当前页评论的点赞状态
+            context_data = self.get_user_context_data(request, page)
             serializer = self.get_serializer(page, many=True, context=context_data)
             # 使用自定义分页响应
             return self.get_paginated_response(serializer.data)
-            # 如果没有分页，返回普通响应
-            # 获取当前用户点赞的评论ID列表
-        context_data = self.get_user_context_data(request)
+        # 如果没有分页，返回普通响应
+        queryset = list(queryset)
+        context_data = self.get_user_context_data(request, queryset)
         serializer = self.get_serializer(queryset, many=True, context=context_data)
         return ApiResponse(serializer.data)
 
-    def get_user_context_data(self, request):
-        """获取当前用户点赞的评论数据"""
-        context_data = {
-            'request': request,
-            'liked_comment_ids': []
-        }
-
-        if request.user.is_authenticated:
-            # 获取点赞数据 - 当前用户点赞的评论ID列表
-            from likes.models import Like
-            liked_comments = Like.objects.filter(
-                user_id=request.user.id,
-                type='comment',
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_comment_ids'] = list(liked_comments)
-
-        return context_data
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # 获取当前用户对该评论的点赞状态
+        context_data = self.get_user_context_data(request, [instance])
+        serializer = self.get_serializer(instance, context=context_data)
+        return ApiResponse(data=serializer.data, message="详情获取成功")
+
+    @extend_schema(
+        summary='加载更多回复（游标分页，按时间正序）',
+        parameters=[
+            OpenApiParameter(name='cursor', description='首页传空值或父评论列表返回的 replies_cursor，之后传返回的 next_cursor',
+                             required=False, type=str),
+            OpenApiParameter(name='pageSize', description='每页数量', required=False, type=int),
+        ]
+    )
+    @action(detail=True, methods=['get'], url_path='replies')
+    def replies(self, request, pk=None):
+        queryset = Comment.objects.filter(parent_comment_id=pk).order_by('create_time', 'id')
+        page = self.paginator.paginate_queryset_by_cursor(queryset, request, view=self)
+        context_data = self.get_user_context_data(request, page)
+        serializer = self.get_serializer(page, many=True, context=context_data)
+        return self.get_paginated_response(serializer.data)
+
+    def get_user_context_data(self, request, instances=None):
+        """获取当前用户对当前页评论的点赞数据"""
+        return build_viewer_context(request, 'comment', instances, relations=('like',))
 
 @extend_schema(tags=["评论管理 内容"])
 @extend_schema_view(
@@ -87,6 +168,24 @@ class CommentViewSet(BaseViewSet):
                 description='排序字段，例如: -create_time(最新), create_time(最早)，-like_count（推荐）',
                 required=False,
                 type=str
+            ),
+            OpenApiParameter(
+                name='cursor',
+                description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor',
+                required=False,
+                type=str
+            ),
+            OpenApiParameter(
+                name='threaded',
+                description='楼中楼模式：true 时只分页父评论，每条附带前几条回复（replies）和加载更多的游标（replies_cursor）',
+                required=False,
+                type=bool
+            ),
+            OpenApiParameter(
+                name='replies',
+                description='楼中楼模式每条父评论内联的回复数，默认3',
+                required=False,
+                type=int
             )
         ]
     ),
@@ -98,46 +197,19 @@ class ContentCommentViewSet(CommentViewSet):
     专门处理内容评论的ViewSet
     """
 
-    def get_user_context_data(self, request):
-        """获取当前用户点赞的评论数据"""
-        context_data = {
-            'request': request,
-            'liked_comment_ids': []
-        }
-
-        if request.user.is_authenticated:
-            # 获取点赞数据 - 当前用户点赞的评论ID列表
-            from likes.models import Like
-            liked_comments = Like.objects.filter(
-                user_id=request.user.id,
-                type='comment',
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_comment_ids'] = list(liked_comments)
-
-        return context_data
-
     def perform_create(self, serializer):
-        # 保存评论并更新Content的comment_count
-        comment = serializer.save(user_id=self.request.user.id, type='content')
-        # 更新Content表的comment_count
-        try:
-            content = Content.objects.get(id=comment.target_id)
-            content.comment_count = content.comment_count + 1
-            content.save(update_fields=['comment_count'])
-        except Content.DoesNotExist:
-            pass
-    def perform_destroy(self, instance):
-        # 减少Content表的comment_count
-        target_id = instance.target_id
-        super().perform_destroy(instance)
+        # 保存评论并在同一事务内更新Content的comment_count
+        with transaction.atomic():
+            comment = serializer.save(user_id=self.request.user.id, type='content')
+            apply_counter_deltas(Content, comment.target_id, comment_count=1)
+            self.apply_reply_count(comment, 1)
 
-        try:
-            content = Content.objects.get(id=target_id)
-            content.comment_count = max(0, content.comment_count - 1)
-            content.save(update_fields=['comment_count'])
-        except Content.DoesNotExist:
-            pass
+    def perform_destroy(self, instance):
+        # 删除评论并减少Content表的comment_count
+        with transaction.atomic():
+            target_id = instance.target_id
+            super().perform_destroy(instance)
+            apply_counter_deltas(Content, target_id, comment_count=-1)
 
 @extend_schema(tags=["评论管理 动态"])
 @extend_schema_view(
@@ -149,6 +221,24 @@ class ContentCommentViewSet(CommentViewSet):
                 description='排序字段，例如: -create_time(最新), create_time(最早),-like_count（推荐）',
                 required=False,
                 type=str
+            ),
+            OpenApiParameter(
+                name='cursor',
+                description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor',
+                required=False,
+                type=str
+            ),
+            OpenApiParameter(
+                name='threaded',
+                description='楼中楼模式：true 时只分页父评论，每条附带前几条回复（replies）和加载更多的游标（replies_cursor）',
+                required=False,
+                type=bool
+            ),
+            OpenApiParameter(
+                name='replies',
+                description='楼中楼模式每条父评论内联的回复数，默认3',
+                required=False,
+                type=int
             )
         ]
     ),
@@ -161,54 +251,26 @@ class DynamicCommentViewSet(CommentViewSet):
     """
     def get_queryset(self):
         """
-        默认只获取动态评论（type='dynamic'）和顶级评论（parent_comment_id=0）
+        默认只获取动态评论（type='dynamic'），列表只获取顶级评论（parent_comment_id=0）
         """
         queryset = super().get_queryset()
         # 筛选type为dynamic的评论
         queryset = queryset.filter(type='dynamic')
-        # 筛选顶级评论（parent_comment_id为0或None）
-        queryset = queryset.filter(parent_comment_id=0)
+        # 列表只返回顶级评论（parent_comment_id为0），详情、删除也适用于回复
+        if self.action == 'list':
+            queryset = queryset.filter(parent_comment_id=0)
         return queryset
 
-    def get_user_context_data(self, request):
-        """获取当前用户点赞的评论数据"""
-        context_data = {
-            'request': request,
-            'liked_comment_ids': []
-        }
-
-        if request.user.is_authenticated:
-            # 获取点赞数据 - 当前用户点赞的评论ID列表
-            from likes.models import Like
-            liked_comments = Like.objects.filter(
-                user_id=request.user.id,
-                type='comment',
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_comment_ids'] = list(liked_comments)
-
-        return context_data
-
     def perform_create(self, serializer):
-        # 保存评论并更新Dynamic的comment_count
-        comment = serializer.save(user_id=self.request.user.id, type='dynamic')
-
-        # 更新Dynamic表的comment_count
-        try:
-            dynamic = Dynamic.objects.get(id=comment.target_id)
-            dynamic.comment_count = dynamic.comment_count + 1
-            dynamic.save(update_fields=['comment_count'])
-        except Dynamic.DoesNotExist:
-            pass
+        # 保存评论并在同一事务内更新Dynamic的comment_count
+        with transaction.atomic():
+            comment = serializer.save(user_id=self.request.user.id, type='dynamic')
+            apply_counter_deltas(Dynamic, comment.target_id, comment_count=1)
+            self.apply_reply_count(comment, 1)
 
     def perform_destroy(self, instance):
-        # 减少Dynamic表的comment_count
-        target_id = instance.target_id
-        super().perform_destroy(instance)
-
-        try:
-            dynamic = Dynamic.objects.get(id=target_id)
-            dynamic.comment_count = max(0, dynamic.comment_count - 1)
-            dynamic.save(update_fields=['comment_count'])
-        except Dynamic.DoesNotExist:
-            pass
\ No newline at end of file
+        # 删除评论并减少Dynamic表的comment_count
+        with transaction.atomic():
+            target_id = instance.target_id
+            super().perform_destroy(instance)
+            apply_counter_deltas(Dynamic, target_id, comment_count=-1)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ContentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'contents'
+
+    def ready(self):
+        # 注册信号（标签冗余字段同步）
+        from contents import signals  # noqa: F401
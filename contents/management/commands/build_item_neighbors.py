@@ -0,0 +1,120 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from contents.models import ContentNeighbor
+from contents.recommend import get_interaction_weights
+
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # 只有离线计算需要，线上服务不依赖
+    np = sparse = None
+
+
+def load_interactions(weights):
+    """读取用户对内容的互动，返回 (用户ID, 内容ID, 权重) 三个数组，同一用户同一内容的多种互动会在矩阵中相加"""
+    from favourites.models import Downvote, Favorite
+    from likes.models import Like
+    from rating.models import Rating
+
+    users, items, values = [], [], []
+
+    def collect(rows, weight):
+        for user_id, item_id, value in rows:
+            if user_id and item_id and value:
+                users.append(user_id)
+                items.append(item_id)
+                values.append(weight * value)
+
+    active = {'type': 'content', 'status': 'active'}
+    if weights.get('like'):
+        collect(((u, t, 1.0) for u, t in Like.objects.filter(**active).values_list(
+            'user_id', 'target_id').iterator(chunk_size=20000)), weights['like'])
+    if weights.get('favorite'):
+        collect(((u, t, 1.0) for u, t in Favorite.objects.filter(**active).values_list(
+            'user_id', 'target_id').iterator(chunk_size=20000)), weights['favorite'])
+    if weights.get('downvote'):
+        collect(((u, t, 1.0) for u, t in Downvote.objects.filter(**active).values_list(
+            'user_id', 'target_id').iterator(chunk_size=20000)), weights['downvote'])
+    if weights.get('rating'):
+        # 3分为中性，5分为 +1，1分为 -1
+        collect(((u, c, (score - 3) / 2) for u, c, score in Rating.objects.values_list(
+            'user_id', 'content_id', 'score').iterator(chunk_size=20000)), weights['rating'])
+    return (np.asarray(users, dtype=np.int64), np.asarray(items, dtype=np.int64),
+            np.asarray(values, dtype=np.float32))
+
+
+class Command(BaseCommand):
+    help = '根据点赞、收藏、评分、点踩离线计算每个内容的相似内容（物品余弦相似度），写入 t_content_neighbor'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, help='每个内容保存的相似内容数量，默认 RECOMMEND_NEIGHBORS')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='每批计算相似度的内容数量')
+        parser.add_argument('--min-score', type=float, default=0.0, help='只保存相似度大于该值的内容')
+        parser.add_argument('--dry-run', action='store_true', help='只计算并输出统计，不写入数据库')
+
+    def handle(self, *args, **options):
+        if np is None:
+            raise CommandError('需要安装 numpy 和 scipy（见 req.txt）')
+        top_k = options['top_k'] or getattr(settings, 'RECOMMEND_NEIGHBORS', 50)
+        chunk_size = options['chunk_size']
+        if top_k <= 0 or chunk_size <= 0:
+            raise CommandError('--top-k 和 --chunk-size 必须大于0')
+
+        begin = time.monotonic()
+        user_ids, item_ids, values = load_interactions(get_interaction_weights())
+        if not len(values):
+            self.stdout.write('没有互动数据')
+            return
+        # ID 映射为连续下标：用户 × 内容 的稀疏矩阵，重复的 (用户, 内容) 自动相加
+        users, user_index = np.unique(user_ids, return_inverse=True)
+        items, item_index = np.unique(item_ids, return_inverse=True)
+        matrix = sparse.csr_matrix((values, (user_index, item_index)), shape=(len(users), len(items)))
+        matrix.eliminate_zeros()
+        self.stdout.write(f'互动 {len(values)} 条，用户 {len(users)}，内容 {len(items)}，'
+                          f'读取耗时 {time.monotonic() - begin:.2f}s')
+
+        # 按列归一化后，内容两两的点积就是余弦相似度
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0)).ravel())
+        norms[norms == 0] = 1
+        normalized = (matrix @ sparse.diags(1 / norms)).tocsc()
+        normalized_t = normalized.T.tocsr()
+
+        rows = []
+        for start in range(0, len(items), chunk_size):
+            stop = min(start + chunk_size, len(items))
+            # (本批内容 × 全部内容) 的相似度，只包含有共同互动用户的内容对
+            similarity = (normalized_t[start:stop] @ normalized).tocsr()
+            similarity.setdiag(0)
+            similarity.eliminate_zeros()
+            for offset in range(stop - start):
+                low, high = similarity.indptr[offset], similarity.indptr[offset + 1]
+                scores = similarity.data[low:high]
+                neighbors = similarity.indices[low:high]
+                keep = scores > options['min_score']
+                scores, neighbors = scores[keep], neighbors[keep]
+                if not len(scores):
+                    continue
+                if len(scores) > top_k:
+                    best = np.argpartition(-scores, top_k - 1)[:top_k]
+                    scores, neighbors = scores[best], neighbors[best]
+                order = np.argsort(-scores, kind='stable')
+                rows.append(ContentNeighbor(
+                    content_id=int(items[start + offset]),
+                    neighbor_ids=[int(pk) for pk in items[neighbors[order]]],
+                    scores=[round(float(score), 6) for score in scores[order]],
+                ))
+        self.stdout.write(f'{len(rows)} 个内容有相似内容，计算耗时 {time.monotonic() - begin:.2f}s')
+
+        if options['dry_run']:
+            return
+        # 整体替换，提交前线上继续读取旧数据
+        with transaction.atomic():
+            ContentNeighbor.objects.all().delete()
+            ContentNeighbor.objects.bulk_create(rows, batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'已写入 {len(rows)} 行相似内容，总耗时 {time.monotonic() - begin:.2f}s'
+        ))
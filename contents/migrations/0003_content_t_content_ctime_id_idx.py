@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contents', '0002_initial'),
+        ('tags', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['-create_time', '-id'], name='t_content_ctime_id_idx'),
+        ),
+    ]
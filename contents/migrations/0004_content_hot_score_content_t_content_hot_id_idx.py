@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contents', '0003_content_t_content_ctime_id_idx'),
+        ('tags', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='hot_score',
+            field=models.FloatField(default=0, verbose_name='热度分（middleware.hot_score 计算）'),
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=models.Index(fields=['-hot_score', '-id'], name='t_content_hot_id_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:01
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contents', '0004_content_hot_score_content_t_content_hot_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentNeighbor',
+            fields=[
+                ('content_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('neighbor_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None)),
+                ('scores', django.contrib.postgres.fields.ArrayField(base_field=models.FloatField(), default=list, size=None, verbose_name='余弦相似度')),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 't_content_neighbor',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:08
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contents', '0005_contentneighbor'),
+        ('tags', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='content',
+            name='tag_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None, verbose_name='标签ID'),
+        ),
+        # 按关联表回填已有内容的标签ID
+        migrations.RunSQL(
+            sql="""
+                UPDATE t_content SET tag_ids = s.tag_ids
+                FROM (
+                    SELECT content_id, array_agg(tag_id ORDER BY tag_id) AS tag_ids
+                    FROM t_content_tags GROUP BY content_id
+                ) AS s
+                WHERE t_content.id = s.content_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='content',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['tag_ids'], name='t_content_tag_ids_gin'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def backfill_hot_score(apps, schema_editor):
+    from middleware.hot_score import hot_score_expression
+    Content = apps.get_model('contents', 'Content')
+    Content.objects.update(hot_score=hot_score_expression(Content))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contents', '0006_content_tag_ids'),
+    ]
+
+    # 0004 加入的 hot_score 默认为0，已有内容按当前计数计算一次，否则热度排序中全部排在新内容之后
+    operations = [
+        migrations.RunPython(backfill_hot_score, migrations.RunPython.noop),
+    ]
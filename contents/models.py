@@ -1,5 +1,7 @@
 import uuid
 
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 from django.db import models
 from user.models import User
 
@@ -31,6 +33,8 @@ class Content(models.Model):
     )
     author = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='内容表')
     tags = models.ManyToManyField('tags.Tag', related_name='contents', blank=True, verbose_name="标签")
+    # tags 的冗余副本（升序标签ID），按标签筛选时走 GIN 索引，由 contents.signals 同步
+    tag_ids = ArrayField(models.BigIntegerField(), default=list, blank=True, verbose_name="标签ID")
     status = models.CharField(max_length=255, blank=True, null=True)
     review_status = models.CharField(max_length=255, blank=True, null=True)
     view_count = models.IntegerField(blank=True, null=True, default=0)
@@ -41,6 +45,7 @@ class Content(models.Model):
     score_count = models.IntegerField(blank=True, null=True, default=0, verbose_name="统计评分人数")
     score_total = models.FloatField(blank=True, null=True, default=0, verbose_name="总评分")
     downvote_total = models.IntegerField(blank=True, null=True, default=0)
+    hot_score = models.FloatField(default=0, verbose_name="热度分（middleware.hot_score 计算）")
     publish_time = models.DateTimeField(blank=True, null=True)
     is_vip = models.BooleanField(default=False)
     duration = models.IntegerField(blank=True, null=True,verbose_name="视频时长，毫秒")
@@ -53,9 +58,31 @@ class Content(models.Model):
     class Meta:
         db_table = 't_content'
         ordering = ['-create_time']  # 修改为按创建时间倒序
+        indexes = [
+            # 游标分页 (create_time, id)
+            models.Index(fields=['-create_time', '-id'], name='t_content_ctime_id_idx'),
+            # ordering=hot 热度排序
+            models.Index(fields=['-hot_score', '-id'], name='t_content_hot_id_idx'),
+            # ?tags= 标签筛选（&& 任一标签、@> 全部标签）
+            GinIndex(fields=['tag_ids'], name='t_content_tag_ids_gin'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.prefixed_id:
             self.prefixed_id = f"c_{uuid.uuid4().hex}"
 
         super().save(*args, **kwargs)
+
+
+class ContentNeighbor(models.Model):
+    """
+    内容的相似内容（物品协同过滤），由 build_item_neighbors 命令离线计算
+    每个内容一行，neighbor_ids 与 scores 一一对应，按相似度倒序
+    """
+    content_id = models.BigIntegerField(primary_key=True)
+    neighbor_ids = ArrayField(models.BigIntegerField(), default=list)
+    scores = ArrayField(models.FloatField(), default=list, verbose_name="余弦相似度")
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 't_content_neighbor'
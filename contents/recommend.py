@@ -0,0 +1,108 @@
+"""
+猜你喜欢的个性化推荐
+build_item_neighbors 命令离线计算每个内容的相似内容（t_content_neighbor，每个内容一行），请求时：
+- 取用户最近的点赞、收藏、评分（各 RECOMMEND_RECENT_INTERACTIONS 条，走 user_id 索引）作为种子，
+  一条主键查询取出种子的相似内容，按 种子权重 × 相似度 累加排序
+- 没有互动的新用户按兴趣标签（User.tags）取热度最高的一批内容，按 seed 打乱
+- 按 GUESS_LIKE_EXPLORE_RATIO 混入 contents.sampling 的随机内容，避免推荐越来越窄
+结果由 contents.sampling.cached_sequence 按 (用户, seed, count) 缓存，翻页时各页来自同一个序列
+"""
+import random
+from collections import defaultdict
+
+from django.conf import settings
+
+from .sampling import cached_sequence, eligible_ids, sample_content_ids
+
+DEFAULT_INTERACTION_WEIGHTS = {
+    'like': 1.0,
+    'favorite': 2.0,
+    'rating': 1.0,
+    'downvote': -2.0,
+}
+
+
+def get_interaction_weights():
+    return getattr(settings, 'RECOMMEND_INTERACTION_WEIGHTS', DEFAULT_INTERACTION_WEIGHTS)
+
+
+def recent_interactions(user_id, limit=None):
+    """用户最近互动过的内容及权重 {内容ID: 权重}，权重的计算方式与 build_item_neighbors 一致"""
+    from favourites.models import Favorite
+    from likes.models import Like
+    from rating.models import Rating
+
+    limit = limit or getattr(settings, 'RECOMMEND_RECENT_INTERACTIONS', 20)
+    weights = get_interaction_weights()
+    seeds = defaultdict(float)
+    for model, name in ((Like, 'like'), (Favorite, 'favorite')):
+        if weights.get(name):
+            recent = model.objects.filter(user_id=user_id, type='content', status='active') \
+                .order_by('-create_time').values_list('target_id', flat=True)[:limit]
+            for target_id in recent:
+                seeds[target_id] += weights[name]
+    if weights.get('rating'):
+        recent = Rating.objects.filter(user_id=user_id).order_by('-create_time') \
+            .values_list('content_id', 'score')[:limit]
+        for content_id, score in recent:
+            seeds[content_id] += weights['rating'] * (score - 3) / 2
+    return {content_id: weight for content_id, weight in seeds.items() if weight > 0}
+
+
+def neighbor_content_ids(user_id, count):
+    """根据最近互动内容的相似内容推荐，没有互动时返回空列表"""
+    from contents.models import ContentNeighbor
+
+    seeds = recent_interactions(user_id)
+    if not seeds:
+        return []
+    scores = defaultdict(float)
+    rows = ContentNeighbor.objects.filter(content_id__in=list(seeds)) \
+        .values_list('content_id', 'neighbor_ids', 'scores')
+    for content_id, neighbor_ids, similarities in rows:
+        weight = seeds[content_id]
+        for neighbor_id, similarity in zip(neighbor_ids, similarities):
+            if neighbor_id not in seeds:
+                scores[neighbor_id] += weight * similarity
+    ranked = sorted(scores, key=lambda pk: (-scores[pk], pk))[:count * 2]
+    allowed = eligible_ids(ranked, user_id)
+    return [pk for pk in ranked if pk in allowed][:count]
+
+
+def tag_content_ids(user_id, seed, count):
+    """冷启动：用户兴趣标签下热度最高的内容，按 seed 打乱"""
+    from contents.models import Content
+    from user.models import User
+
+    tag_ids = list(User.tags.through.objects.filter(user_id=user_id).values_list('tag_id', flat=True))
+    if not tag_ids:
+        return []
+    candidates = list(Content.objects.filter(tag_ids__overlap=tag_ids).order_by('-hot_score', '-id')
+                      .values_list('id', flat=True)[:count * 3])
+    allowed = eligible_ids(candidates, user_id)
+    candidates = [pk for pk in candidates if pk in allowed]
+    random.Random(seed).shuffle(candidates)
+    return candidates[:count]
+
+
+def guess_like_ids(seed, count, user_id=None):
+    """猜你喜欢的内容ID列表：个性化推荐与随机内容按 seed 混合"""
+    return cached_sequence(user_id, seed, count, lambda: mix_recommendations(seed, count, user_id))
+
+
+def mix_recommendations(seed, count, user_id=None):
+    personal = []
+    if user_id:
+        personal = neighbor_content_ids(user_id, count) or tag_content_ids(user_id, seed, count)
+    explore = sample_content_ids(seed, count, user_id, exclude=set(personal))
+
+    # 每个位置按 GUESS_LIKE_EXPLORE_RATIO 的概率放随机内容，其中一边用完后由另一边补足
+    rng = random.Random(seed)
+    ratio = getattr(settings, 'GUESS_LIKE_EXPLORE_RATIO', 0.3)
+    personal.reverse()
+    explore.reverse()
+    result = []
+    while len(result) < count and (personal or explore):
+        source = explore if (not personal or (explore and rng.random() < ratio)) else personal
+        result.append(source.pop())
+    return result
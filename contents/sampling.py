@@ -0,0 +1,100 @@
+"""
+猜你喜欢的随机抽样
+进程内保存全部内容ID的紧凑数组（array('q')，每个ID 8 字节），每 GUESS_LIKE_POOL_REFRESH 秒刷新一次，
+抽样时按 seed 在数组中随机取位置，不再使用 ORDER BY random() 扫描并排序整张表：
+- 每轮抽取 count * GUESS_LIKE_OVERSAMPLE 个候选ID，用一条按主键查询的 SQL 过滤掉已删除、
+  当前用户已点赞（看过）或点踩的内容，数量不足时再抽一轮，最多 GUESS_LIKE_MAX_ROUNDS 轮，
+  查询次数和扫描行数只与 count 有关，与内容总量无关
+- 同一 seed 抽到的位置相同；抽样序列按 (用户, seed, count) 缓存 GUESS_LIKE_SESSION_TTL 秒（cached_sequence），
+  翻页期间点赞或ID数组刷新都不会改变后续页，各页不重复
+"""
+import random
+import threading
+import time
+import uuid
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class ContentIdPool:
+    """候选内容ID数组，过期后由第一个访问的请求刷新，刷新期间其他请求继续使用旧数组"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = array('q')
+        self._loaded_at = None
+
+    @property
+    def refresh_interval(self):
+        return getattr(settings, 'GUESS_LIKE_POOL_REFRESH', 300)
+
+    def get_ids(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at >= self.refresh_interval:
+            # 首次加载时需要等待；已有数组时只由拿到锁的请求刷新
+            if self._lock.acquire(blocking=loaded_at is None):
+                try:
+                    if self._loaded_at == loaded_at:
+                        self.refresh()
+                finally:
+                    self._lock.release()
+        return self._ids
+
+    def refresh(self):
+        from contents.models import Content
+        ids = array('q', Content.objects.order_by('id').values_list('id', flat=True).iterator(chunk_size=10000))
+        self._ids, self._loaded_at = ids, time.monotonic()
+        return len(ids)
+
+
+content_id_pool = ContentIdPool()
+
+
+def new_seed():
+    return uuid.uuid4().hex[:16]
+
+
+def cached_sequence(user_id, seed, count, build):
+    """同一 (用户, seed, count) 的ID序列，首次由 build() 生成并缓存，翻页时各页从同一个序列中截取"""
+    cache_key = f'guess_like:{user_id or 0}:{seed}:{count}'
+    result = cache.get(cache_key)
+    if result is None:
+        result = build()
+        cache.set(cache_key, result, getattr(settings, 'GUESS_LIKE_SESSION_TTL', 1800))
+    return result
+
+
+def eligible_ids(candidates, user_id=None):
+    """候选ID中仍然存在、且当前用户没有点赞或点踩过的ID"""
+    from contents.models import Content
+    from favourites.models import Downvote
+    from likes.models import Like
+
+    queryset = Content.objects.filter(id__in=candidates)
+    if user_id:
+        queryset = queryset.exclude(id__in=Like.objects.filter(
+            type='content', target_id__in=candidates, user_id=user_id, status='active').values('target_id'))
+        queryset = queryset.exclude(id__in=Downvote.objects.filter(
+            type='content', target_id__in=candidates, user_id=user_id, status='active').values('target_id'))
+    return set(queryset.values_list('id', flat=True))
+
+
+def sample_content_ids(seed, count, user_id=None, exclude=()):
+    """按 seed 抽取最多 count 个内容ID（不包含 exclude 中的ID），同样的参数和数据返回同样的结果"""
+    ids = content_id_pool.get_ids()
+    window = (count + len(exclude)) * max(1, getattr(settings, 'GUESS_LIKE_OVERSAMPLE', 2))
+    total = min(len(ids), window * max(1, getattr(settings, 'GUESS_LIKE_MAX_ROUNDS', 3)))
+    # random.sample 对 range 只生成抽中的位置，耗时与抽样数量有关，与数组长度无关
+    positions = random.Random(seed).sample(range(len(ids)), total)
+
+    sampled = []
+    for start in range(0, total, window):
+        candidates = [ids[position] for position in positions[start:start + window]]
+        candidates = [pk for pk in candidates if pk not in exclude]
+        allowed = eligible_ids(candidates, user_id)
+        sampled.extend(pk for pk in candidates if pk in allowed)
+        if len(sampled) >= count:
+            break
+    return sampled[:count]
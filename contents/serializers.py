@@ -58,7 +58,8 @@ class ContentSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Content
-        fields = '__all__'
+        # tag_ids 是 tags 的冗余副本，不对外暴露
+        exclude = ['tag_ids']
 
 class ContentWithFollowSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
@@ -66,6 +67,7 @@ class ContentWithFollowSerializer(serializers.ModelSerializer):
     is_liked = serializers.SerializerMethodField()
     is_favourites = serializers.SerializerMethodField()
     is_downvoted = serializers.SerializerMethodField()
+    user_score = serializers.SerializerMethodField()
     tags = serializers.SerializerMethodField()
 
     def to_representation(self, instance):
@@ -96,7 +98,8 @@ class ContentWithFollowSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Content
-        fields = '__all__'
+        # tag_ids 是 tags 的冗余副本，不对外暴露
+        exclude = ['tag_ids']
 
     def get_tags(self, obj):
         """获取内容的标签信息"""
@@ -118,9 +121,9 @@ class ContentWithFollowSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             # 从上下文中获取当前用户关注的用户ID列表
-            followed_user_ids = self.context.get('followed_user_ids', [])
+            followed_user_ids = self.context.get('followed_user_ids', set())
             # 注意：Content模型使用的是author_id而不是user_id
-            return obj.author.id in followed_user_ids if obj.author else False
+            return obj.author_id in followed_user_ids if obj.author_id else False
         return False
 
     def get_is_liked(self, obj):
@@ -129,7 +132,7 @@ class ContentWithFollowSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            liked_dynamic_ids = self.context.get('liked_dynamic_ids', [])
+            liked_dynamic_ids = self.context.get('liked_dynamic_ids', set())
             return obj.id in liked_dynamic_ids
         return False
 
@@ -139,7 +142,7 @@ class ContentWithFollowSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            favourite_dynamic_ids = self.context.get('favourite_dynamic_ids', [])
+            favourite_dynamic_ids = self.context.get('favourite_dynamic_ids', set())
             return obj.id in favourite_dynamic_ids
         return False
 
@@ -149,6 +152,15 @@ class ContentWithFollowSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            downvoted_content_ids = self.context.get('downvoted_content_ids', [])
+            downvoted_content_ids = self.context.get('downvoted_content_ids', set())
             return obj.id in downvoted_content_ids
-        return False
\ No newline at end of file
+        return False
+
+    def get_user_score(self, obj):
+        """
+        获取当前用户对该内容的评分，未评分返回None
+        """
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return self.context.get('user_scores', {}).get(obj.id)
+        return None
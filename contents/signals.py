@@ -0,0 +1,39 @@
+from django.db.models import F, Func, Value
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from contents.models import Content
+from tags.models import Tag
+
+
+def sync_tag_ids(content_ids):
+    """按关联表重新生成内容的 tag_ids"""
+    through = Content.tags.through
+    current = {pk: [] for pk in content_ids}
+    rows = through.objects.filter(content_id__in=content_ids).order_by('tag_id').values_list('content_id', 'tag_id')
+    for content_id, tag_id in rows:
+        current[content_id].append(tag_id)
+    for content_id, tag_ids in current.items():
+        Content.objects.filter(pk=content_id).update(tag_ids=tag_ids)
+
+
+@receiver(m2m_changed, sender=Content.tags.through)
+def tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """内容的标签变化后（content.tags.set/add/remove/clear 或 tag.contents.*）同步 tag_ids"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        sync_tag_ids([instance.pk])
+    elif action == 'post_clear':
+        # tag.contents.clear() 不提供 pk_set，只能按冗余字段找出受影响的内容
+        Content.objects.filter(tag_ids__contains=[instance.pk]).update(
+            tag_ids=Func(F('tag_ids'), Value(instance.pk), function='array_remove'))
+    elif pk_set:
+        sync_tag_ids(list(pk_set))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    """删除标签时关联表记录被级联删除（不会触发 m2m_changed），从 tag_ids 中移除该标签"""
+    Content.objects.filter(tag_ids__contains=[instance.pk]).update(
+        tag_ids=Func(F('tag_ids'), Value(instance.pk), function='array_remove'))
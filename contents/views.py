@@ -6,11 +6,18 @@ from django.db.models import Q
 from datetime import timedelta
 
 from contents.models import Content
+from contents.recommend import guess_like_ids
+from contents.sampling import new_seed
 from contents.serializers import ContentSerializer, ContentWithFollowSerializer
 from middleware.base_views import BaseViewSet
+from middleware.counter_buffer import counter_buffer
+from middleware.hot_score import HotOrderingFilter
+from middleware.view_tracker import track_view
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 
 from middleware.utils import ApiResponse, CustomPagination
+from middleware.viewer_state import build_viewer_context
+from search.filters import FullTextSearchFilter
 
 
 @extend_schema_view(
@@ -21,8 +28,12 @@ from middleware.utils import ApiResponse, CustomPagination
             OpenApiParameter(name='time_range', description='时间范围: month(本月), half_year(半年), longer(更久)', required=False),
             OpenApiParameter(name='paid_only', description='仅显示付费内容: true(仅付费), false或不传(全部)',
                              required=False),
-            OpenApiParameter(name='ordering',description='首页：-like_count(最热), -create_time(最新)'
-                                                         '||发现: -like_count(精选), -create_time(发现)')
+            OpenApiParameter(name='tags', description='标签ID，多个用逗号分隔', required=False),
+            OpenApiParameter(name='tags_mode', description='多个标签的匹配方式: or(包含任一标签，默认), and(包含全部标签)', required=False),
+            OpenApiParameter(name='ordering',description='首页：hot(最热，按热度分), -like_count(点赞最多), -create_time(最新)'
+                                                         '||发现: hot(精选), -create_time(发现)'),
+            OpenApiParameter(name='cursor', description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor', required=False),
+            OpenApiParameter(name='total', description='总数计算方式: exact(精确，默认), estimate(估算/缓存), none(不返回总数)', required=False)
         ],
        description='排序字段，例如: -create_time(最新上架),，-favorite_count（收藏量）,-like_count(热门影视)',
        ),
@@ -36,11 +47,13 @@ class ContentViewSet(BaseViewSet):
     queryset = Content.objects.all()
     serializer_class = ContentSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, HotOrderingFilter, FullTextSearchFilter]
     filterset_fields = ['type', 'tabs', 'is_vip','author']
     search_fields = ['title', 'description']
-    ordering_fields = ['create_time', 'update_time', 'favorite_count','like_count']
+    ordering_fields = ['create_time', 'update_time', 'favorite_count','like_count', 'hot_score']
     ordering = ['-create_time']
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
 
     def perform_create(self, serializer):
         # 自动设置当前用户为作者
@@ -74,83 +87,53 @@ class ContentViewSet(BaseViewSet):
                 # 半年以前发布的内容
                 half_year_ago = now - timedelta(days=180)
                 queryset = queryset.filter(create_time__lt=half_year_ago)
-        # 根据分类ID筛选内容
+        # 根据分类ID筛选内容：按冗余的 tag_ids 数组走 GIN 索引，不需要关联表和 distinct，保留 ordering 排序
         tags = self.request.query_params.get('tags', None)
         if tags:
-            tag_ids = tags.split(',')
-            queryset = queryset.filter(tags__id__in=tag_ids).distinct()
+            tag_ids = [int(tag_id) for tag_id in tags.split(',') if tag_id.strip().isdigit()]
+            if not tag_ids:
+                # 没有有效的标签ID：contains 空数组会匹配全部内容，与任一模式保持一致返回空
+                return queryset.none()
+            if self.request.query_params.get('tags_mode') == 'and':
+                # 同时包含全部标签
+                queryset = queryset.filter(tag_ids__contains=tag_ids)
+            else:
+                # 包含任一标签
+                queryset = queryset.filter(tag_ids__overlap=tag_ids)
         return queryset
 
-    def get_user_context_data(self, request):
-        """获取当前用户的相关数据"""
-        context_data = {
-            'request': request,
-            'followed_user_ids': [],
-            'liked_dynamic_ids': [],
-            'favourite_dynamic_ids': [],
-            'downvoted_content_ids': []
-        }
-
-        if request.user.is_authenticated:
-            # 获取关注数据 - 当前用户关注的用户ID列表
-            from follows.models import Follow
-            followed_users = Follow.objects.filter(
-                follower_id=request.user.id,
-                status='active'
-            ).values_list('followee_id', flat=True)
-            context_data['followed_user_ids'] = list(followed_users)
-
-            # 获取点赞数据 - 当前用户点赞的内容ID列表
-            from likes.models import Like
-            liked_contents = Like.objects.filter(
-                user_id=request.user.id,
-                type='content',  # 假设内容的type为'content'
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_dynamic_ids'] = list(liked_contents)
-
-            # 获取收藏数据 - 当前用户收藏的内容ID列表
-            from favourites.models import Favorite
-            favourite_contents = Favorite.objects.filter(
-                user_id=request.user.id,
-                target_id__isnull=False,
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['favourite_dynamic_ids'] = list(favourite_contents)
-
-            # 获取点踩数据 - 当前用户点踩的内容ID列表
-            from favourites.models import Downvote
-            downvoted_contents = Downvote.objects.filter(
-                user_id=request.user.id,
-                target_id__isnull=False,
-                status='active',
-                type='content'
-            ).values_list('target_id', flat=True)
-            context_data['downvoted_content_ids'] = list(downvoted_contents)
-        return context_data
+    def get_user_context_data(self, request, instances=None):
+        """获取当前用户对当前页内容的相关数据（关注、点赞、收藏、点踩、评分）"""
+        return build_viewer_context(request, 'content', instances, author_field='author_id')
 
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
-        # 获取当前用户的相关数据
-        context_data = self.get_user_context_data(request)
-
         # 获取分页器实例
         page = self.paginate_queryset(queryset)
         if page is not None:
+            # 叠加尚未写入数据库的浏览数、分享数
+            counter_buffer.apply_pending(page)
+            # 获取当前用户对当前页内容的相关数据
+            context_data = self.get_user_context_data(request, page)
             serializer = ContentWithFollowSerializer(page, many=True, context=context_data)
             # 使用自定义分页响应
             return self.get_paginated_response(serializer.data)
 
         # 如果没有分页，返回普通响应
+        queryset = list(queryset)
+        context_data = self.get_user_context_data(request, queryset)
         serializer = ContentWithFollowSerializer(queryset, many=True, context=context_data)
         return ApiResponse(serializer.data)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        # 同一观看者当天只计一次浏览，浏览数先进入写后缓冲，定期批量写入
+        track_view(request, Content, instance.pk)
+        counter_buffer.apply_pending(instance)
 
         # 获取当前用户的相关数据
-        context_data = self.get_user_context_data(request)
+        context_data = self.get_user_context_data(request, [instance])
 
         # 使用序列化器
         serializer = ContentWithFollowSerializer(instance, context=context_data)
@@ -161,6 +144,7 @@ class ContentViewSet(BaseViewSet):
         tags=['内容'],
         parameters=[
             OpenApiParameter(name='count', description='随机返回数量', type=int, default=10),
+            OpenApiParameter(name='seed', description='随机种子，翻页时传入首页返回的 pagination.seed 保证各页不重复', type=str),
             OpenApiParameter(name='currentPage', description='当前页码', type=int, default=1),
             OpenApiParameter(name='pageSize', description='每页数量', type=int, default=20),
         ]
@@ -169,24 +153,33 @@ class ContentViewSet(BaseViewSet):
     def guess_you_like(self, request):
         """
         猜你喜欢功能
-        随机返回一批内容数据，支持分页
+        按最近互动的相似内容（新用户按兴趣标签）推荐并混入随机内容，排除已点赞、点踩的内容，支持分页
+        推荐见 contents.recommend，同一个 seed 的各页来自同一个序列
         """
         # 获取请求参数
         count = int(request.query_params.get('count', 50))
         # 限制最大返回数量
-        count = min(count, 100)
-        # 获取随机数据，限制总数
-        queryset = Content.objects.all().order_by('?')[:count]
-        # 转换为列表以支持分页（因为切片后的QuerySet不支持进一步的分页操作）
-        queryset_list = list(queryset)
-        # 获取当前用户的相关数据
-        context_data = self.get_user_context_data(request)
+        count = max(min(count, 100), 1)
+        seed = request.query_params.get('seed') or new_seed()
+        user_id = request.user.id if request.user.is_authenticated else None
+        # 只抽取ID，当前页再按主键取出内容
+        sampled_ids = guess_like_ids(seed, count, user_id)
         # 应用分页
-        page = self.paginate_queryset(queryset_list)
-        if page is not None:
+        page_ids = self.paginate_queryset(sampled_ids)
+        if page_ids is not None:
+            contents = Content.objects.in_bulk(page_ids)
+            page = [contents[pk] for pk in page_ids if pk in contents]
+            counter_buffer.apply_pending(page)
+            # 获取当前用户对当前页内容的相关数据
+            context_data = self.get_user_context_data(request, page)
             serializer = ContentWithFollowSerializer(page, many=True, context=context_data)
-            return self.get_paginated_response(serializer.data)
+            response = self.get_paginated_response(serializer.data)
+            response.data['data']['pagination']['seed'] = seed
+            return response
 
+        contents = Content.objects.in_bulk(sampled_ids)
+        queryset_list = [contents[pk] for pk in sampled_ids if pk in contents]
+        context_data = self.get_user_context_data(request, queryset_list)
         serializer = ContentWithFollowSerializer(queryset_list, many=True, context=context_data)
         return ApiResponse(serializer.data)
 
@@ -203,16 +196,17 @@ class ContentViewSet(BaseViewSet):
         content_id = request.data.get('id')
         if not content_id:
             return ApiResponse(code=400, message="缺少内容ID参数")
-        try:
-            content = Content.objects.get(id=content_id)
-            content.share_count = content.share_count + 1
-            content.save(update_fields=['share_count'])
-            return ApiResponse(
-                data={'share_count': content.share_count},
-                message="分享成功"
-            )
-        except Content.DoesNotExist:
+        row = Content.objects.filter(id=content_id).values_list('id', 'share_count').first()
+        if row is None:
             return ApiResponse(code=400, message="内容不存在")
+        # 分享数先进入写后缓冲，返回值叠加尚未写入的增量，保证单调递增
+        content_id, share_count = row
+        counter_buffer.add(Content, content_id, 'share_count')
+        share_count = (share_count or 0) + counter_buffer.pending(Content, content_id, 'share_count')
+        return ApiResponse(
+            data={'share_count': share_count},
+            message="分享成功"
+        )
 
 @extend_schema(tags=["内容"])
 @extend_schema_view(
@@ -222,7 +216,9 @@ class ContentViewSet(BaseViewSet):
        OpenApiParameter(name='time_range',
                         description='时间范围: month(本月), half_year(半年), longer(更久)',
                         required=False),
-       OpenApiParameter(name='ordering', description='vip：-like_count(推荐), -create_time(最新)')
+       OpenApiParameter(name='ordering', description='vip：-like_count(推荐), -create_time(最新)'),
+       OpenApiParameter(name='cursor', description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor', required=False),
+       OpenApiParameter(name='total', description='总数计算方式: exact(精确，默认), estimate(估算/缓存), none(不返回总数)', required=False)
    ],
 ),
 )
@@ -234,11 +230,13 @@ class FollowedContentViewSet(BaseViewSet):
     queryset = Content.objects.all()
     serializer_class = ContentWithFollowSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['type', 'tabs', 'is_vip']
     search_fields = ['title', 'description']
     ordering_fields = ['create_time', 'update_time', 'favorite_count', 'like_count']
     ordering = ['-create_time']
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
 
     def list(self, request, *args, **kwargs):
         # 检查用户是否已认证
@@ -247,30 +245,29 @@ class FollowedContentViewSet(BaseViewSet):
 
         # 获取当前用户ID
         current_user = request.user
-        # 获取该用户关注的用户ID列表
-        from follows.models import Follow
-        followed_users = Follow.objects.filter(
-            follower_id=current_user.id,
-            status='active'
-        ).values_list('followee_id', flat=True)
+        from follows.feed import followed_queryset, paginate_followed
+        # 默认排序的游标分页：收件箱与粉丝数很多的作者的最近内容合并
+        page = paginate_followed(self, request, 'content')
+        if page is not None:
+            context_data = build_viewer_context(request, 'content', page, author_field='author_id')
+            serializer = ContentWithFollowSerializer(page, many=True, context=context_data)
+            return self.get_paginated_response(serializer.data)
 
-        # 获取关注用户发布的内容
-        queryset = Content.objects.filter(author_id__in=followed_users)
+        # 关注的人发布的内容：从关注流收件箱读取，收件箱关闭时按关注的作者查询
+        queryset = followed_queryset(current_user.id, 'content')
         queryset = self.filter_queryset(queryset)
 
-        # 获取当前登录用户的相关数据（用于显示是否关注、点赞、收藏等状态）
-        # 复用ContentViewSet中的方法
-        content_view_set = ContentViewSet()
-        content_view_set.request = request
-        context_data = content_view_set.get_user_context_data(request)
-
         # 获取分页器实例
         page = self.paginate_queryset(queryset)
         if page is not None:
+            # 获取当前登录用户对当前页内容的相关数据（用于显示是否关注、点赞、收藏等状态）
+            context_data = build_viewer_context(request, 'content', page, author_field='author_id')
             serializer = ContentWithFollowSerializer(page, many=True, context=context_data)
             # 使用自定义分页响应
             return self.get_paginated_response(serializer.data)
 
         # 如果没有分页，返回普通响应
+        queryset = list(queryset)
+        context_data = build_viewer_context(request, 'content', queryset, author_field='author_id')
         serializer = ContentWithFollowSerializer(queryset, many=True, context=context_data)
         return ApiResponse(serializer.data)
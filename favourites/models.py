@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 
 from societies.models import Dynamic
 from contents.models import Content
+from middleware.counters import apply_target_counter_deltas, status_delta
 from user.models import User
 
 
@@ -28,6 +29,10 @@ class Favorite(models.Model):
     class Meta:
         db_table = 't_favorite'
         ordering = ['create_time']
+        indexes = [
+            # 用户最近的收藏（猜你喜欢按最近互动推荐）
+            models.Index(fields=['user_id', 'type', '-create_time'], name='t_favorite_user_type_ctime_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 自动填充用户信息
@@ -38,54 +43,25 @@ class Favorite(models.Model):
             except User.DoesNotExist:
                 pass
 
-        # 检查是否是状态更新
-        old_status = None
-        if self.pk:  # 如果是更新操作
-            try:
-                old_instance = Favorite.objects.get(pk=self.pk)
-                old_status = old_instance.status
-            except Favorite.DoesNotExist:
-                pass
+        # 状态变更和计数更新放在同一事务内，锁住原记录读取旧状态，避免并发切换时计数丢失
+        with transaction.atomic():
+            old_status = None
+            if self.pk:  # 如果是更新操作
+                old_status = Favorite.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
-        # 只要target_id存在，就更新目标对象的favorite_count
-        if self.target_id and old_status != self.status:
-            try:
-                if self.type == 'dynamic':
-                    target = Dynamic.objects.get(id=self.target_id)
-                elif self.type == 'content':
-                    target = Content.objects.get(id=self.target_id)
-                else:
-                    return
-
-                if self.status == 'active' and old_status != 'active':
-                    # 收藏，增加计数
-                    target.favorite_count = target.favorite_count + 1
-                elif self.status == 'inactive' and old_status == 'active':
-                    # 取消收藏，减少计数（但不低于0）
-                    target.favorite_count = max(0, target.favorite_count - 1)
-                target.save(update_fields=['favorite_count'])
-            except (Dynamic.DoesNotExist, Content.DoesNotExist):
-                pass
+            # 状态发生变化时更新目标对象的favorite_count
+            if self.target_id and self.type in ('dynamic', 'content'):
+                apply_target_counter_deltas(self.type, self.target_id,
+                                            favorite_count=status_delta(old_status, self.status))
 
     def delete(self, *args, **kwargs):
-        # 删除收藏时减少目标对象的favorite_count
-        if self.target_id and self.status == 'active':
-            try:
-                if self.type == 'dynamic':
-                    target = Dynamic.objects.get(id=self.target_id)
-                elif self.type == 'content':
-                    target = Content.objects.get(id=self.target_id)
-                else:
-                    return
-
-                target.favorite_count = max(0, target.favorite_count - 1)
-                target.save(update_fields=['favorite_count'])
-            except (Dynamic.DoesNotExist, Content.DoesNotExist):
-                pass
-
-        super().delete(*args, **kwargs)
+        # 删除收藏记录时减少目标对象的favorite_count
+        with transaction.atomic():
+            if self.target_id and self.status == 'active' and self.type in ('dynamic', 'content'):
+                apply_target_counter_deltas(self.type, self.target_id, favorite_count=-1)
+            super().delete(*args, **kwargs)
 
 
 class Downvote(models.Model):
@@ -128,52 +104,22 @@ class Downvote(models.Model):
             except User.DoesNotExist:
                 pass
 
-        # 检查是否是状态更新
-        old_status = None
-        if self.pk:  # 如果是更新操作
-            try:
-                old_instance = Downvote.objects.get(pk=self.pk)
-                old_status = old_instance.status
-            except Downvote.DoesNotExist:
-                pass
+        # 状态变更和计数更新放在同一事务内，锁住原记录读取旧状态，避免并发切换时计数丢失
+        with transaction.atomic():
+            old_status = None
+            if self.pk:  # 如果是更新操作
+                old_status = Downvote.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
-        # 只要target_id存在，就更新目标对象的downvote_total
-        if self.target_id and old_status != self.status:
-            try:
-                # 根据类型更新相应对象的downvote_total字段
-                if self.type == 'dynamic':
-                    target = Dynamic.objects.get(id=self.target_id)
-                elif self.type == 'content':
-                    target = Content.objects.get(id=self.target_id)
-                else:
-                    return
-
-                if self.status == 'active' and old_status != 'active':
-                    # 点踩，增加计数
-                    target.downvote_total = target.downvote_total + 1
-                elif self.status == 'inactive' and old_status == 'active':
-                    # 取消点踩，减少计数（但不低于0）
-                    target.downvote_total = max(0, target.downvote_total - 1)
-                target.save(update_fields=['downvote_total'])
-            except (Dynamic.DoesNotExist, Content.DoesNotExist):
-                pass
+            # 状态发生变化时更新目标对象的downvote_total
+            if self.target_id and self.type in ('dynamic', 'content'):
+                apply_target_counter_deltas(self.type, self.target_id,
+                                            downvote_total=status_delta(old_status, self.status))
 
     def delete(self, *args, **kwargs):
         # 删除点踩记录时减少目标对象的downvote_total
-        if self.target_id and self.status == 'active':
-            try:
-                if self.type == 'dynamic':
-                    target = Dynamic.objects.get(id=self.target_id)
-                elif self.type == 'content':
-                    target = Content.objects.get(id=self.target_id)
-                else:
-                    return
-
-                target.downvote_total = max(0, target.downvote_total - 1)
-                target.save(update_fields=['downvote_total'])
-            except (Dynamic.DoesNotExist, Content.DoesNotExist):
-                pass
-
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            if self.target_id and self.status == 'active' and self.type in ('dynamic', 'content'):
+                apply_target_counter_deltas(self.type, self.target_id, downvote_total=-1)
+            super().delete(*args, **kwargs)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FollowsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'follows'
+
+    def ready(self):
+        # 注册信号（关注流收件箱扇出等）
+        from follows import signals  # noqa: F401
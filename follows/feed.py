@@ -0,0 +1,344 @@
+"""
+关注流收件箱（写扩散）
+- 发布：内容/动态创建后在后台按批把 (粉丝, 类型, ID) 写入 t_feed_inbox
+- 关注：把被关注者最近的内容回填到关注者的收件箱；取消关注：删除该作者在收件箱中的记录
+- 读取：关注流只按用户读取收件箱中的ID，再按ID查询内容/动态，配合游标分页
+- 裁剪：每个用户每种类型最多保留 FEED_INBOX_DEPTH 条，超出部分用窗口函数批量删除
+FEED_INBOX_ENABLED 关闭时关注流回退为按关注的作者实时查询。
+
+推拉结合：粉丝数达到 FEED_PULL_FOLLOWER_THRESHOLD 的作者发布时不扇出，
+读取时从该作者最近内容的缓存（每人 FEED_PULL_RECENT_DEPTH 条）拉取，与收件箱按 (发布时间, ID) 倒序 k 路归并。
+两侧耗时和条数记录在 profile_registry 的 feed.* 指标中（/api/profiling/ 查看）。
+"""
+import heapq
+import itertools
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from follows.models import FeedInbox, Follow
+from middleware.profiling import profile_registry
+
+FEED_TYPES = ('content', 'dynamic')
+# 合并耗时（毫秒）和条数的直方图分桶
+FEED_MS_BUCKETS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+FEED_SIZE_BUCKETS = (0, 1, 5, 10, 20, 50, 100, 200, 500)
+
+_fan_out_counter = itertools.count(1)
+
+
+def get_feed_source(target_type):
+    """收件箱类型对应的模型和作者字段"""
+    if target_type == 'content':
+        from contents.models import Content
+        return Content, 'author_id'
+    if target_type == 'dynamic':
+        from societies.models import Dynamic
+        return Dynamic, 'user_id'
+    raise ValueError(f'不支持的关注流类型: {target_type}')
+
+
+def inbox_enabled():
+    return getattr(settings, 'FEED_INBOX_ENABLED', True)
+
+
+def inbox_depth():
+    return getattr(settings, 'FEED_INBOX_DEPTH', 500)
+
+
+def pull_threshold():
+    """粉丝数达到该值的作者改为读取时拉取，0 表示关闭推拉结合"""
+    return getattr(settings, 'FEED_PULL_FOLLOWER_THRESHOLD', 0)
+
+
+def hybrid_enabled():
+    return inbox_enabled() and pull_threshold() > 0
+
+
+def is_pulled_author(author_id):
+    if not hybrid_enabled():
+        return False
+    from user.models import User
+    return User.objects.filter(pk=author_id, followers_count__gte=pull_threshold()).exists()
+
+
+def pulled_followees(user_id):
+    """当前用户关注的、需要读取时拉取的作者"""
+    if not hybrid_enabled():
+        return []
+    from user.models import User
+    followees = Follow.objects.filter(follower_id=user_id, status='active').values('followee_id')
+    return list(User.objects.filter(id__in=followees, followers_count__gte=pull_threshold())
+                .values_list('id', flat=True))
+
+
+def followed_queryset(user_id, target_type):
+    """当前用户关注流的查询集（未排序、未分页），由视图继续过滤和分页"""
+    model, author_field = get_feed_source(target_type)
+    if inbox_enabled():
+        inbox = FeedInbox.objects.filter(user_id=user_id, type=target_type).values('target_id')
+        condition = Q(id__in=inbox)
+        pulled = pulled_followees(user_id)
+        if pulled:
+            condition |= Q(**{f'{author_field}__in': pulled})
+        return model.objects.filter(condition)
+    followees = Follow.objects.filter(follower_id=user_id, status='active').values('followee_id')
+    return model.objects.filter(**{f'{author_field}__in': followees})
+
+
+def fan_out(target_type, target_id):
+    """把新发布的内容/动态写入作者所有粉丝的收件箱，返回写入的条数"""
+    model, author_field = get_feed_source(target_type)
+    row = model.objects.filter(pk=target_id).values_list(author_field, 'create_time').first()
+    if row is None or row[0] is None:
+        return 0
+    author_id, create_time = row
+    if is_pulled_author(author_id):
+        # 粉丝数很多的作者不扇出，读取时从最近内容缓存拉取
+        invalidate_recent_posts(target_type, author_id)
+        return 0
+    batch_size = getattr(settings, 'FEED_FANOUT_BATCH_SIZE', 1000)
+    followers = Follow.objects.filter(followee_id=author_id, status='active').order_by('follower_id')
+
+    # 周期性裁剪本次涉及的收件箱，避免每次发布都扫描所有粉丝的收件箱
+    trim = next(_fan_out_counter) % getattr(settings, 'FEED_TRIM_EVERY', 20) == 0
+    written = 0
+    last_follower_id = None
+    while True:
+        batch = followers if last_follower_id is None else followers.filter(follower_id__gt=last_follower_id)
+        follower_ids = list(batch.values_list('follower_id', flat=True).distinct()[:batch_size])
+        if not follower_ids:
+            break
+        FeedInbox.objects.bulk_create([
+            FeedInbox(user_id=follower_id, type=target_type, target_id=target_id,
+                      author_id=author_id, create_time=create_time)
+            for follower_id in follower_ids
+        ], ignore_conflicts=True)
+        written += len(follower_ids)
+        if trim:
+            trim_inboxes(follower_ids, target_type)
+        if len(follower_ids) < batch_size:
+            break
+        last_follower_id = follower_ids[-1]
+    return written
+
+
+def backfill(follower_id, followee_id):
+    """关注后把被关注者最近的内容和动态写入关注者的收件箱"""
+    if not Follow.objects.filter(follower_id=follower_id, followee_id=followee_id, status='active').exists():
+        # 后台执行前已经取消关注
+        return 0
+    if is_pulled_author(followee_id):
+        # 读取时拉取的作者不需要回填
+        return 0
+    size = getattr(settings, 'FEED_BACKFILL_SIZE', 50)
+    written = 0
+    for target_type in FEED_TYPES:
+        model, author_field = get_feed_source(target_type)
+        recent = model.objects.filter(**{author_field: followee_id}).order_by('-create_time', '-id') \
+            .values_list('id', 'create_time')[:size]
+        rows = [
+            FeedInbox(user_id=follower_id, type=target_type, target_id=target_id,
+                      author_id=followee_id, create_time=create_time)
+            for target_id, create_time in recent
+        ]
+        FeedInbox.objects.bulk_create(rows, ignore_conflicts=True)
+        written += len(rows)
+    trim_inboxes([follower_id])
+    return written
+
+
+def prune(follower_id, followee_id):
+    """取消关注后删除该作者在关注者收件箱中的记录"""
+    if Follow.objects.filter(follower_id=follower_id, followee_id=followee_id, status='active').exists():
+        # 后台执行前又重新关注了
+        return 0
+    deleted, _ = FeedInbox.objects.filter(user_id=follower_id, author_id=followee_id).delete()
+    return deleted
+
+
+def remove_target(target_type, target_id):
+    """内容/动态删除后清理所有收件箱中的记录"""
+    deleted, _ = FeedInbox.objects.filter(type=target_type, target_id=target_id).delete()
+    return deleted
+
+
+def trim_inboxes(user_ids, target_type=None, depth=None):
+    """
+    删除超出深度的收件箱记录：按 (用户, 类型) 分区、按发布时间倒序编号，删除编号大于深度的行
+    """
+    depth = depth or inbox_depth()
+    inbox = FeedInbox.objects.filter(user_id__in=user_ids)
+    if target_type:
+        inbox = inbox.filter(type=target_type)
+    overflow = inbox.annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('user_id'), F('type')],
+            order_by=[F('create_time').desc(), F('target_id').desc()],
+        )
+    ).filter(position__gt=depth).values_list('id', flat=True)
+    ids = list(overflow)
+    if not ids:
+        return 0
+    deleted, _ = FeedInbox.objects.filter(id__in=ids).delete()
+    return deleted
+
+
+def rebuild_inboxes(first_user_id, last_user_id, depth=None):
+    """
+    重建 [first_user_id, last_user_id] 区间内用户的收件箱：
+    按关注关系取每个用户关注的作者最近的 depth 条内容/动态，一条 INSERT ... SELECT 写入
+    """
+    depth = depth or inbox_depth()
+    quote = connection.ops.quote_name
+    FeedInbox.objects.filter(user_id__gte=first_user_id, user_id__lte=last_user_id).delete()
+    written = 0
+    with connection.cursor() as cursor:
+        for target_type in FEED_TYPES:
+            model, author_field = get_feed_source(target_type)
+            author_column = quote(model._meta.get_field(author_field).column)
+            params = [target_type, 'active', first_user_id, last_user_id]
+            pulled_filter = ''
+            if hybrid_enabled():
+                # 读取时拉取的作者不写入收件箱
+                from user.models import User
+                pulled_filter = f' AND followee_id NOT IN (SELECT id FROM {quote(User._meta.db_table)} WHERE followers_count >= %s)'
+                params.append(pull_threshold())
+            cursor.execute(
+                f'INSERT INTO {quote(FeedInbox._meta.db_table)} (user_id, type, target_id, author_id, create_time) '
+                f'SELECT user_id, %s, id, author_id, create_time FROM ('
+                f'  SELECT f.follower_id AS user_id, t.id, t.{author_column} AS author_id, t.create_time,'
+                f'         ROW_NUMBER() OVER (PARTITION BY f.follower_id ORDER BY t.create_time DESC, t.id DESC) AS position'
+                f'  FROM (SELECT DISTINCT follower_id, followee_id FROM {quote(Follow._meta.db_table)}'
+                f'        WHERE status = %s AND follower_id BETWEEN %s AND %s{pulled_filter}) f'
+                f'  JOIN {quote(model._meta.db_table)} t ON t.{author_column} = f.followee_id'
+                f') ranked WHERE position <= %s '
+                f'ON CONFLICT DO NOTHING',
+                params + [depth],
+            )
+            written += cursor.rowcount
+    return written
+
+
+
+def recent_posts_key(target_type, author_id):
+    return f'feed:recent:{target_type}:{author_id}'
+
+
+def invalidate_recent_posts(target_type, author_id):
+    cache.delete(recent_posts_key(target_type, author_id))
+
+
+def recent_posts(target_type, author_ids):
+    """
+    作者最近的内容/动态 {作者ID: [(发布时间, ID), ...]}，按发布时间倒序，每人最多 FEED_PULL_RECENT_DEPTH 条
+    优先读缓存，未命中的作者用一条窗口函数查询补齐
+    """
+    if not author_ids:
+        return {}
+    keys = {recent_posts_key(target_type, author_id): author_id for author_id in author_ids}
+    cached = cache.get_many(list(keys))
+    posts = {keys[key]: value for key, value in cached.items()}
+    missing = [author_id for author_id in author_ids if author_id not in posts]
+    profile_registry.observe(f'feed.{target_type}.pull_cache_misses', len(missing), FEED_SIZE_BUCKETS)
+    if missing:
+        model, author_field = get_feed_source(target_type)
+        depth = getattr(settings, 'FEED_PULL_RECENT_DEPTH', 100)
+        rows = model.objects.filter(**{f'{author_field}__in': missing}).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F(author_field)],
+                order_by=[F('create_time').desc(), F('id').desc()],
+            )
+        ).filter(position__lte=depth).order_by(author_field, '-create_time', '-id') \
+            .values_list(author_field, 'create_time', 'id')
+        loaded = defaultdict(list)
+        for author_id, create_time, target_id in rows:
+            loaded[author_id].append((create_time, target_id))
+        fresh = {author_id: loaded.get(author_id, []) for author_id in missing}
+        cache.set_many({recent_posts_key(target_type, author_id): value for author_id, value in fresh.items()},
+                       getattr(settings, 'FEED_PULL_CACHE_TTL', 60))
+        posts.update(fresh)
+    return posts
+
+
+def _author_posts_after(target_type, author_id, after, limit):
+    """缓存中的最近内容已经翻完时，直接按作者查询更早的内容"""
+    model, author_field = get_feed_source(target_type)
+    queryset = model.objects.filter(**{author_field: author_id})
+    if after:
+        queryset = queryset.filter(Q(create_time__lt=after[0]) | Q(create_time=after[0], id__lt=after[1]))
+    return list(queryset.order_by('-create_time', '-id').values_list('create_time', 'id')[:limit])
+
+
+def merged_feed(user_id, target_type, after, limit):
+    """
+    推拉结合读取关注流：收件箱（推）与拉取作者的最近内容（拉）按 (发布时间, ID) 倒序 k 路归并
+    after 为上一页最后一条的 (发布时间, ID)，返回排在其后的最多 limit + 1 个对象
+    """
+    model, _ = get_feed_source(target_type)
+    pulled = pulled_followees(user_id)
+
+    started = time.perf_counter()
+    inbox = FeedInbox.objects.filter(user_id=user_id, type=target_type)
+    if pulled:
+        # 作者粉丝数超过阈值之前扇出的记录改由拉取一侧提供，避免重复
+        inbox = inbox.exclude(author_id__in=pulled)
+    if after:
+        inbox = inbox.filter(Q(create_time__lt=after[0]) | Q(create_time=after[0], target_id__lt=after[1]))
+    pushed = list(inbox.order_by('-create_time', '-target_id').values_list('create_time', 'target_id')[:limit + 1])
+    push_done = time.perf_counter()
+
+    streams = [pushed]
+    pulled_count = 0
+    depth = getattr(settings, 'FEED_PULL_RECENT_DEPTH', 100)
+    for author_id, posts in recent_posts(target_type, pulled).items():
+        remaining = [post for post in posts if after is None or post < after][:limit + 1]
+        if len(remaining) <= limit and len(posts) >= depth:
+            # 缓存窗口不够本页使用，可能还有更早的内容
+            remaining = _author_posts_after(target_type, author_id, after, limit + 1)
+        pulled_count += len(remaining)
+        streams.append(remaining)
+    pull_done = time.perf_counter()
+
+    page = list(itertools.islice(heapq.merge(*streams, reverse=True), limit + 1))
+    merge_done = time.perf_counter()
+
+    prefix = f'feed.{target_type}'
+    profile_registry.observe(f'{prefix}.push_ms', (push_done - started) * 1000, FEED_MS_BUCKETS)
+    profile_registry.observe(f'{prefix}.pull_ms', (pull_done - push_done) * 1000, FEED_MS_BUCKETS)
+    profile_registry.observe(f'{prefix}.merge_ms', (merge_done - pull_done) * 1000, FEED_MS_BUCKETS)
+    profile_registry.observe(f'{prefix}.push_items', len(pushed), FEED_SIZE_BUCKETS)
+    profile_registry.observe(f'{prefix}.pull_items', pulled_count, FEED_SIZE_BUCKETS)
+    profile_registry.observe(f'{prefix}.pull_authors', len(pulled), FEED_SIZE_BUCKETS)
+
+    ids = [target_id for _, target_id in page]
+    objects = model.objects.in_bulk(ids)
+    return [objects[target_id] for target_id in ids if target_id in objects]
+
+
+def paginate_followed(view, request, target_type):
+    """
+    关注流默认排序的游标分页请求走推拉结合；带筛选、搜索、排序或页码分页的请求返回 None，
+    由视图使用 followed_queryset 的查询集分页
+    """
+    if not hybrid_enabled():
+        return None
+    paginator = view.paginator
+    if paginator is None or not paginator.use_cursor(request, view):
+        return None
+    params = request.query_params
+    if any(params.get(name) for name in getattr(view, 'filterset_fields', ())) or params.get('search'):
+        return None
+    if params.get('ordering') not in (None, '', '-create_time'):
+        return None
+    model, _ = get_feed_source(target_type)
+    return paginator.paginate_merged(
+        request, model, lambda after, limit: merged_feed(request.user.id, target_type, after, limit), view=view
+    )
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+
+from follows import feed
+from follows.models import FeedInbox
+from user.models import User
+
+
+class Command(BaseCommand):
+    help = '按关注关系重建关注流收件箱，或只裁剪超出深度的记录'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', help='只处理指定用户ID，可重复指定')
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的用户ID区间大小')
+        parser.add_argument('--depth', type=int, help='每个用户每种类型保留的条数，默认 FEED_INBOX_DEPTH')
+        parser.add_argument('--trim-only', action='store_true', help='不重建，只删除超出深度的记录')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，降低对数据库的压力')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size 必须大于0')
+        depth = options['depth'] or feed.inbox_depth()
+
+        if options['user']:
+            batches = [(user_id, user_id) for user_id in sorted(set(options['user']))]
+        else:
+            bounds = User.objects.aggregate(low=Min('id'), high=Max('id'))
+            if bounds['low'] is None:
+                return
+            batches = [(start, min(start + batch_size - 1, bounds['high']))
+                       for start in range(bounds['low'], bounds['high'] + 1, batch_size)]
+
+        begin = time.monotonic()
+        total = 0
+        for first, last in batches:
+            with transaction.atomic():
+                if options['trim_only']:
+                    user_ids = list(FeedInbox.objects.filter(user_id__gte=first, user_id__lte=last)
+                                    .values_list('user_id', flat=True).distinct())
+                    count = feed.trim_inboxes(user_ids, depth=depth) if user_ids else 0
+                else:
+                    count = feed.rebuild_inboxes(first, last, depth=depth)
+            total += count
+            if options['verbosity'] > 1:
+                self.stdout.write(f'用户 {first}-{last}: {count}')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        action = '删除' if options['trim_only'] else '写入'
+        self.stdout.write(self.style.SUCCESS(
+            f'完成，共{action} {total} 条收件箱记录，耗时 {time.monotonic() - begin:.2f}s'
+        ))
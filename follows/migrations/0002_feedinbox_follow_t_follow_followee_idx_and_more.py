@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('follows', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedInbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.IntegerField(verbose_name='收件人')),
+                ('type', models.CharField(choices=[('content', '内容'), ('dynamic', '动态')], max_length=20)),
+                ('target_id', models.IntegerField(verbose_name='内容或动态ID')),
+                ('author_id', models.IntegerField(verbose_name='作者')),
+                ('create_time', models.DateTimeField(verbose_name='内容或动态的发布时间')),
+            ],
+            options={
+                'db_table': 't_feed_inbox',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['followee_id', 'status'], name='t_follow_followee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedinbox',
+            index=models.Index(fields=['user_id', 'type', '-create_time', '-target_id'], name='t_feed_inbox_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedinbox',
+            index=models.Index(fields=['user_id', 'author_id'], name='t_feed_inbox_author_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedinbox',
+            index=models.Index(fields=['type', 'target_id'], name='t_feed_inbox_target_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedinbox',
+            constraint=models.UniqueConstraint(fields=('user_id', 'type', 'target_id'), name='t_feed_inbox_unique'),
+        ),
+    ]
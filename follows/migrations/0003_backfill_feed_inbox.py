@@ -0,0 +1,34 @@
+from django.db import migrations
+
+# 与 follows.feed.rebuild_inboxes 相同：每个用户每种类型取关注的作者最近 500 条（FEED_INBOX_DEPTH 默认值）
+BACKFILL_SQL = """
+    INSERT INTO t_feed_inbox (user_id, type, target_id, author_id, create_time)
+    SELECT user_id, '{type}', id, author_id, create_time FROM (
+        SELECT f.follower_id AS user_id, t.id, t.{author} AS author_id, t.create_time,
+               ROW_NUMBER() OVER (PARTITION BY f.follower_id ORDER BY t.create_time DESC, t.id DESC) AS position
+        FROM (SELECT DISTINCT follower_id, followee_id FROM t_follow WHERE status = 'active') f
+        JOIN {table} t ON t.{author} = f.followee_id
+    ) ranked WHERE position <= 500
+    ON CONFLICT DO NOTHING
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('follows', '0002_feedinbox_follow_t_follow_followee_idx_and_more'),
+        ('contents', '0002_initial'),
+        ('societies', '0002_initial'),
+    ]
+
+    # 收件箱上线前发布的内容和动态没有扇出，按已有的关注关系回填，否则关注流只显示上线后发布的内容
+    operations = [
+        migrations.RunSQL(
+            sql=BACKFILL_SQL.format(type='content', table='t_content', author='author_id'),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.RunSQL(
+            sql=BACKFILL_SQL.format(type='dynamic', table='t_social_dynamic', author='user_id'),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
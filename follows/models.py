@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 
 from societies.models import Dynamic
+from middleware.counters import apply_counter_deltas, status_delta
 from user.models import User
 
 
@@ -22,6 +23,10 @@ class Follow(models.Model):
     class Meta:
         db_table = 't_follow'
         ordering = ['create_time']
+        indexes = [
+            # 发布时按作者查找粉丝做关注流扇出
+            models.Index(fields=['followee_id', 'status'], name='t_follow_followee_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 自动填充用户信息
@@ -41,50 +46,52 @@ class Follow(models.Model):
             except User.DoesNotExist:
                 pass
 
-        # 检查是否是状态更新
-        old_status = None
-        if self.pk:  # 如果是更新操作
-            try:
-                old_instance = Follow.objects.get(pk=self.pk)
-                old_status = old_instance.status
-            except Follow.DoesNotExist:
-                pass
+        # 状态变更和计数更新放在同一事务内，锁住原记录读取旧状态，避免并发切换时计数丢失
+        with transaction.atomic():
+            old_status = None
+            if self.pk:  # 如果是更新操作
+                old_status = Follow.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
 
-        super().save(*args, **kwargs)
-
-        # 更新用户模型中的关注计数字段
-        if old_status != self.status:
-            try:
-                # 更新关注者的关注数量
-                follower_user = User.objects.get(id=self.follower_id)
-                # 更新被关注者的粉丝数量
-                followee_user = User.objects.get(id=self.followee_id)
+            super().save(*args, **kwargs)
 
-                if self.status == 'active' and old_status != 'active':
-                    # 关注，增加计数
-                    follower_user.following_count = follower_user.following_count + 1
-                    followee_user.followers_count = followee_user.followers_count + 1
-                elif self.status == 'inactive' and old_status == 'active':
-                    # 取消关注，减少计数（但不低于0）
-                    follower_user.following_count = max(0, follower_user.following_count - 1)
-                    followee_user.followers_count = max(0, followee_user.followers_count - 1)
-
-                follower_user.save(update_fields=['following_count'])
-                followee_user.save(update_fields=['followers_count'])
-            except User.DoesNotExist:
-                pass
+            # 更新用户模型中的关注计数字段：关注者的关注数量、被关注者的粉丝数量
+            delta = status_delta(old_status, self.status)
+            apply_counter_deltas(User, self.follower_id, following_count=delta)
+            apply_counter_deltas(User, self.followee_id, followers_count=delta)
 
     def delete(self, *args, **kwargs):
         # 删除关注时减少计数
-        if self.status == 'active':
-            try:
-                follower_user = User.objects.get(id=self.follower_id)
-                followee_user = User.objects.get(id=self.followee_id)
-                follower_user.following_count = max(0, follower_user.following_count - 1)
-                followee_user.followers_count = max(0, followee_user.followers_count - 1)
-                follower_user.save(update_fields=['following_count'])
-                followee_user.save(update_fields=['followers_count'])
-            except User.DoesNotExist:
-                pass
+        with transaction.atomic():
+            if self.status == 'active':
+                apply_counter_deltas(User, self.follower_id, following_count=-1)
+                apply_counter_deltas(User, self.followee_id, followers_count=-1)
+            super().delete(*args, **kwargs)
+
 
-        super().delete(*args, **kwargs)
\ No newline at end of file
+class FeedInbox(models.Model):
+    """
+    关注流收件箱
+    作者发布内容或动态时写入每个粉丝的收件箱（扇出），读取关注流时只需要按用户读取收件箱，
+    每个用户每种类型最多保留 FEED_INBOX_DEPTH 条
+    """
+    TYPE_CHOICES = (
+        ('content', '内容'),
+        ('dynamic', '动态'),
+    )
+    user_id = models.IntegerField(verbose_name="收件人")
+    type = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    target_id = models.IntegerField(verbose_name="内容或动态ID")
+    author_id = models.IntegerField(verbose_name="作者")
+    create_time = models.DateTimeField(verbose_name="内容或动态的发布时间")
+
+    class Meta:
+        db_table = 't_feed_inbox'
+        constraints = [
+            models.UniqueConstraint(fields=['user_id', 'type', 'target_id'], name='t_feed_inbox_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['user_id', 'type', '-create_time', '-target_id'], name='t_feed_inbox_user_idx'),
+            # 取消关注时删除该作者的内容、删除内容时清理收件箱
+            models.Index(fields=['user_id', 'author_id'], name='t_feed_inbox_author_idx'),
+            models.Index(fields=['type', 'target_id'], name='t_feed_inbox_target_idx'),
+        ]
@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from contents.models import Content
+from follows import feed
+from middleware.background import submit_on_commit
+from societies.models import Dynamic
+
+FEED_SENDERS = {Content: 'content', Dynamic: 'dynamic'}
+
+
+@receiver(post_save, sender=Content)
+@receiver(post_save, sender=Dynamic)
+def fan_out_on_publish(sender, instance, created, raw=False, **kwargs):
+    """发布内容/动态后在后台写入粉丝的关注流收件箱"""
+    if created and not raw and feed.inbox_enabled():
+        submit_on_commit(feed.fan_out, FEED_SENDERS[sender], instance.pk)
+
+
+@receiver(post_delete, sender=Content)
+@receiver(post_delete, sender=Dynamic)
+def remove_from_inboxes(sender, instance, **kwargs):
+    """删除内容/动态后清理收件箱和作者的最近内容缓存"""
+    if feed.inbox_enabled():
+        target_type = FEED_SENDERS[sender]
+        author_id = instance.author_id if sender is Content else instance.user_id
+        submit_on_commit(feed.remove_target, target_type, instance.pk)
+        if author_id:
+            submit_on_commit(feed.invalidate_recent_posts, target_type, author_id)
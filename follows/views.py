@@ -1,13 +1,16 @@
 from rest_framework.decorators import action
 
+from follows import feed
 from follows.models import Follow
 from rest_framework import filters
 from follows.serializers import FollowSerializer, FollowToggleSerializer
+from middleware.background import submit_on_commit
 from middleware.base_views import BaseViewSet
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 from django_filters.rest_framework import DjangoFilterBackend
 
 from middleware.utils import CustomPagination, ApiResponse
+from search.filters import FullTextSearchFilter
 
 @extend_schema(tags=["关注管理 社区动态/内容"])
 @extend_schema_view(
@@ -21,9 +24,12 @@ class FollowViewSet(BaseViewSet):
     queryset = Follow.objects.all()
     serializer_class = FollowSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['follower_id', 'followee_id']
     search_fields = ['followee_nickname']
+    # search= 按被关注用户的昵称、简介搜索
+    search_type = 'user'
+    search_field = 'followee_id'
 
     def list(self, request, *args, **kwargs):
         # 获取过滤后的查询集
@@ -88,13 +94,20 @@ class FollowViewSet(BaseViewSet):
         else:
             message = "关注成功"
 
+        # 关注后回填被关注者最近的内容到关注流收件箱，取消关注后清理
+        if feed.inbox_enabled():
+            task = feed.backfill if follow.status == 'active' else feed.prune
+            submit_on_commit(task, follower_id, followee_id)
+
         # 返回更新后的关注信息
         result_serializer = FollowSerializer(follow)
         return ApiResponse(data=result_serializer.data, message=message)
 
     def perform_create(self, serializer):
         # 自动设置当前用户为关注者
-        serializer.save(follower_id=self.request.user.id)
+        follow = serializer.save(follower_id=self.request.user.id)
+        if feed.inbox_enabled() and follow.status == 'active':
+            submit_on_commit(feed.backfill, follow.follower_id, follow.followee_id)
 
     def get_queryset(self):
         # 只返回当前用户的关注记录
@@ -4,6 +4,7 @@ from goods.models import Good
 from goods.serializers import GoodSerializer
 from middleware.base_views import BaseViewSet
 from middleware.utils import ApiResponse, CustomPagination
+from search.filters import FullTextSearchFilter
 from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiParameter
 
 @extend_schema_view(
@@ -21,7 +22,7 @@ class GoodViewSet(BaseViewSet):
     queryset = Good.objects.all()
     serializer_class = GoodSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['type', 'description']
     search_fields = ['name', 'title', 'description']
     ordering = ['-create_time']
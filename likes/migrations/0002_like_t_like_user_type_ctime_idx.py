@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('likes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='like',
+            index=models.Index(fields=['user_id', 'type', '-create_time'], name='t_like_user_type_ctime_idx'),
+        ),
+    ]
@@ -1,8 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 
 from contents.models import Content
 from societies.models import Dynamic
 from comments.models import Comment
+from middleware.counters import apply_target_counter_deltas, status_delta
 from user.models import User
 
 class Like(models.Model):
@@ -33,6 +34,10 @@ class Like(models.Model):
         db_table = 't_like'
         ordering = ['-create_time']
         unique_together = ('type', 'target_id', 'user_id')
+        indexes = [
+            # 用户最近的点赞（猜你喜欢按最近互动推荐）
+            models.Index(fields=['user_id', 'type', '-create_time'], name='t_like_user_type_ctime_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 自动填充用户信息
@@ -74,35 +79,15 @@ class Like(models.Model):
             except Comment.DoesNotExist:
                 pass
 
-        # 检查是否是状态更新
-        old_status = None
-        if self.pk:  # 如果是更新操作
-            try:
-                old_instance = Like.objects.get(pk=self.pk)
-                old_status = old_instance.status
-            except Like.DoesNotExist:
-                pass
-
-        super().save(*args, **kwargs)
+        # 状态变更和计数更新放在同一事务内，锁住原记录读取旧状态，避免并发切换时计数丢失
+        with transaction.atomic():
+            old_status = None
+            if self.pk:  # 如果是更新操作
+                old_status = Like.objects.select_for_update().filter(pk=self.pk).values_list('status', flat=True).first()
 
-        # 只有在状态发生变化时才更新目标对象的like_count
-        if self.target_id and old_status != self.status:
-            try:
-                if self.type == 'dynamic':
-                    target = Dynamic.objects.get(id=self.target_id)
-                elif self.type == 'content':
-                    target = Content.objects.get(id=self.target_id)
-                elif self.type == 'comment':
-                    target = Comment.objects.get(id=self.target_id)
-                else:
-                    return
+            super().save(*args, **kwargs)
 
-                if self.status == 'active' and old_status != 'active':
-                    # 点赞，增加计数
-                    target.like_count = target.like_count + 1
-                elif self.status == 'inactive' and old_status == 'active':
-                    # 取消点赞，减少计数（但不低于0）
-                    target.like_count = max(0, target.like_count - 1)
-                target.save(update_fields=['like_count'])
-            except (Dynamic.DoesNotExist, Content.DoesNotExist, Comment.DoesNotExist):
-                pass
+            # 只有在状态发生变化时才更新目标对象的like_count
+            if self.target_id:
+                apply_target_counter_deltas(self.type, self.target_id,
+                                            like_count=status_delta(old_status, self.status))
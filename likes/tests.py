@@ -1,3 +1,85 @@
-from django.test import TestCase
+import threading
+import unittest
 
-# Create your tests here.
+from django.db import connection, connections
+from django.test import TransactionTestCase
+
+from likes.models import Like
+from societies.models import Dynamic
+from user.models import User
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', '并发计数测试需要 PostgreSQL 行锁')
+class LikeCounterConcurrencyTests(TransactionTestCase):
+    """并发点赞/取消点赞时 like_count 不丢失更新"""
+    workers = 8
+
+    def setUp(self):
+        self.author = User.objects.create(username='counter_author')
+        self.users = [User.objects.create(username=f'counter_user_{index}') for index in range(self.workers)]
+        self.dynamic = Dynamic.objects.create(user=self.author, title='并发计数')
+
+    def run_parallel(self, functions):
+        """所有线程在同一时刻开始执行，放大竞争"""
+        barrier = threading.Barrier(len(functions))
+        errors = []
+
+        def run(function):
+            try:
+                barrier.wait()
+                function()
+            except Exception as error:  # 线程内的异常带回主线程
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=run, args=(function,)) for function in functions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def like_count(self):
+        return Dynamic.objects.values_list('like_count', flat=True).get(pk=self.dynamic.pk)
+
+    def active_likes(self):
+        return Like.objects.filter(type='dynamic', target_id=self.dynamic.pk, status='active').count()
+
+    def test_parallel_likes_from_different_users(self):
+        self.run_parallel([
+            lambda user=user: Like(type='dynamic', target_id=self.dynamic.pk, user_id=user.id).save()
+            for user in self.users
+        ])
+        self.assertEqual(self.like_count(), self.workers)
+        self.assertEqual(self.like_count(), self.active_likes())
+
+    def test_parallel_toggles_keep_counter_consistent(self):
+        likes = [Like.objects.create(type='dynamic', target_id=self.dynamic.pk, user_id=user.id) for user in self.users]
+        self.assertEqual(self.like_count(), self.workers)
+
+        def toggle(like_id, times):
+            for _ in range(times):
+                like = Like.objects.get(pk=like_id)
+                like.status = 'inactive' if like.status == 'active' else 'active'
+                like.save()
+
+        # 奇数次切换后为取消状态，偶数次切换后恢复点赞
+        self.run_parallel([
+            lambda like=like, index=index: toggle(like.pk, 3 if index % 2 else 4)
+            for index, like in enumerate(likes)
+        ])
+        self.assertEqual(self.like_count(), self.workers // 2)
+        self.assertEqual(self.like_count(), self.active_likes())
+
+    def test_parallel_cancel_of_same_like_counts_once(self):
+        like = Like.objects.create(type='dynamic', target_id=self.dynamic.pk, user_id=self.users[0].id)
+
+        def cancel():
+            stale = Like.objects.get(pk=like.pk)
+            stale.status = 'inactive'
+            stale.save()
+
+        self.run_parallel([cancel for _ in range(self.workers)])
+        self.assertEqual(self.like_count(), 0)
+        self.assertEqual(self.active_likes(), 0)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class MiddlewareConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'middleware'
+
+    def ready(self):
+        # 注册信号（token 缓存失效等）
+        from middleware import signals  # noqa: F401
+        # 热度分随计数变化增量更新
+        from middleware import hot_score
+        hot_score.connect()
@@ -0,0 +1,64 @@
+"""
+进程内后台任务
+用于不需要在请求内完成的写入（如关注流扇出），线程池大小由 BACKGROUND_TASK_WORKERS 控制。
+BACKGROUND_TASKS_SYNC 为 True 时在调用线程内同步执行（测试、命令行中使用）。
+进程退出时会等待已提交的任务执行完成。
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+                    thread_name_prefix='background-task',
+                )
+    return _executor
+
+
+def _run(function, args, kwargs):
+    try:
+        return function(*args, **kwargs)
+    except Exception:
+        logger.exception('后台任务执行失败: %s', getattr(function, '__name__', function))
+    finally:
+        # 工作线程使用独立的数据库连接，任务结束后关闭
+        connections.close_all()
+
+
+def submit(function, *args, **kwargs):
+    """提交后台任务"""
+    if getattr(settings, 'BACKGROUND_TASKS_SYNC', False):
+        try:
+            return function(*args, **kwargs)
+        except Exception:
+            logger.exception('后台任务执行失败: %s', getattr(function, '__name__', function))
+            return None
+    return get_executor().submit(_run, function, args, kwargs)
+
+
+def submit_on_commit(function, *args, **kwargs):
+    """当前事务提交后再提交后台任务，避免任务读不到未提交的数据；不在事务中时立即提交"""
+    transaction.on_commit(lambda: submit(function, *args, **kwargs))
+
+
+def shutdown():
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+
+
+atexit.register(shutdown)
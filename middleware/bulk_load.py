@@ -0,0 +1,159 @@
+"""
+批量写入工具
+PostgreSQL 下使用 COPY ... FROM STDIN（psycopg2 copy_expert），其他情况回退为分批 bulk_create。
+行数据按 fields 顺序传入元组，未指定的字段使用模型字段的默认值；主键需要调用方预先分配。
+"""
+import csv
+import datetime
+import io
+import json
+from contextlib import contextmanager
+
+from django.contrib.postgres.fields import ArrayField
+from django.core.management.color import no_style
+from django.db import connections, models
+from django.utils import timezone
+
+
+def supports_copy(using='default'):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    connection.ensure_connection()
+    with connection.connection.cursor() as cursor:
+        return hasattr(cursor, 'copy_expert')
+
+
+def reset_sequences(model_list, using='default'):
+    """预分配主键写入后，把自增序列重置到当前最大ID"""
+    connection = connections[using]
+    statements = connection.ops.sequence_reset_sql(no_style(), model_list)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+@contextmanager
+def keep_explicit_times(model):
+    """bulk_create 时保留显式传入的 create_time/update_time（临时关闭 auto_now/auto_now_add）"""
+    changed = []
+    for field in model._meta.concrete_fields:
+        if isinstance(field, models.DateField) and (field.auto_now or field.auto_now_add):
+            changed.append((field, field.auto_now, field.auto_now_add))
+            field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in changed:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def _copy_converter(field):
+    if isinstance(field, models.JSONField):
+        return lambda value: json.dumps(value, ensure_ascii=False)
+    if isinstance(field, ArrayField):
+        return _format_array
+    if isinstance(field, models.BooleanField):
+        return lambda value: 't' if value else 'f'
+    if isinstance(field, models.DateTimeField):
+        return _format_datetime
+    return None
+
+
+def _to_datetime(value):
+    # 支持直接传入时间戳（秒），生成大量数据时比构造 datetime 更省
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+    return value
+
+
+def _format_datetime(value):
+    return _to_datetime(value).isoformat()
+
+
+def _format_array(value):
+    """一维数组写成 PostgreSQL 数组字面量，例如 [1, 2] -> {1,2}，字符串元素加双引号并转义"""
+    items = []
+    for item in value:
+        if item is None:
+            items.append('NULL')
+        elif isinstance(item, (int, float)) and not isinstance(item, bool):
+            items.append(str(item))
+        else:
+            items.append('"' + str(item).replace('\\', '\\\\').replace('"', '\\"') + '"')
+    return '{' + ','.join(items) + '}'
+
+
+class TableWriter:
+    """
+    单表批量写入器
+    writer = TableWriter(Like, ['id', 'type', 'target_id', 'user_id'], chunk_size=10000)
+    writer.add((1, 'content', 10, 3)); ...; writer.close()
+    """
+
+    def __init__(self, model, fields, chunk_size=10000, use_copy=True, using='default'):
+        self.model = model
+        self.using = using
+        self.chunk_size = chunk_size
+        self.use_copy = use_copy and supports_copy(using)
+        self.concrete_fields = list(model._meta.concrete_fields)
+        attnames = [field.attname for field in self.concrete_fields]
+        self.positions = [attnames.index(name) for name in fields]
+        # 未指定的字段使用模型默认值，auto_now/auto_now_add 字段使用当前时间
+        now = timezone.now()
+        self.template = [
+            now if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False) else field.get_default()
+            for field in self.concrete_fields
+        ]
+        self.converters = [_copy_converter(field) for field in self.concrete_fields]
+        self.rows = []
+        self.written = 0
+
+    def add(self, values):
+        row = list(self.template)
+        for position, value in zip(self.positions, values):
+            row[position] = value
+        self.rows.append(row)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            self._copy(self.rows)
+        else:
+            self._bulk_create(self.rows)
+        self.written += len(self.rows)
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        return self.written
+
+    def _copy(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        converters = self.converters
+        for row in rows:
+            writer.writerow([
+                # NULL 使用 \N 表示，区别于空字符串
+                r'\N' if value is None else (converter(value) if converter else value)
+                for value, converter in zip(row, converters)
+            ])
+        buffer.seek(0)
+        columns = ', '.join(connections[self.using].ops.quote_name(field.column) for field in self.concrete_fields)
+        table = connections[self.using].ops.quote_name(self.model._meta.db_table)
+        with connections[self.using].cursor() as cursor:
+            cursor.cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+
+    def _bulk_create(self, rows):
+        attnames = [field.attname for field in self.concrete_fields]
+        objects = []
+        for row in rows:
+            values = [_to_datetime(value) if isinstance(field, models.DateTimeField) else value
+                      for field, value in zip(self.concrete_fields, row)]
+            objects.append(self.model(**dict(zip(attnames, values))))
+        with keep_explicit_times(self.model):
+            self.model.objects.using(self.using).bulk_create(objects, batch_size=self.chunk_size)
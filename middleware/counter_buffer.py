@@ -0,0 +1,206 @@
+"""
+高频计数（浏览数、分享数）的写后缓冲
+增量先在进程内存中按 (模型, ID, 字段) 累加，由后台线程定期批量写入：
+每个模型一条 UPDATE ... FROM (VALUES ...)，不再每次事件都写热点行。
+- 内存有上限：待写入的 (模型, ID) 数量超过 COUNTER_BUFFER_MAX_KEYS 时由调用线程立即写入（在事务中时等提交后写入）
+- 进程退出时（atexit）写入剩余增量
+- 读取时可以通过 apply_pending 叠加尚未写入的增量（包括正在写入、尚未提交的），保证返回的计数单调不减
+- 每次写入后调用 register_flush_hook 注册的回调（例如重新计算热度分）
+COUNTER_BUFFER_ENABLED 关闭时直接调用 middleware.counters 同步更新。
+"""
+import atexit
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+from middleware.counters import apply_counter_deltas
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+
+    def __init__(self):
+        self._flush_hooks = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # {model: {pk: {field: delta}}}
+        self._pending = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        # 正在写入的增量 {model: {pk: {field: delta}}}，提交（或放回缓冲）后才移除
+        self._inflight = {}
+        self._size = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'COUNTER_BUFFER_ENABLED', True)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'COUNTER_BUFFER_FLUSH_INTERVAL', 5)
+
+    @property
+    def max_keys(self):
+        return getattr(settings, 'COUNTER_BUFFER_MAX_KEYS', 10000)
+
+    def add(self, model, pk, field, delta=1):
+        """记录一次增量"""
+        if pk is None or not delta:
+            return
+        if not self.enabled:
+            apply_counter_deltas(model, pk, **{field: delta})
+            return
+        if self._pid != os.getpid():
+            # fork 之后的子进程使用自己的缓冲和线程
+            self._reset()
+        with self._lock:
+            rows = self._pending[model]
+            if pk not in rows:
+                self._size += 1
+            rows[pk][field] += delta
+            full = self._size >= self.max_keys
+        self.ensure_started()
+        if full:
+            # 调用方在事务中时，等事务提交后再写入，避免写入的增量在提交前对其他连接不可见
+            transaction.on_commit(self.flush)
+
+    def _deltas(self, model, pk):
+        """缓冲中和正在写入的增量之和（调用方持有 _lock）"""
+        result = defaultdict(int)
+        for source in (self._pending, self._inflight):
+            rows = source.get(model) or {}
+            for field, delta in rows.get(pk, {}).items():
+                result[field] += delta
+        return result
+
+    def pending(self, model, pk, field):
+        """尚未写入数据库的增量"""
+        with self._lock:
+            return self._deltas(model, pk).get(field, 0)
+
+    def apply_pending(self, instances, fields=None):
+        """把尚未写入的增量叠加到实例（单个实例或列表）上，只修改内存中的值"""
+        if instances is None:
+            return instances
+        items = instances if isinstance(instances, (list, tuple)) else [instances]
+        with self._lock:
+            for instance in items:
+                for field, delta in self._deltas(type(instance), instance.pk).items():
+                    if fields is None or field in fields:
+                        setattr(instance, field, (getattr(instance, field) or 0) + delta)
+        return instances
+
+    def flush(self):
+        """把当前缓冲的增量写入数据库，返回写入的行数"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+                self._inflight = dict(pending)
+                self._size = 0
+            written = 0
+            for model, rows in pending.items():
+                try:
+                    written += self._flush_model(model, rows)
+                except Exception:
+                    logger.exception('计数缓冲写入失败，增量将在下次重试: %s', model._meta.label)
+                    self._restore(model, rows)
+                else:
+                    with self._lock:
+                        self._inflight.pop(model, None)
+            for hook in self._flush_hooks:
+                try:
+                    hook(pending)
+                except Exception:
+                    logger.exception('计数缓冲写入回调失败: %s', getattr(hook, '__name__', hook))
+            return written
+
+    def register_flush_hook(self, hook):
+        """注册写入后的回调 hook(flushed)，flushed 为本次写入的 {模型: {ID: {字段: 增量}}}，后台线程每轮都会调用"""
+        if hook not in self._flush_hooks:
+            self._flush_hooks.append(hook)
+
+    def _restore(self, model, rows):
+        """写入失败：增量放回缓冲，同时移出正在写入的部分（同一把锁内，读取时不会重复或遗漏）"""
+        with self._lock:
+            target = self._pending[model]
+            for pk, deltas in rows.items():
+                if pk not in target:
+                    self._size += 1
+                for field, delta in deltas.items():
+                    target[pk][field] += delta
+            self._inflight.pop(model, None)
+
+    @staticmethod
+    def _flush_model(model, rows, chunk_size=1000):
+        """UPDATE t SET f = GREATEST(COALESCE(t.f, 0) + v.f, 0) FROM (VALUES ...) AS v(id, f...) WHERE t.id = v.id"""
+        fields = sorted({field for deltas in rows.values() for field in deltas})
+        if not fields:
+            return 0
+        quote = connection.ops.quote_name
+        opts = model._meta
+        pk_column = quote(opts.pk.column)
+        columns = [quote(opts.get_field(field).column) for field in fields]
+        assignments = ', '.join(
+            f'{column} = GREATEST(COALESCE(t.{column}, 0) + v.{column}, 0)' for column in columns
+        )
+        items = list(rows.items())
+        written = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                placeholders = ', '.join(
+                    '(' + ', '.join(['%s::bigint'] * (len(fields) + 1)) + ')' for _ in chunk
+                )
+                params = []
+                for pk, deltas in chunk:
+                    params.append(pk)
+                    params.extend(deltas.get(field, 0) for field in fields)
+                cursor.execute(
+                    f'UPDATE {quote(opts.db_table)} AS t SET {assignments} '
+                    f'FROM (VALUES {placeholders}) AS v({pk_column}, {", ".join(columns)}) '
+                    f'WHERE t.{pk_column} = v.{pk_column}',
+                    params,
+                )
+                written += cursor.rowcount
+        return written
+
+    def ensure_started(self):
+        """启动后台写入线程（已启动时不做处理）"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='counter-buffer-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            finally:
+                # 后台线程使用独立的数据库连接，每轮结束后关闭
+                connections.close_all()
+
+    def shutdown(self):
+        """停止后台线程并写入剩余增量"""
+        self._stop.set()
+        if self._pid == os.getpid():
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('退出时写入计数缓冲失败')
+
+
+counter_buffer = CounterBuffer()
+atexit.register(counter_buffer.shutdown)
@@ -0,0 +1,84 @@
+"""
+冗余计数字段（点赞数、收藏数、点踩数、评论数、分享数、评分、粉丝数等）的原子更新
+统一使用一条 UPDATE ... SET x = GREATEST(COALESCE(x, 0) + delta, 0)，不再先查询再保存，
+调用方需要在修改状态的同一事务内调用，保证状态和计数同时提交或回滚。
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce, Greatest
+
+# 计数更新成功、所在事务提交后的回调（例如热度分标记需要重新计算），签名 listener(model, pk, fields)
+# 在提交后调用，回调里的后台线程读取到的一定是新的计数
+counter_listeners = []
+
+
+def get_target_model(target_type):
+    """点赞/收藏/点踩/评论表中的 type 对应的模型"""
+    if target_type == 'content':
+        from contents.models import Content
+        return Content
+    if target_type == 'dynamic':
+        from societies.models import Dynamic
+        return Dynamic
+    if target_type == 'comment':
+        from comments.models import Comment
+        return Comment
+    return None
+
+
+def status_delta(old_status, new_status, active='active'):
+    """状态变化对应的计数增量：变为有效 +1，取消 -1，其他 0"""
+    if old_status == new_status:
+        return 0
+    if new_status == active:
+        return 1
+    if old_status == active:
+        return -1
+    return 0
+
+
+def counter_expressions(model, deltas):
+    """生成 update() 使用的表达式，跳过增量为0或模型上不存在的字段（例如动态没有 downvote_total）"""
+    expressions = {}
+    for name, delta in deltas.items():
+        if not delta:
+            continue
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            continue
+        zero = Value(0, output_field=field)
+        expressions[name] = Greatest(
+            Coalesce(F(name), zero, output_field=field) + Value(delta, output_field=field),
+            zero,
+            output_field=field,
+        )
+    return expressions
+
+
+def apply_counter_deltas(model, pk, **deltas):
+    """
+    对单行应用计数增量，返回更新的行数（0 表示目标不存在或没有需要更新的字段）
+    apply_counter_deltas(Dynamic, 1, like_count=1, favorite_count=-1)
+    """
+    if model is None or pk is None:
+        return 0
+    expressions = counter_expressions(model, deltas)
+    if not expressions:
+        return 0
+    updated = model.objects.filter(pk=pk).update(**expressions)
+    if updated and counter_listeners:
+        fields = tuple(expressions)
+        transaction.on_commit(lambda: notify_counter_listeners(model, pk, fields))
+    return updated
+
+
+def notify_counter_listeners(model, pk, fields):
+    for listener in counter_listeners:
+        listener(model, pk, fields)
+
+
+def apply_target_counter_deltas(target_type, target_id, **deltas):
+    """按 type（content、dynamic、comment）更新目标对象的计数"""
+    return apply_counter_deltas(get_target_model(target_type), target_id, **deltas)
@@ -0,0 +1,141 @@
+"""
+内容、动态的热度分（hot_score 字段，带 (-hot_score, -id) 索引，对应 ordering=hot）
+热度分 = sign(互动) * log10(1 + |互动|) + (发布时间 - HOT_SCORE_EPOCH) / (HOT_SCORE_DECAY_HOURS 小时)
+互动 = 点赞、评论、收藏、分享、浏览、点踩按 HOT_SCORE_WEIGHTS 加权求和。
+发布时间越晚基础分越高，老内容需要成倍的互动才能排在新内容前面，相当于随时间衰减；
+分数只在计数变化时改变，不需要定时整体衰减：
+- 增量：计数更新（middleware.counters，事务提交后）和计数缓冲写入后标记为待更新，由计数缓冲的后台线程批量重新计算
+- 全量：recompute_hot_scores 命令按主键区间用一条 UPDATE 重新计算（修改权重后或对账后执行）；
+  加入 hot_score 字段的迁移和 seed_data 写入后也会整体计算一次
+"""
+import math
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Cast, Coalesce, Extract, Ln, Sign
+from rest_framework import filters
+
+from .counter_buffer import counter_buffer
+from .counters import counter_listeners
+
+DEFAULT_WEIGHTS = {
+    'like_count': 1.0,
+    'comment_count': 2.0,
+    'favorite_count': 3.0,
+    'share_count': 4.0,
+    'view_count': 0.1,
+    'downvote_total': -2.0,
+}
+
+
+def get_hot_models():
+    from contents.models import Content
+    from societies.models import Dynamic
+    return Content, Dynamic
+
+
+def get_weights(model):
+    """模型上存在的计数字段及其权重（动态没有点踩）"""
+    weights = getattr(settings, 'HOT_SCORE_WEIGHTS', DEFAULT_WEIGHTS)
+    names = {field.name for field in model._meta.get_fields()}
+    return {name: weight for name, weight in weights.items() if name in names and weight}
+
+
+def hot_score_expression(model):
+    """在数据库中计算热度分的表达式，用于 update(hot_score=...)"""
+    engagement = Value(0.0, output_field=FloatField())
+    for name, weight in get_weights(model).items():
+        engagement = engagement + Cast(Coalesce(F(name), Value(0)), FloatField()) * Value(weight, output_field=FloatField())
+    magnitude = Ln(Abs(engagement) + Value(1.0, output_field=FloatField())) / Value(math.log(10))
+    age = (Cast(Extract('create_time', 'epoch'), FloatField()) - Value(float(getattr(settings, 'HOT_SCORE_EPOCH', 1704067200)))) \
+        / Value(getattr(settings, 'HOT_SCORE_DECAY_HOURS', 12) * 3600.0)
+    return Sign(engagement) * magnitude + age
+
+
+def recompute(model, queryset=None):
+    """重新计算查询集（默认全部）的热度分，返回更新的行数"""
+    queryset = model.objects.all() if queryset is None else queryset
+    return queryset.update(hot_score=hot_score_expression(model))
+
+
+class HotScoreTracker:
+    """记录计数有变化、需要重新计算热度分的内容和动态"""
+    batch_size = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = defaultdict(set)
+        self._fields = {}
+
+    def tracked_fields(self, model):
+        if model not in self._fields:
+            self._fields[model] = set(get_weights(model)) if model in get_hot_models() else set()
+        return self._fields[model]
+
+    def mark(self, model, pk):
+        with self._lock:
+            self._dirty[model].add(pk)
+
+    def on_counter_change(self, model, pk, fields):
+        """middleware.counters 的回调：热度相关的计数变化后标记，并确保后台线程在运行"""
+        if self.tracked_fields(model).intersection(fields):
+            self.mark(model, pk)
+            counter_buffer.ensure_started()
+
+    def on_buffer_flush(self, flushed):
+        """计数缓冲写入后的回调：标记本次写入的行，并重新计算所有待更新的热度分"""
+        for model, rows in flushed.items():
+            if self.tracked_fields(model):
+                for pk, deltas in rows.items():
+                    if self.tracked_fields(model).intersection(deltas):
+                        self.mark(model, pk)
+        self.refresh()
+
+    def refresh(self):
+        """按批重新计算待更新的热度分，返回更新的行数"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, defaultdict(set)
+        updated = 0
+        for model, pks in dirty.items():
+            pks = sorted(pks)
+            for start in range(0, len(pks), self.batch_size):
+                updated += recompute(model, model.objects.filter(pk__in=pks[start:start + self.batch_size]))
+        return updated
+
+
+hot_score_tracker = HotScoreTracker()
+
+
+def score_new_item(sender, instance, created, raw=False, **kwargs):
+    """新发布的内容/动态立即计算热度分，否则在热度排序中会排到最后"""
+    if created and not raw:
+        recompute(sender, sender.objects.filter(pk=instance.pk))
+
+
+def connect():
+    """注册计数变化、计数缓冲写入和新建内容的回调（MiddlewareConfig.ready 中调用）"""
+    if hot_score_tracker.on_counter_change not in counter_listeners:
+        counter_listeners.append(hot_score_tracker.on_counter_change)
+    counter_buffer.register_flush_hook(hot_score_tracker.on_buffer_flush)
+    for model in get_hot_models():
+        post_save.connect(score_new_item, sender=model, dispatch_uid=f'hot_score_{model._meta.label_lower}')
+
+
+class HotOrderingFilter(filters.OrderingFilter):
+    """
+    在 OrderingFilter 基础上支持 ordering=hot（热度分倒序）和 ordering=-hot（正序）
+    视图的 ordering_fields 需要包含 hot_score
+    """
+    hot_aliases = {'hot': '-hot_score', '-hot': 'hot_score'}
+
+    def get_ordering(self, request, queryset, view):
+        params = request.query_params.get(self.ordering_param)
+        if params:
+            fields = [self.hot_aliases.get(param.strip(), param.strip()) for param in params.split(',')]
+            ordering = self.remove_invalid_fields(queryset, fields, view, request)
+            if ordering:
+                return ordering
+        return self.get_default_ordering(view)
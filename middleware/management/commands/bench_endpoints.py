@@ -0,0 +1,290 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from middleware.profiling import QueryRecorder
+
+# 压测场景：名称、方法、路径（可使用 {dynamic_id} 等占位符）、请求体
+# 切换类接口按相邻两次请求同一个目标，保证压测结束后数据状态不变
+SCENARIOS = (
+    ('contents_list', 'get', '/api/contents/?pageSize=20', None),
+    ('contents_followed', 'get', '/api/contents/content_follow/?pageSize=20', None),
+    ('guess_you_like', 'get', '/api/contents/guesslike/?count=10', None),
+    ('dynamics_list', 'get', '/api/social/dynamic/?pageSize=20', None),
+    ('dynamics_followed', 'get', '/api/social/dynamic_follow/?pageSize=20', None),
+    ('interaction_messages', 'get', '/api/social/interaction_message/?pageSize=20', None),
+    ('dynamic_comments', 'get', '/api/comments/v2/?target_id={dynamic_id}&pageSize=20', None),
+    ('content_comments', 'get', '/api/comments/v1/?target_id={content_id}&pageSize=20', None),
+    ('chat_messages', 'get', '/api/chat/message/?receiver_id={room_id}&pageSize=20', None),
+    ('chat_sessions', 'get', '/api/chat/session/?pageSize=20', None),
+    ('like_toggle', 'post', '/api/likes/v2/dynamic/toggle/', {'target_id': '{toggle_dynamic_id}'}),
+    ('favourite_toggle', 'post', '/api/favourites/v2/toggle/', {'target_id': '{toggle_dynamic_id}'}),
+    ('follow_toggle', 'post', '/api/follows/v2/toggle/', {'followee_id': '{toggle_user_id}'}),
+    ('login', 'post', '/api/auth/login/', {'username': '{login_username}', 'password': '{login_password}'}),
+)
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        '热点接口压测：通过 Django 测试客户端（进程内）或 --base-url 指定的服务，按并发数请求各接口，'
+        '输出 p50/p95/p99 延迟、每请求SQL数（仅进程内）和吞吐量，可保存 JSON 结果并与基线对比。'
+        '注意：切换类接口会写入数据（成对请求，结束后状态不变）。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenarios', default='', help='只运行指定场景，逗号分隔；--list 查看全部')
+        parser.add_argument('--list', action='store_true', help='列出全部场景')
+        parser.add_argument('--requests', type=int, default=200, help='每个场景的请求数')
+        parser.add_argument('--concurrency', type=int, default=4, help='并发线程数')
+        parser.add_argument('--warmup', type=int, default=5, help='每个场景正式计时前的预热请求数')
+        parser.add_argument('--users', type=int, default=20, help='使用关注数最多的前 N 个用户轮流请求')
+        parser.add_argument('--base-url', default='', help='压测运行中的服务，例如 http://127.0.0.1:8000；不传则进程内压测')
+        parser.add_argument('--login-username', default='bench_login_user', help='登录场景使用的用户（不存在时创建）')
+        parser.add_argument('--login-password', default='bench123456')
+        parser.add_argument('--output', default='', help='结果保存为 JSON 文件')
+        parser.add_argument('--baseline', default='', help='基线 JSON 文件，超过阈值视为性能回退并返回非0')
+        parser.add_argument('--threshold', type=float, default=0.2, help='p95 延迟允许的增幅（0.2 表示 20%%）')
+        parser.add_argument('--query-threshold', type=float, default=0.1, help='每请求SQL数允许的增幅')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, method, path, _ in SCENARIOS:
+                self.stdout.write(f'{name}: {method.upper()} {path}')
+            return
+
+        selected = [name for name in options['scenarios'].split(',') if name]
+        unknown = set(selected) - {name for name, _, _, _ in SCENARIOS}
+        if unknown:
+            raise CommandError(f"未知场景: {', '.join(sorted(unknown))}")
+        scenarios = [scenario for scenario in SCENARIOS if not selected or scenario[0] in selected]
+
+        self.options = options
+        self.tokens = self.prepare_users(options)
+        self.params = self.prepare_params(options)
+        self.local = threading.local()
+
+        results = {}
+        for name, method, path, body in scenarios:
+            results[name] = self.run_scenario(name, method, path, body)
+            self.print_result(name, results[name])
+
+        report = {
+            'meta': {
+                'time': timezone.now().isoformat(),
+                'mode': 'live' if options['base_url'] else 'in-process',
+                'base_url': options['base_url'] or None,
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'users': len(self.tokens),
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f"结果已保存到 {options['output']}")
+        if options['baseline']:
+            self.compare(report, options)
+
+    # ---------- 准备数据 ----------
+
+    def prepare_users(self, options):
+        User = get_user_model()
+        users = list(User.objects.filter(is_active=True).order_by('-following_count', 'id')[:options['users']])
+        if not users:
+            raise CommandError('没有可用的用户，请先运行 seed_data 生成数据')
+        tokens = []
+        for user in users:
+            token, _ = Token.objects.get_or_create(user=user)
+            token.created = timezone.now()
+            token.save()
+            tokens.append((user.id, token.key))
+        return tokens
+
+    def prepare_params(self, options):
+        from chat.models import Message
+        from comments.models import Comment
+        from societies.models import Dynamic
+        User = get_user_model()
+
+        login_user, created = User.objects.get_or_create(username=options['login_username'])
+        if created or not login_user.check_password(options['login_password']):
+            login_user.set_password(options['login_password'])
+            login_user.save()
+
+        def most_commented(comment_type):
+            row = (Comment.objects.filter(type=comment_type).values('target_id')
+                   .annotate(total=Count('id')).order_by('-total').first())
+            return row['target_id'] if row else 0
+
+        room = (Message.objects.values('receiver_id').annotate(total=Count('id')).order_by('-total').first())
+        return {
+            'dynamic_id': most_commented('dynamic'),
+            'content_id': most_commented('content'),
+            'room_id': room['receiver_id'] if room else '',
+            'toggle_dynamic_ids': list(Dynamic.objects.order_by('-like_count').values_list('id', flat=True)[:100]),
+            'toggle_user_ids': list(User.objects.order_by('-followers_count').values_list('id', flat=True)[:100]),
+            'login_username': login_user.username,
+            'login_password': options['login_password'],
+        }
+
+    def format_value(self, value, index, user_id):
+        """替换占位符；切换类目标按 index // 2 轮换，相邻两次请求作用于同一目标"""
+        if not isinstance(value, str):
+            return value
+        params = dict(self.params)
+        dynamic_ids = params.pop('toggle_dynamic_ids') or [0]
+        user_ids = [uid for uid in params.pop('toggle_user_ids') if uid != user_id] or [0]
+        params['toggle_dynamic_id'] = dynamic_ids[(index // 2) % len(dynamic_ids)]
+        params['toggle_user_id'] = user_ids[(index // 2) % len(user_ids)]
+        formatted = value.format(**params)
+        return int(formatted) if value.startswith('{toggle_') else formatted
+
+    # ---------- 执行 ----------
+
+    def run_scenario(self, name, method, path, body):
+        options = self.options
+        concurrency = max(1, options['concurrency'])
+        total = options['requests']
+        per_worker = [total // concurrency + (1 if worker < total % concurrency else 0) for worker in range(concurrency)]
+
+        toggle = self.is_toggle(path, body)
+
+        # 预热：切换类接口固定一个用户，保证成对执行
+        for index in range(options['warmup']):
+            token = self.tokens[0 if toggle else index % len(self.tokens)]
+            self.send(method, path, body, token, 10 ** 6 + index)
+        if toggle:
+            self.finish_pairs(method, path, body, self.tokens[0], options['warmup'], offset=10 ** 6)
+
+        def worker(worker_index):
+            samples = []
+            # 每个线程固定一个用户，保证切换类接口成对执行
+            token = self.tokens[worker_index % len(self.tokens)]
+            for index in range(per_worker[worker_index]):
+                samples.append(self.send(method, path, body, token, index))
+            if toggle:
+                self.finish_pairs(method, path, body, token, per_worker[worker_index])
+            if not options['base_url']:
+                connections.close_all()
+            return samples
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            samples = [sample for chunk in executor.map(worker, range(concurrency)) for sample in chunk]
+        elapsed = time.perf_counter() - started
+
+        latencies = sorted(sample[0] for sample in samples)
+        queries = [sample[1] for sample in samples if sample[1] is not None]
+        errors = sum(1 for sample in samples if sample[2] >= 400)
+        return {
+            'requests': len(samples),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'queries_per_request': round(statistics.fmean(queries), 2) if queries else None,
+            'throughput_rps': round(len(samples) / elapsed, 1) if elapsed else None,
+        }
+
+    @staticmethod
+    def is_toggle(path, body):
+        """请求中使用了切换类目标的占位符"""
+        values = [path, *(body.values() if body else ())]
+        return any(isinstance(value, str) and '{toggle_' in value for value in values)
+
+    def finish_pairs(self, method, path, body, token, count, offset=0):
+        """请求数为奇数时补发一次（不计时），撤销最后一个目标的切换，压测结束后数据状态不变"""
+        if count % 2:
+            self.send(method, path, body, token, offset + count)
+
+    def send(self, method, path, body, token, index):
+        """发送一次请求，返回 (耗时毫秒, SQL数, HTTP状态码)"""
+        user_id, key = token
+        url = self.format_value(path, index, user_id)
+        data = {field: self.format_value(value, index, user_id) for field, value in body.items()} if body else None
+        headers = {} if url.startswith('/api/auth/login/') else {'Authorization': f'Token {key}'}
+        if self.options['base_url']:
+            return self.send_live(method, url, data, headers)
+
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client()
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(recorder):
+            if method == 'get':
+                response = client.get(url, headers=headers)
+            else:
+                response = client.post(url, data=json.dumps(data), content_type='application/json', headers=headers)
+        return (time.perf_counter() - started) * 1000, recorder.count, response.status_code
+
+    def send_live(self, method, url, data, headers):
+        request = urllib.request.Request(
+            self.options['base_url'].rstrip('/') + url,
+            data=json.dumps(data).encode('utf-8') if data is not None else None,
+            headers={**headers, 'Content-Type': 'application/json'},
+            method=method.upper(),
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        except urllib.error.URLError:
+            status = 599
+        return (time.perf_counter() - started) * 1000, None, status
+
+    # ---------- 输出 ----------
+
+    def print_result(self, name, result):
+        queries = result['queries_per_request']
+        self.stdout.write(
+            f"{name:<22} p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms p99={result['p99_ms']:>8.2f}ms "
+            f"sql/请求={'-' if queries is None else queries:<6} 吞吐={result['throughput_rps']}/s "
+            f"错误={result['errors']}/{result['requests']}"
+        )
+
+    def compare(self, report, options):
+        with open(options['baseline'], encoding='utf-8') as file:
+            baseline = json.load(file)['scenarios']
+        regressions = []
+        for name, current in report['scenarios'].items():
+            previous = baseline.get(name)
+            if not previous:
+                continue
+            if previous['p95_ms'] and current['p95_ms'] > previous['p95_ms'] * (1 + options['threshold']):
+                regressions.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+            if (previous.get('queries_per_request') is not None and current['queries_per_request'] is not None
+                    and current['queries_per_request'] > previous['queries_per_request'] * (1 + options['query_threshold'])):
+                regressions.append(
+                    f"{name}: sql/请求 {previous['queries_per_request']} -> {current['queries_per_request']}")
+            if current['errors'] > previous.get('errors', 0):
+                regressions.append(f"{name}: 错误数 {previous.get('errors', 0)} -> {current['errors']}")
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f'与基线相比有 {len(regressions)} 项性能回退')
+        self.stdout.write(self.style.SUCCESS('与基线相比没有性能回退'))
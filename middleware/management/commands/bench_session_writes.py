@@ -0,0 +1,85 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+
+class Command(BaseCommand):
+    help = '对比 default 与 production 认证配置下，每个 Token 认证的 API 请求对 django_session 的读写次数'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='/api/social/dynamic/?pageSize=1', help='压测的接口地址')
+        parser.add_argument('--requests', type=int, default=50, help='每种配置的请求次数')
+        parser.add_argument('--username', default='bench_session_user', help='压测使用的用户名')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        user, created = User.objects.get_or_create(username=options['username'])
+        token, _ = Token.objects.get_or_create(user=user)
+        token.created = timezone.now()
+        token.save()
+
+        before_middleware = [
+            'django.contrib.sessions.middleware.SessionMiddleware'
+            if item == 'middleware.session.ApiAwareSessionMiddleware' else item
+            for item in settings.MIDDLEWARE
+        ]
+        after_middleware = [
+            'middleware.session.ApiAwareSessionMiddleware'
+            if item == 'django.contrib.sessions.middleware.SessionMiddleware' else item
+            for item in settings.MIDDLEWARE
+        ]
+        profiles = [
+            ('before (default)', {
+                'MIDDLEWARE': before_middleware,
+                'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+                'SESSION_SAVE_EVERY_REQUEST': True,
+            }),
+            ('after (production)', {
+                'MIDDLEWARE': after_middleware,
+                'SESSION_ENGINE': os.getenv('ADMIN_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db'),
+                'SESSION_SAVE_EVERY_REQUEST': False,
+            }),
+        ]
+        try:
+            for name, overrides in profiles:
+                with override_settings(**overrides):
+                    self.run_profile(name, user, token, options)
+        finally:
+            if created:
+                user.delete()
+
+    def run_profile(self, name, user, token, options):
+        # 模拟同时登录了后台（带会话Cookie）又使用 Token 调用接口的客户端
+        client = Client(headers={'Authorization': f'Token {token.key}'})
+        client.force_login(user)
+
+        reads = writes = total_queries = 0
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(options['url'])
+            if response.status_code >= 400:
+                self.stderr.write(f'{name}: 请求失败 {response.status_code}')
+                return
+            total_queries += len(ctx.captured_queries)
+            for query in ctx.captured_queries:
+                sql = query['sql'].lstrip().upper()
+                if 'DJANGO_SESSION' not in sql:
+                    continue
+                if sql.startswith('SELECT'):
+                    reads += 1
+                else:
+                    writes += 1
+
+        count = options['requests']
+        self.stdout.write(
+            f'{name}: 请求 {count} 次, '
+            f'会话读取 {reads / count:.2f} 次/请求, 会话写入 {writes / count:.2f} 次/请求, '
+            f'总查询 {total_queries / count:.2f} 次/请求'
+        )
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from middleware.token import get_token_lifetime
+
+
+class Command(BaseCommand):
+    help = '分批删除已过期的认证Token'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批删除的数量')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，降低对数据库的压力')
+        parser.add_argument('--dry-run', action='store_true', help='只统计不删除')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        cutoff = timezone.now() - get_token_lifetime()
+        expired = Token.objects.filter(created__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'过期Token数量: {expired.count()}')
+            return
+
+        deleted = 0
+        while True:
+            keys = list(expired.order_by('created').values_list('key', flat=True)[:batch_size])
+            if not keys:
+                break
+            # 按主键删除，避免一次性大事务；再次带上过期条件，防止期间重新登录的token被误删
+            # 删除时会触发 post_delete 信号，同时失效 token 缓存
+            count, _ = Token.objects.filter(key__in=keys, created__lt=cutoff).delete()
+            deleted += count
+            self.stdout.write(f'已删除 {deleted} 个过期Token')
+            if len(keys) < batch_size:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'清理完成，共删除 {deleted} 个过期Token'))
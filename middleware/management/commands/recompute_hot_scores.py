@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from middleware.hot_score import get_hot_models, recompute
+
+
+class Command(BaseCommand):
+    help = '按主键区间批量重新计算内容、动态的热度分（修改热度权重后或计数对账后执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', choices=('content', 'dynamic'),
+                            help='只计算指定的目标，可重复指定，默认全部')
+        parser.add_argument('--batch-size', type=int, default=5000, help='每批处理的ID区间大小')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，降低对数据库的压力')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size 必须大于0')
+        content_model, dynamic_model = get_hot_models()
+        models = {'content': content_model, 'dynamic': dynamic_model}
+
+        for target in options['target'] or list(models):
+            model = models[target]
+            begin = time.monotonic()
+            bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+            updated = 0
+            if bounds['low'] is not None:
+                for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+                    # 每批一条 UPDATE ... SET hot_score = <表达式>，在数据库中完成计算
+                    updated += recompute(model, model.objects.filter(pk__gte=start, pk__lt=start + batch_size))
+                    if options['sleep']:
+                        time.sleep(options['sleep'])
+            self.stdout.write(self.style.SUCCESS(
+                f'[{target}] 已更新 {updated} 行热度分，耗时 {time.monotonic() - begin:.2f}s'
+            ))
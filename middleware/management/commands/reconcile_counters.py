@@ -0,0 +1,207 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+
+from middleware.models import JobCheckpoint
+
+CHECKPOINT_NAME = 'reconcile_counters'
+# 浮点字段（总评分）允许的误差
+FLOAT_TOLERANCE = 1e-6
+
+
+def counter_sources():
+    """
+    每个冗余计数字段对应的来源：(字段, 来源查询集, 目标ID列, 聚合)
+    来源按目标ID GROUP BY 聚合后即为计数的正确值
+    """
+    from comments.models import Comment
+    from contents.models import Content
+    from favourites.models import Downvote, Favorite
+    from follows.models import Follow
+    from likes.models import Like
+    from rating.models import Rating
+    from societies.models import Dynamic
+    from user.models import User
+
+    return {
+        'content': (Content, (
+            ('like_count', Like.objects.filter(type='content', status='active'), 'target_id', Count('id')),
+            ('favorite_count', Favorite.objects.filter(type='content', status='active'), 'target_id', Count('id')),
+            ('downvote_total', Downvote.objects.filter(type='content', status='active'), 'target_id', Count('id')),
+            ('comment_count', Comment.objects.filter(type='content'), 'target_id', Count('id')),
+            ('score_count', Rating.objects.all(), 'content_id', Count('id')),
+            ('score_total', Rating.objects.all(), 'content_id', Sum('score')),
+        )),
+        'dynamic': (Dynamic, (
+            ('like_count', Like.objects.filter(type='dynamic', status='active'), 'target_id', Count('id')),
+            ('favorite_count', Favorite.objects.filter(type='dynamic', status='active'), 'target_id', Count('id')),
+            ('comment_count', Comment.objects.filter(type='dynamic'), 'target_id', Count('id')),
+        )),
+        'comment': (Comment, (
+            ('like_count', Like.objects.filter(type='comment', status='active'), 'target_id', Count('id')),
+            ('reply_count', Comment.objects.filter(parent_comment_id__gt=0), 'parent_comment_id', Count('id')),
+        )),
+        'user': (User, (
+            ('followers_count', Follow.objects.filter(status='active'), 'followee_id', Count('id')),
+            ('following_count', Follow.objects.filter(status='active'), 'follower_id', Count('id')),
+        )),
+    }
+
+
+def touched_targets(since):
+    """增量模式：检查点之后有变化的点赞、收藏、点踩、评论（含回复）、评分、关注记录涉及的目标ID"""
+    from comments.models import Comment
+    from favourites.models import Downvote, Favorite
+    from follows.models import Follow
+    from likes.models import Like
+    from rating.models import Rating
+
+    touched = defaultdict(set)
+    for model in (Like, Favorite, Downvote, Comment):
+        rows = model.objects.filter(update_time__gt=since, type__in=('content', 'dynamic', 'comment'))
+        for target_type, target_id in rows.values_list('type', 'target_id').distinct().iterator():
+            if target_id is not None:
+                touched[target_type].add(target_id)
+    # 回复影响父评论的 reply_count
+    touched['comment'].update(
+        Comment.objects.filter(update_time__gt=since, parent_comment_id__gt=0)
+        .values_list('parent_comment_id', flat=True).distinct()
+    )
+    touched['content'].update(
+        Rating.objects.filter(update_time__gt=since).values_list('content_id', flat=True).distinct()
+    )
+    follows = Follow.objects.filter(update_time__gt=since).values_list('follower_id', 'followee_id')
+    for follower_id, followee_id in follows.iterator():
+        touched['user'].update(pk for pk in (follower_id, followee_id) if pk is not None)
+    return touched
+
+
+def differs(current, expected):
+    if isinstance(expected, float) or isinstance(current, float):
+        return abs((current or 0) - expected) > FLOAT_TOLERANCE
+    return current != expected
+
+
+class Command(BaseCommand):
+    help = '根据点赞、收藏、点踩、评论、评分、关注表重新计算冗余计数字段，只写入有偏差的行'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', choices=('content', 'dynamic', 'comment', 'user'),
+                            help='只对账指定的目标，可重复指定，默认全部')
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的ID区间大小')
+        parser.add_argument('--incremental', action='store_true',
+                            help='只处理上次成功运行之后有变化的目标；没有检查点时执行全量对账')
+        parser.add_argument('--since', help='增量模式的起始时间（ISO格式），覆盖检查点')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，降低对数据库的压力')
+        parser.add_argument('--dry-run', action='store_true', help='只统计偏差不写入')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size 必须大于0')
+        started = timezone.now()
+        sources = counter_sources()
+        targets = options['target'] or list(sources)
+
+        since = self.get_since(options)
+        touched = touched_targets(since) if since else None
+        if options['incremental']:
+            self.stdout.write(f'增量对账，起始时间: {since}' if since else '没有检查点，执行全量对账')
+
+        for target in targets:
+            model, counters = sources[target]
+            if touched is None:
+                batches = self.id_range_batches(model, options['batch_size'])
+            else:
+                ids = sorted(touched.get(target, ()))
+                batches = (ids[index:index + options['batch_size']] for index in range(0, len(ids), options['batch_size']))
+            self.reconcile(target, model, counters, batches, options)
+
+        if not options['dry_run'] and not options['since']:
+            # 检查点记录本次开始的时间，运行期间发生的变化会在下次增量运行时再次检查
+            JobCheckpoint.objects.update_or_create(name=CHECKPOINT_NAME, defaults={'last_run_time': started})
+
+    def get_since(self, options):
+        if options['since']:
+            since = timezone.datetime.fromisoformat(options['since'])
+            return timezone.make_aware(since) if timezone.is_naive(since) else since
+        if not options['incremental']:
+            return None
+        return JobCheckpoint.objects.filter(name=CHECKPOINT_NAME).values_list('last_run_time', flat=True).first()
+
+    @staticmethod
+    def id_range_batches(model, batch_size):
+        """全量模式按主键区间分批，每批是一个 [start, end) 区间"""
+        bounds = model.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            return
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            yield start, start + batch_size
+
+    def reconcile(self, target, model, counters, batches, options):
+        fields = [field for field, *_ in counters]
+        stats = {field: {'drifted': 0, 'total': 0, 'max': 0} for field in fields}
+        checked = updated = skipped = 0
+        begin = time.monotonic()
+
+        for batch in batches:
+            with transaction.atomic():
+                queryset = model.objects.filter(pk__gte=batch[0], pk__lt=batch[1]) if isinstance(batch, tuple) \
+                    else model.objects.filter(pk__in=batch)
+                # 锁住本批目标行后再统计来源表，期间提交的点赞等会在计数更新时等待本事务；
+                # 正在被其他事务更新的行直接跳过，留给下次对账，避免和计数钩子互相等待
+                current = {
+                    row[0]: row[1:] for row in
+                    queryset.select_for_update(skip_locked=True).order_by('pk').values_list('pk', *fields)
+                }
+                if isinstance(batch, list):
+                    skipped += len(batch) - len(current)
+                if not current:
+                    continue
+                checked += len(current)
+
+                expected = {pk: dict.fromkeys(fields, 0) for pk in current}
+                for field, source, key, aggregate in counters:
+                    rows = source.filter(**{f'{key}__in': list(current)}).order_by().values(key).annotate(value=aggregate)
+                    for row in rows:
+                        expected[row[key]][field] = row['value'] or 0
+
+                changed = {}
+                changed_fields = defaultdict(list)
+                for pk, values in current.items():
+                    for field, value in zip(fields, values):
+                        correct = expected[pk][field]
+                        if not differs(value, correct):
+                            continue
+                        drift = abs((value or 0) - correct)
+                        stats[field]['drifted'] += 1
+                        stats[field]['total'] += drift
+                        stats[field]['max'] = max(stats[field]['max'], drift)
+                        instance = changed.setdefault(pk, model(pk=pk))
+                        setattr(instance, field, correct)
+                        changed_fields[field].append(instance)
+                if not options['dry_run']:
+                    # 按字段分别写入，只更新有偏差的行和字段
+                    for field, rows in changed_fields.items():
+                        model.objects.bulk_update(rows, [field])
+                updated += len(changed)
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.report(target, checked, updated, skipped, stats, time.monotonic() - begin, options['dry_run'])
+
+    def report(self, target, checked, updated, skipped, stats, elapsed, dry_run):
+        action = '需要修正' if dry_run else '已修正'
+        self.stdout.write(self.style.SUCCESS(
+            f'[{target}] 检查 {checked} 行，{action} {updated} 行，跳过被锁定或不存在的 {skipped} 行，耗时 {elapsed:.2f}s'
+        ))
+        for field, field_stats in stats.items():
+            if not field_stats['drifted']:
+                continue
+            self.stdout.write(
+                f'  {field}: 偏差 {field_stats["drifted"]} 行，'
+                f'偏差总量 {field_stats["total"]:g}，最大偏差 {field_stats["max"]:g}'
+            )
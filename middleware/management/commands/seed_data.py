@@ -0,0 +1,701 @@
+import datetime
+import itertools
+import random
+import time
+from array import array
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+
+from middleware.bulk_load import TableWriter, reset_sequences, supports_copy
+
+COMMENT_TEXTS = (
+    '太好看了', '支持一下', '这个必须点赞', '第一次看到这么精彩的', '哈哈哈哈', '求更新', '学到了',
+    '有点意思', '同款', '路过', '拍得真好', '画质不错', '已收藏', '再来一个', '说得对',
+)
+MESSAGE_TEXTS = ('在吗', '你好', '看到你发的动态了', '哈哈', '好的', '明天见', '收到', '谢谢', '晚安', '？')
+TITLE_WORDS = ('日常', '旅行', '美食', '探店', '穿搭', '健身', '游戏', '音乐', '电影', '宠物', '科技', '搞笑')
+
+
+class Pool:
+    """一类目标对象（用户、内容、动态、评论）的预分配信息：ID、作者、创建时间、被选中的权重"""
+
+    def __init__(self, first_id, size):
+        self.first_id = first_id
+        self.size = size
+        self.times = array('d', [0.0]) * size
+        self.authors = array('l', [0]) * size
+        self.cum_weights = None
+
+    def id(self, index):
+        return self.first_id + index
+
+
+class Command(BaseCommand):
+    help = (
+        '生成压测用的模拟数据：用户、幂律分布的关注关系、内容/动态/标签、点赞、收藏、点踩、评论及回复、评分、'
+        '聊天会话和消息、订单。相同参数和 seed 生成相同的数据，冗余计数字段与生成的数据保持一致。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='随机种子')
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=50)
+        parser.add_argument('--contents', type=int, default=2000)
+        parser.add_argument('--dynamics', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=20000, help='关注关系总数（出度和入度均为幂律分布）')
+        parser.add_argument('--likes', type=int, default=50000, help='点赞总数（内容/动态/评论）')
+        parser.add_argument('--favourites', type=int, default=10000)
+        parser.add_argument('--downvotes', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=20000, help='评论总数（含回复）')
+        parser.add_argument('--reply-ratio', type=float, default=0.3, help='评论中回复所占比例')
+        parser.add_argument('--ratings', type=int, default=5000)
+        parser.add_argument('--sessions', type=int, default=500, help='聊天会话数')
+        parser.add_argument('--messages', type=int, default=10000, help='聊天消息数')
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--alpha', type=float, default=1.0, help='幂律分布指数，越大越集中')
+        parser.add_argument('--inactive-ratio', type=float, default=0.05, help='已取消的点赞/收藏/关注比例')
+        parser.add_argument('--days', type=int, default=180, help='数据分布的天数')
+        parser.add_argument('--base-time', default=None,
+                            help='数据的截止时间（ISO格式），不传则为当天零点（UTC）；需要完全可复现时指定')
+        parser.add_argument('--password', default='seed123456', help='生成用户的登录密码')
+        parser.add_argument('--chunk-size', type=int, default=10000, help='每批写入的行数')
+        parser.add_argument('--no-copy', action='store_true', help='不使用 COPY，改用 bulk_create')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.alpha = options['alpha']
+        self.inactive_ratio = options['inactive_ratio']
+        self.use_copy = not options['no_copy'] and supports_copy()
+        if options['base_time']:
+            base = datetime.datetime.fromisoformat(options['base_time'])
+            if base.tzinfo is None:
+                base = base.replace(tzinfo=datetime.timezone.utc)
+        else:
+            base = datetime.datetime.now(datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.end_ts = base.timestamp()
+        self.start_ts = self.end_ts - options['days'] * 86400
+        self.stats = []
+
+        if options['users'] < 2:
+            raise CommandError('--users 至少为 2')
+
+        self.stdout.write(f"写入方式: {'COPY' if self.use_copy else 'bulk_create'}，seed={options['seed']}")
+        started = time.monotonic()
+        with transaction.atomic():
+            self.plan()
+            self.generate_follows()
+            self.generate_comments()
+            self.generate_likes()
+            self.generate_favourites()
+            self.generate_downvotes()
+            self.generate_ratings()
+            self.generate_chat()
+            self.generate_orders()
+            # 计数字段在生成互动数据时已在内存中累加，最后写入主表
+            self.write_users()
+            self.write_contents()
+            self.write_dynamics()
+            self.write_comments()
+            reset_sequences(self.models_written)
+            # COPY/bulk_create 不触发信号，写入后按生成的数据构建派生数据
+            self.build_feed_inboxes()
+            self.build_hot_scores()
+            self.build_search_index()
+            self.build_activities()
+            self.build_read_states()
+
+        total_rows = sum(count for _, count, _ in self.stats)
+        elapsed = time.monotonic() - started
+        for name, count, seconds in self.stats:
+            self.stdout.write(f'{name}: {count} 行, {seconds:.1f}s')
+        self.stdout.write(self.style.SUCCESS(
+            f'完成：共 {total_rows} 行，用时 {elapsed:.1f}s（{total_rows / max(elapsed, 0.001):.0f} 行/秒）'
+        ))
+
+    # ---------- 工具方法 ----------
+
+    def writer(self, model, fields):
+        return TableWriter(model, fields, chunk_size=self.options['chunk_size'], use_copy=self.use_copy)
+
+    def timed(self, name, writer, started):
+        self.stats.append((name, writer.close(), time.monotonic() - started))
+        self.models_written.add(writer.model)
+
+    @staticmethod
+    def next_id(model):
+        return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+    def power_law_weights(self, size):
+        """随机排名的幂律权重（累计权重，供 rng.choices 使用）"""
+        ranks = list(range(size))
+        self.rng.shuffle(ranks)
+        return list(itertools.accumulate(1.0 / (rank + 1) ** self.alpha for rank in ranks))
+
+    def allocate(self, total, cum_weights):
+        """按权重把 total 分配到每个对象，返回每个对象的数量"""
+        size = len(cum_weights)
+        quotas = array('l', [0]) * size
+        if not size or total <= 0:
+            return quotas
+        weight_sum = cum_weights[-1]
+        previous = 0.0
+        assigned = 0
+        for index, cumulative in enumerate(cum_weights):
+            quota = int(total * (cumulative - previous) / weight_sum)
+            quotas[index] = quota
+            assigned += quota
+            previous = cumulative
+        for index in self.rng.choices(range(size), cum_weights=cum_weights, k=total - assigned):
+            quotas[index] += 1
+        return quotas
+
+    def pick_distinct(self, count, pool, exclude=None):
+        """按权重不重复地选出 count 个目标下标"""
+        size = pool.size - (1 if exclude is not None else 0)
+        count = min(count, size)
+        if count <= 0:
+            return []
+        if count * 2 >= size:
+            picked = self.rng.sample(range(pool.size), min(count + 1, pool.size))
+            return [index for index in picked if index != exclude][:count]
+        picked = set()
+        for _ in range(5):
+            for index in self.rng.choices(range(pool.size), cum_weights=pool.cum_weights, k=(count - len(picked)) * 2):
+                if index != exclude:
+                    picked.add(index)
+                    if len(picked) >= count:
+                        return list(picked)
+        # 权重过于集中时补充均匀抽样
+        while len(picked) < count:
+            index = self.rng.randrange(pool.size)
+            if index != exclude:
+                picked.add(index)
+        return list(picked)
+
+    def random_time(self, after=None):
+        start = max(after or self.start_ts, self.start_ts)
+        return start + self.rng.random() * max(self.end_ts - start, 1)
+
+    def status(self):
+        return 'inactive' if self.rng.random() < self.inactive_ratio else 'active'
+
+    def random_hex(self):
+        return '%032x' % self.rng.getrandbits(128)
+
+    def interactions(self, total, pool):
+        """按用户活跃度分配数量，每个用户对同一目标最多一次，生成 (用户下标, 目标下标)"""
+        quotas = self.allocate(total, self.users.cum_weights)
+        for user_index, quota in enumerate(quotas):
+            if quota:
+                for target_index in self.pick_distinct(quota, pool):
+                    yield user_index, target_index
+
+    def nickname(self, user_index):
+        return f'压测用户{self.users.id(user_index)}'
+
+    # ---------- 预分配 ----------
+
+    def plan(self):
+        from chat.models import Message, Session
+        from comments.models import Comment
+        from contents.models import Content
+        from favourites.models import Downvote, Favorite
+        from follows.models import Follow
+        from goods.models import Good
+        from likes.models import Like
+        from orders.models import Order
+        from payments.models import Payment
+        from rating.models import Rating
+        from societies.models import Dynamic
+        from tags.models import Tag
+        from user.models import User
+
+        options = self.options
+        self.models_written = set()
+        self.first_ids = {model: self.next_id(model) for model in (
+            Message, Session, Comment, Favorite, Downvote, Follow, Good, Like, Order, Payment, Rating,
+            Content.tags.through, User.tags.through,
+        )}
+
+        self.users = Pool(self.next_id(User), options['users'])
+        for index in range(self.users.size):
+            self.users.times[index] = self.random_time()
+        # 活跃度（发布、点赞、关注别人）与受欢迎程度（被关注）使用不同的幂律排名
+        self.users.cum_weights = self.power_law_weights(self.users.size)
+        self.user_popularity = Pool(self.users.first_id, self.users.size)
+        self.user_popularity.cum_weights = self.power_law_weights(self.users.size)
+
+        self.tags = Pool(self.next_id(Tag), options['tags'])
+        self.tags.cum_weights = self.power_law_weights(self.tags.size)
+        self.tag_usage = array('l', [0]) * self.tags.size
+
+        self.contents = self.plan_posts(self.next_id(Content), options['contents'])
+        self.dynamics = self.plan_posts(self.next_id(Dynamic), options['dynamics'])
+        self.content_counters = self.counters(self.contents.size, (
+            'like_count', 'comment_count', 'favorite_count', 'downvote_total', 'score_count'))
+        self.content_score_total = array('d', [0.0]) * self.contents.size
+        self.dynamic_counters = self.counters(self.dynamics.size, ('like_count', 'comment_count', 'favorite_count'))
+        self.user_counters = self.counters(self.users.size, ('followers_count', 'following_count', 'likes_count'))
+
+    def plan_posts(self, first_id, size):
+        pool = Pool(first_id, size)
+        for index, author in enumerate(self.rng.choices(range(self.users.size), cum_weights=self.users.cum_weights, k=size)):
+            pool.authors[index] = author
+            pool.times[index] = self.random_time(self.users.times[author])
+        pool.cum_weights = self.power_law_weights(size)
+        return pool
+
+    @staticmethod
+    def counters(size, names):
+        return {name: array('l', [0]) * size for name in names}
+
+    # ---------- 互动数据 ----------
+
+    def generate_follows(self):
+        from follows.models import Follow
+        started = time.monotonic()
+        writer = self.writer(Follow, [
+            'id', 'follower_id', 'followee_id', 'follower_nickname', 'followee_nickname', 'status',
+            'create_time', 'update_time'])
+        next_id = self.first_ids[Follow]
+        quotas = self.allocate(self.options['follows'], self.users.cum_weights)
+        for follower, quota in enumerate(quotas):
+            if not quota:
+                continue
+            for followee in self.pick_distinct(quota, self.user_popularity, exclude=follower):
+                status = self.status()
+                created = self.random_time(max(self.users.times[follower], self.users.times[followee]))
+                writer.add((next_id, self.users.id(follower), self.users.id(followee), self.nickname(follower),
+                            self.nickname(followee), status, created, created))
+                next_id += 1
+                if status == 'active':
+                    self.user_counters['following_count'][follower] += 1
+                    self.user_counters['followers_count'][followee] += 1
+        self.timed('关注', writer, started)
+
+    def generate_comments(self):
+        """评论先在内存中规划（点赞会落到评论上），点赞生成完后再写入"""
+        from comments.models import Comment
+        total = self.options['comments']
+        replies = int(total * self.options['reply_ratio'])
+        top_level = total - replies
+        self.comments = Pool(self.first_ids[Comment], total)
+        self.comment_kinds = bytearray(total)  # 0: 内容评论 1: 动态评论
+        self.comment_targets = array('l', [0]) * total
+        self.comment_parents = array('l', [-1]) * total
+        self.comment_counters = self.counters(total, ('like_count', 'reply_count'))
+        if not total:
+            self.comments.cum_weights = []
+            return
+
+        authors = self.rng.choices(range(self.users.size), cum_weights=self.users.cum_weights, k=total)
+        for index in range(top_level):
+            kind = 0 if self.rng.random() < 0.5 and self.contents.size else 1
+            posts = self.contents if kind == 0 else self.dynamics
+            if not posts.size:
+                kind, posts = 0, self.contents
+            target = self.rng.choices(range(posts.size), cum_weights=posts.cum_weights)[0]
+            self.comment_kinds[index] = kind
+            self.comment_targets[index] = target
+            self.comments.authors[index] = authors[index]
+            self.comments.times[index] = self.random_time(posts.times[target])
+            counters = self.content_counters if kind == 0 else self.dynamic_counters
+            counters['comment_count'][target] += 1
+        for index in range(top_level, total):
+            parent = self.rng.randrange(top_level)
+            kind = self.comment_kinds[parent]
+            target = self.comment_targets[parent]
+            self.comment_kinds[index] = kind
+            self.comment_targets[index] = target
+            self.comment_parents[index] = parent
+            self.comments.authors[index] = authors[index]
+            self.comments.times[index] = self.random_time(self.comments.times[parent])
+            self.comment_counters['reply_count'][parent] += 1
+            counters = self.content_counters if kind == 0 else self.dynamic_counters
+            counters['comment_count'][target] += 1
+        self.comments.cum_weights = self.power_law_weights(total)
+
+    def generate_likes(self):
+        from likes.models import Like
+        started = time.monotonic()
+        writer = self.writer(Like, [
+            'id', 'type', 'target_id', 'user_id', 'user_nickname', 'target_author_id', 'target_title', 'status',
+            'create_time', 'update_time'])
+        next_id = self.first_ids[Like]
+        total = self.options['likes']
+        comment_share = total // 5 if self.comments.size else 0
+        content_share = (total - comment_share) // 2 if self.dynamics.size else total - comment_share
+        targets = (
+            ('content', self.contents, self.content_counters, content_share),
+            ('dynamic', self.dynamics, self.dynamic_counters, total - comment_share - content_share),
+            ('comment', self.comments, self.comment_counters, comment_share),
+        )
+        for like_type, pool, counters, share in targets:
+            if not pool.size:
+                continue
+            for user_index, target in self.interactions(share, pool):
+                status = self.status()
+                author = pool.authors[target]
+                created = self.random_time(pool.times[target])
+                writer.add((next_id, like_type, pool.id(target), self.users.id(user_index), self.nickname(user_index),
+                            self.users.id(author), self.title(like_type, pool.id(target)), status, created, created))
+                next_id += 1
+                if status == 'active':
+                    counters['like_count'][target] += 1
+                    self.user_counters['likes_count'][author] += 1
+        self.timed('点赞', writer, started)
+
+    def generate_favourites(self):
+        from favourites.models import Favorite
+        started = time.monotonic()
+        writer = self.writer(Favorite, [
+            'id', 'type', 'target_id', 'user_id', 'user_nickname', 'target_title', 'target_author_id', 'status',
+            'create_time', 'update_time'])
+        next_id = self.first_ids[Favorite]
+        total = self.options['favourites']
+        content_share = total // 2 if self.dynamics.size else total
+        for favourite_type, pool, counters, share in (
+                ('content', self.contents, self.content_counters, content_share),
+                ('dynamic', self.dynamics, self.dynamic_counters, total - content_share)):
+            if not pool.size:
+                continue
+            for user_index, target in self.interactions(share, pool):
+                status = self.status()
+                created = self.random_time(pool.times[target])
+                writer.add((next_id, favourite_type, pool.id(target), self.users.id(user_index),
+                            self.nickname(user_index), self.title(favourite_type, pool.id(target)),
+                            self.users.id(pool.authors[target]), status, created, created))
+                next_id += 1
+                if status == 'active':
+                    counters['favorite_count'][target] += 1
+        self.timed('收藏', writer, started)
+
+    def generate_downvotes(self):
+        """点踩只针对内容（动态表没有 downvote_total 字段）"""
+        from favourites.models import Downvote
+        started = time.monotonic()
+        writer = self.writer(Downvote, [
+            'id', 'type', 'target_id', 'user_id', 'user_nickname', 'target_title', 'target_author_id', 'status',
+            'create_time', 'update_time'])
+        next_id = self.first_ids[Downvote]
+        if self.contents.size:
+            for user_index, target in self.interactions(self.options['downvotes'], self.contents):
+                status = self.status()
+                created = self.random_time(self.contents.times[target])
+                writer.add((next_id, 'content', self.contents.id(target), self.users.id(user_index),
+                            self.nickname(user_index), self.title('content', self.contents.id(target)),
+                            self.users.id(self.contents.authors[target]), status, created, created))
+                next_id += 1
+                if status == 'active':
+                    self.content_counters['downvote_total'][target] += 1
+        self.timed('点踩', writer, started)
+
+    def generate_ratings(self):
+        from rating.models import Rating
+        started = time.monotonic()
+        writer = self.writer(Rating, ['id', 'user_id', 'content_id', 'score', 'create_time', 'update_time'])
+        next_id = self.first_ids[Rating]
+        scores = [score for score, _ in Rating.SCORE_CHOICES]
+        if self.contents.size:
+            for user_index, target in self.interactions(self.options['ratings'], self.contents):
+                score = self.rng.choice(scores)
+                created = self.random_time(self.contents.times[target])
+                writer.add((next_id, self.users.id(user_index), self.contents.id(target), score, created, created))
+                next_id += 1
+                self.content_counters['score_count'][target] += 1
+                self.content_score_total[target] += score
+        self.timed('评分', writer, started)
+
+    def generate_chat(self):
+        from chat.models import Message, Session
+        started = time.monotonic()
+        session_writer = self.writer(Session, [
+            'id', 'user_id', 'other_user_id', 'session_id', 'session_type', 'last_message_id', 'last_message_time',
+            'unread_count', 'create_time', 'update_time'])
+        message_writer = self.writer(Message, [
+            'id', 'sender_id', 'receiver_id', 'content', 'type', 'is_read', 'create_time', 'update_time'])
+        session_id = self.first_ids[Session]
+        message_id = self.first_ids[Message]
+
+        max_pairs = self.users.size * (self.users.size - 1) // 2
+        session_count = min(self.options['sessions'], max_pairs)
+        pairs = set()
+        while len(pairs) < session_count:
+            user_index, other_index = self.rng.choices(range(self.users.size), cum_weights=self.users.cum_weights, k=2)
+            if user_index != other_index:
+                pairs.add((min(user_index, other_index), max(user_index, other_index)))
+        pairs = sorted(pairs)
+        self.rng.shuffle(pairs)
+
+        quotas = self.allocate(self.options['messages'], self.power_law_weights(len(pairs))) if pairs else []
+        for (user_index, other_index), quota in zip(pairs, quotas):
+            created = self.random_time(max(self.users.times[user_index], self.users.times[other_index]))
+            room = f'{int(created * 1000000)}_{self.random_hex()[:8]}'
+            message_times = sorted(self.random_time(created) for _ in range(quota))
+            last_message_id = last_message_time = None
+            unread = 0
+            for position, sent in enumerate(message_times):
+                sender = self.rng.choice((user_index, other_index))
+                # 最后几条消息未读
+                is_read = position < quota - 3 or self.rng.random() < 0.5
+                unread += 0 if is_read else 1
+                message_writer.add((message_id, self.users.id(sender), room, self.rng.choice(MESSAGE_TEXTS), 'text',
+                                    is_read, sent, sent))
+                last_message_id, last_message_time = message_id, sent
+                message_id += 1
+            session_writer.add((session_id, self.users.id(user_index), self.users.id(other_index), room, 'private',
+                                last_message_id, last_message_time, unread, created, last_message_time or created))
+            session_id += 1
+        self.timed('聊天消息', message_writer, started)
+        self.timed('聊天会话', session_writer, started)
+
+    def generate_orders(self):
+        from goods.models import Good
+        from orders.models import Order
+        from payments.models import Payment
+        started = time.monotonic()
+        payment_writer = self.writer(Payment, [
+            'id', 'pay_name', 'amount', 'pay_price', 'pay_channel', 'days_num', 'gold_coin', 'status', 'is_active'])
+        good_writer = self.writer(Good, ['id', 'name', 'type', 'price', 'original_price', 'stock', 'is_online', 'status'])
+        payment_ids = []
+        for index, (name, channel, amount, days, coins) in enumerate((
+                ('月卡会员', 'vip', 30, 30, 0), ('季卡会员', 'vip', 78, 90, 0), ('年卡会员', 'vip', 268, 365, 0),
+                ('100金币', 'gold', 10, 0, 100), ('1000金币', 'gold', 88, 0, 1000))):
+            payment_id = self.first_ids[Payment] + index
+            payment_writer.add((payment_id, name, amount, amount, channel, days, coins, 'true', True))
+            payment_ids.append((payment_id, amount))
+        good_ids = []
+        for index in range(10):
+            good_id = self.first_ids[Good] + index
+            price = self.rng.randint(1, 50) * 10
+            good_writer.add((good_id, f'压测商品{good_id}', 'virtual', price, price + 10, 10000, True, 'true'))
+            good_ids.append(good_id)
+        self.timed('支付配置', payment_writer, started)
+        self.timed('商品', good_writer, started)
+
+        writer = self.writer(Order, [
+            'id', 'user_id', 'payment_id', 'good_id', 'quantity', 'cash_amount', 'final_amount', 'pay_status',
+            'pay_method', 'pay_time', 'trade_no', 'pay_money', 'create_time', 'update_time'])
+        next_id = self.first_ids[Order]
+        buyers = self.rng.choices(range(self.users.size), cum_weights=self.users.cum_weights, k=self.options['orders'])
+        for user_index in buyers:
+            payment_id, amount = self.rng.choice(payment_ids)
+            created = self.random_time(self.users.times[user_index])
+            paid = self.rng.random() < 0.8
+            writer.add((next_id, self.users.id(user_index), payment_id, self.rng.choice(good_ids), 1, amount, amount,
+                        'success' if paid else 'pending', self.rng.choice(('alipay', 'wechat')),
+                        created + 60 if paid else None, f'T{next_id:012d}', amount if paid else None,
+                        created, created))
+            next_id += 1
+        self.timed('订单', writer, started)
+
+    # ---------- 主表（带计数字段） ----------
+
+    def title(self, kind, target_id):
+        if kind == 'comment':
+            return COMMENT_TEXTS[target_id % len(COMMENT_TEXTS)]
+        return f'{TITLE_WORDS[target_id % len(TITLE_WORDS)]}{kind}{target_id}'
+
+    def write_users(self):
+        from user.models import User
+        started = time.monotonic()
+        writer = self.writer(User, [
+            'id', 'password', 'username', 'email', 'date_joined', 'member_level', 'user_nickname', 'followers_count',
+            'following_count', 'likes_count', 'is_vip', 'gold_coin', 'vip_days'])
+        tag_writer = self.writer(User.tags.through, ['id', 'user_id', 'tag_id'])
+        password = make_password(self.options['password'])
+        through_id = self.first_ids[User.tags.through]
+        counters = self.user_counters
+        for index in range(self.users.size):
+            user_id = self.users.id(index)
+            level = self.rng.choices(('normal', 'vip', 'svip'), weights=(80, 15, 5))[0]
+            writer.add((user_id, password, f"seed{self.options['seed']}_{user_id}", f'seed{user_id}@example.com',
+                        self.users.times[index], level, self.nickname(index), counters['followers_count'][index],
+                        counters['following_count'][index], counters['likes_count'][index], level != 'normal',
+                        self.rng.randint(0, 500), 30 if level != 'normal' else 0))
+            if self.tags.size:
+                for tag in self.pick_distinct(self.rng.randint(0, 3), self.tags):
+                    tag_writer.add((through_id, user_id, self.tags.id(tag)))
+                    through_id += 1
+        self.timed('用户', writer, started)
+        self.timed('用户兴趣标签', tag_writer, started)
+
+    def write_contents(self):
+        from contents.models import Content
+        from tags.models import Tag
+        started = time.monotonic()
+        writer = self.writer(Content, [
+            'id', 'prefixed_id', 'title', 'description', 'type', 'cover_url', 'tabs', 'author_id', 'status',
+            'review_status', 'view_count', 'like_count', 'comment_count', 'favorite_count', 'share_count',
+            'score_count', 'score_total', 'downvote_total', 'publish_time', 'is_vip', 'duration', 'create_time',
+            'update_time', 'price', 'tag_ids'])
+        tag_writer = self.writer(Content.tags.through, ['id', 'content_id', 'tag_id'])
+        through_id = self.first_ids[Content.tags.through]
+        tabs = [value for value, _ in Content.TABS_CHOICES]
+        counters = self.content_counters
+        for index in range(self.contents.size):
+            content_id = self.contents.id(index)
+            created = self.contents.times[index]
+            like_count = counters['like_count'][index]
+            content_type = self.rng.choice(('short', 'long'))
+            row = (
+                content_id, f'c_{self.random_hex()}', self.title('content', content_id), '压测数据', content_type,
+                [f'https://example.com/cover/{content_id}.jpg'], self.rng.choice(tabs),
+                self.users.id(self.contents.authors[index]), 'active', 'approved',
+                like_count * self.rng.randint(5, 20) + self.rng.randint(0, 100), like_count,
+                counters['comment_count'][index], counters['favorite_count'][index], self.rng.randint(0, like_count + 1),
+                counters['score_count'][index], self.content_score_total[index], counters['downvote_total'][index],
+                created, self.rng.random() < 0.2,
+                self.rng.randint(10, 60) * 1000 if content_type == 'short' else self.rng.randint(20, 120) * 60000,
+                created, created, 0,
+            )
+            tag_ids = []
+            if self.tags.size:
+                for tag in self.pick_distinct(self.rng.randint(1, 4), self.tags):
+                    tag_writer.add((through_id, content_id, self.tags.id(tag)))
+                    tag_ids.append(self.tags.id(tag))
+                    self.tag_usage[tag] += 1
+                    through_id += 1
+            # tag_ids 是关联表的冗余副本（contents.signals 维护），COPY 不触发信号，这里直接写入
+            writer.add(row + (sorted(tag_ids),))
+        self.timed('内容', writer, started)
+
+        # 标签在外键上被内容标签引用，同一事务内延迟检查，可以最后写入
+        started = time.monotonic()
+        tag_table_writer = self.writer(Tag, ['id', 'name', 'type', 'usage_count', 'status', 'create_time', 'update_time'])
+        for index in range(self.tags.size):
+            tag_id = self.tags.id(index)
+            tag_table_writer.add((tag_id, f'标签{tag_id}', 'content', self.tag_usage[index], 'active',
+                                  self.start_ts, self.start_ts))
+        self.timed('内容标签', tag_writer, started)
+        self.timed('标签', tag_table_writer, started)
+
+    def write_dynamics(self):
+        from societies.models import Dynamic
+        started = time.monotonic()
+        writer = self.writer(Dynamic, [
+            'id', 'prefixed_id', 'content', 'title', 'tabs', 'type', 'images', 'video_url', 'is_free', 'is_vip',
+            'price', 'user_id', 'like_count', 'comment_count', 'favorite_count', 'share_count', 'status',
+            'create_time', 'update_time', 'view_count'])
+        tabs = [value for value, _ in Dynamic.TABS_CHOICES]
+        counters = self.dynamic_counters
+        for index in range(self.dynamics.size):
+            dynamic_id = self.dynamics.id(index)
+            created = self.dynamics.times[index]
+            like_count = counters['like_count'][index]
+            dynamic_type = self.rng.choice(('video', 'dynamic'))
+            images = [f'https://example.com/dynamic/{dynamic_id}/{n}.jpg' for n in range(self.rng.randint(1, 3))]
+            writer.add((
+                dynamic_id, f'd_{self.random_hex()}', self.rng.choice(COMMENT_TEXTS), self.title('dynamic', dynamic_id),
+                self.rng.choice(tabs), dynamic_type, images if dynamic_type == 'dynamic' else [],
+                [f'https://example.com/video/{dynamic_id}.mp4'] if dynamic_type == 'video' else [],
+                True, False, 0, self.users.id(self.dynamics.authors[index]), like_count,
+                counters['comment_count'][index], counters['favorite_count'][index],
+                self.rng.randint(0, like_count + 1), 'active', created, created,
+                like_count * self.rng.randint(5, 20) + self.rng.randint(0, 100),
+            ))
+        self.timed('动态', writer, started)
+
+    def build_feed_inboxes(self):
+        """按生成的关注关系重建这批用户的关注流收件箱"""
+        from follows import feed
+        if not feed.inbox_enabled():
+            return
+        started = time.monotonic()
+        written = feed.rebuild_inboxes(self.users.first_id, self.users.id(self.users.size - 1))
+        self.stats.append(('关注流收件箱', written, time.monotonic() - started))
+
+    def build_hot_scores(self):
+        """计算生成的内容和动态的热度分"""
+        from contents.models import Content
+        from middleware.hot_score import recompute
+        from societies.models import Dynamic
+        started = time.monotonic()
+        updated = 0
+        for model, pool in ((Content, self.contents), (Dynamic, self.dynamics)):
+            if pool.size:
+                updated += recompute(model, model.objects.filter(pk__gte=pool.id(0), pk__lte=pool.id(pool.size - 1)))
+        self.stats.append(('热度分', updated, time.monotonic() - started))
+
+    def build_search_index(self):
+        """为生成的用户、内容、动态、评论、私信和商品建立搜索索引"""
+        from chat.models import Message
+        from goods.models import Good
+        from search.backends import rebuild_index
+        started = time.monotonic()
+        first_ids = {
+            'user': self.users.first_id, 'content': self.contents.first_id, 'dynamic': self.dynamics.first_id,
+            'comment': self.comments.first_id, 'message': self.first_ids[Message], 'good': self.first_ids[Good],
+        }
+        indexed = sum(rebuild_index(doc_type, first_id=first_id) for doc_type, first_id in first_ids.items())
+        self.stats.append(('搜索索引', indexed, time.monotonic() - started))
+
+    def build_activities(self):
+        """按生成的动态点赞和评论写入互动消息流（与 societies 0005 迁移的回填相同），并累加接收者的互动未读数"""
+        from django.db import connection
+        from django.db.models import Count
+        from notifications import inbox
+        from societies.models import Activity
+        if not self.dynamics.size:
+            return
+        started = time.monotonic()
+        bounds = [self.dynamics.id(0), self.dynamics.id(self.dynamics.size - 1)]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                INSERT INTO t_social_activity (recipient_id, actor_id, actor_nickname, actor_avatar, verb, target_type,
+                                               target_id, target_title, source_id, snippet, create_time)
+                SELECT d.user_id, l.user_id, l.user_nickname, l.user_avatar, 'like', 'dynamic',
+                       l.target_id, COALESCE(l.target_title, d.title), l.id, LEFT(d.content, 100), l.create_time
+                FROM t_like l JOIN t_social_dynamic d ON d.id = l.target_id
+                WHERE l.type = 'dynamic' AND l.status = 'active' AND l.user_id <> d.user_id AND d.id BETWEEN %s AND %s
+                UNION ALL
+                SELECT d.user_id, c.user_id, c.user_nickname, c.user_avatar, 'comment', 'dynamic',
+                       c.target_id, d.title, c.id, LEFT(c.content, 100), c.create_time
+                FROM t_comment c JOIN t_social_dynamic d ON d.id = c.target_id
+                WHERE c.type = 'dynamic' AND c.user_id IS NOT NULL AND c.user_id <> d.user_id AND d.id BETWEEN %s AND %s
+                ON CONFLICT DO NOTHING
+                """,
+                bounds + bounds,
+            )
+            written = cursor.rowcount
+        # 直接写入不会触发 post_save，按接收者一次性累加互动未读数
+        counts = Activity.objects.filter(target_type='dynamic', target_id__gte=bounds[0], target_id__lte=bounds[1]) \
+            .values_list('recipient_id').annotate(total=Count('id')).order_by()
+        inbox.add_unread(inbox.CATEGORY_INTERACTION, dict(counts))
+        self.stats.append(('互动消息', written, time.monotonic() - started))
+
+    def build_read_states(self):
+        """初始化生成的用户的系统通知已读状态（注册前的广播不计入未读）"""
+        from notifications import inbox
+        started = time.monotonic()
+        written = inbox.init_users(self.users.first_id, self.users.id(self.users.size - 1))
+        self.stats.append(('通知已读状态', written, time.monotonic() - started))
+
+    def write_comments(self):
+        from comments.models import Comment
+        started = time.monotonic()
+        writer = self.writer(Comment, [
+            'id', 'type', 'target_id', 'parent_comment_id', 'content', 'user_id', 'user_nickname',
+            'reply_to_user_id', 'reply_to_user_nickname', 'like_count', 'reply_count', 'create_time', 'update_time'])
+        for index in range(self.comments.size):
+            kind = self.comment_kinds[index]
+            posts = self.contents if kind == 0 else self.dynamics
+            parent = self.comment_parents[index]
+            author = self.comments.authors[index]
+            reply_to = self.comments.authors[parent] if parent >= 0 else None
+            created = self.comments.times[index]
+            writer.add((
+                self.comments.id(index), 'content' if kind == 0 else 'dynamic', posts.id(self.comment_targets[index]),
+                self.comments.id(parent) if parent >= 0 else 0, self.title('comment', self.comments.id(index)),
+                self.users.id(author), self.nickname(author),
+                self.users.id(reply_to) if reply_to is not None else None,
+                self.nickname(reply_to) if reply_to is not None else None,
+                self.comment_counters['like_count'][index], self.comment_counters['reply_count'][index],
+                created, created,
+            ))
+        self.timed('评论', writer, started)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='任务名称')),
+                ('last_run_time', models.DateTimeField(blank=True, null=True, verbose_name='上次成功运行时间')),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '任务检查点',
+                'verbose_name_plural': '任务检查点',
+                'db_table': 't_job_checkpoint',
+            },
+        ),
+    ]
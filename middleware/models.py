@@ -0,0 +1,19 @@
+from django.db import models
+
+
+class JobCheckpoint(models.Model):
+    """
+    后台任务检查点
+    记录定时任务（如计数对账）上次成功运行的时间，增量运行时只处理之后变化的数据
+    """
+    name = models.CharField(max_length=100, unique=True, verbose_name="任务名称")
+    last_run_time = models.DateTimeField(blank=True, null=True, verbose_name="上次成功运行时间")
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 't_job_checkpoint'
+        verbose_name = '任务检查点'
+        verbose_name_plural = verbose_name
+
+    def __str__(self):
+        return f'{self.name} @ {self.last_run_time}'
@@ -0,0 +1,262 @@
+"""
+接口SQL性能统计
+按解析到的视图和 action（例如 ContentViewSet.list）记录每个请求的 SQL 数量、数据库耗时和总耗时，
+同一请求内相同结构的 SQL 重复执行超过阈值时记为 N+1。
+通过 connection.execute_wrapper 采集，不依赖 DEBUG=True。
+其他模块可以通过 profile_registry.observe 记录自定义指标（例如关注流合并耗时），一并在 /api/profiling/ 查看。
+"""
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from drf_spectacular.utils import extend_schema
+from rest_framework.views import APIView
+
+from .permissions import IsAdminRole
+from .utils import ApiResponse
+
+logger = logging.getLogger(__name__)
+
+# 直方图分桶上限，最后一个桶为无穷大
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+DURATION_MS_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+_IN_LIST_RE = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMBER_RE = re.compile(r'\b\d+\b')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+
+def normalize_sql(sql):
+    """把 SQL 归一化为结构（去掉字面量，合并 IN 列表），用于识别重复查询"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(%s...)', sql)
+    return sql
+
+
+class Histogram:
+    """固定分桶直方图"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, percent):
+        """按分桶上限估算百分位"""
+        if not self.total:
+            return 0
+        threshold = self.total * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= threshold:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self):
+        labels = [f'<={bucket}' for bucket in self.buckets] + [f'>{self.buckets[-1]}']
+        return {
+            'count': self.total,
+            'avg': round(self.sum / self.total, 2) if self.total else 0,
+            'max': round(self.max, 2),
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class EndpointStats:
+    """单个接口的统计"""
+    max_shapes = 20
+
+    def __init__(self):
+        self.requests = 0
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.db_ms = Histogram(DURATION_MS_BUCKETS)
+        self.wall_ms = Histogram(DURATION_MS_BUCKETS)
+        self.n_plus_one_requests = 0
+        self.n_plus_one_shapes = Counter()
+
+    def snapshot(self):
+        return {
+            'requests': self.requests,
+            'queries': self.queries.snapshot(),
+            'db_ms': self.db_ms.snapshot(),
+            'wall_ms': self.wall_ms.snapshot(),
+            'n_plus_one_requests': self.n_plus_one_requests,
+            'n_plus_one_shapes': [
+                {'sql': shape, 'repeats': repeats}
+                for shape, repeats in self.n_plus_one_shapes.most_common(5)
+            ],
+        }
+
+
+class ProfileRegistry:
+    """进程内的统计汇总"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._metrics = {}
+        self._last_log = time.monotonic()
+
+    def record(self, endpoint, query_count, db_ms, wall_ms, repeated_shapes):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.queries.observe(query_count)
+            stats.db_ms.observe(db_ms)
+            stats.wall_ms.observe(wall_ms)
+            if repeated_shapes:
+                stats.n_plus_one_requests += 1
+                for shape, repeats in repeated_shapes.items():
+                    if shape in stats.n_plus_one_shapes or len(stats.n_plus_one_shapes) < stats.max_shapes:
+                        stats.n_plus_one_shapes[shape] = max(stats.n_plus_one_shapes[shape], repeats)
+
+    def observe(self, name, value, buckets=DURATION_MS_BUCKETS):
+        """记录自定义指标，同名指标使用第一次记录时的分桶"""
+        with self._lock:
+            histogram = self._metrics.get(name)
+            if histogram is None:
+                histogram = self._metrics[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {endpoint: stats.snapshot() for endpoint, stats in sorted(self._endpoints.items())}
+
+    def metrics_snapshot(self):
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in sorted(self._metrics.items())}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._metrics.clear()
+
+    def maybe_log(self):
+        """距离上次输出超过 QUERY_PROFILING_LOG_INTERVAL 秒时输出一行汇总"""
+        interval = getattr(settings, 'QUERY_PROFILING_LOG_INTERVAL', 60)
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_log < interval:
+                return
+            self._last_log = now
+            parts = []
+            for endpoint, stats in sorted(self._endpoints.items(), key=lambda item: -item[1].db_ms.sum)[:10]:
+                parts.append(
+                    f'{endpoint} n={stats.requests} q_p95={stats.queries.percentile(95)} '
+                    f'db_p95={stats.db_ms.percentile(95)}ms wall_p95={stats.wall_ms.percentile(95)}ms '
+                    f'n+1={stats.n_plus_one_requests}'
+                )
+        if parts:
+            logger.info('query profile: %s', ' | '.join(parts))
+
+
+profile_registry = ProfileRegistry()
+
+
+class QueryRecorder:
+    """挂在 execute_wrapper 上，记录单个请求内的 SQL"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.shapes[normalize_sql(sql)] += 1
+
+
+def resolve_endpoint(request):
+    """把请求解析为 视图名.action，例如 ContentViewSet.list"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    func = match.func
+    view_class = getattr(func, 'cls', None) or getattr(func, 'view_class', None)
+    if view_class is None:
+        return match.view_name or getattr(func, '__name__', 'unknown')
+    actions = getattr(func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower(), request.method.lower())
+    else:
+        action = request.method.lower()
+    return f'{view_class.__name__}.{action}'
+
+
+class QueryProfilingMiddleware:
+    """
+    接口SQL统计中间件
+    QUERY_PROFILING_ENABLED 关闭时不做任何处理
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'QUERY_PROFILING_ENABLED', True):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        endpoint = resolve_endpoint(request)
+        if endpoint is not None:
+            threshold = getattr(settings, 'QUERY_PROFILING_N_PLUS_ONE_THRESHOLD', 5)
+            repeated_shapes = {shape: repeats for shape, repeats in recorder.shapes.items() if repeats >= threshold}
+            if repeated_shapes:
+                logger.warning('N+1 查询: %s %s', endpoint,
+                               '; '.join(f'{repeats}x {shape[:200]}' for shape, repeats in repeated_shapes.items()))
+            profile_registry.record(endpoint, recorder.count, recorder.duration * 1000, wall_ms, repeated_shapes)
+            profile_registry.maybe_log()
+        return response
+
+
+@extend_schema(tags=['性能统计'])
+class QueryProfileView(APIView):
+    """
+    接口SQL统计（仅管理员）
+    """
+    permission_classes = [IsAdminRole]
+
+    @extend_schema(summary='获取各接口SQL数量、数据库耗时、总耗时的统计直方图及N+1查询，以及自定义指标')
+    def get(self, request):
+        return ApiResponse(data={
+            'endpoints': profile_registry.snapshot(),
+            'metrics': profile_registry.metrics_snapshot(),
+        }, message='获取成功')
+
+    @extend_schema(summary='清空接口SQL统计')
+    def delete(self, request):
+        profile_registry.reset()
+        return ApiResponse(message='已清空')
@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.middleware import SessionMiddleware
+
+
+class NullSession(SessionBase):
+    """
+    API 请求使用的空会话：不读取也不写入会话存储
+    request.session 依旧可用（AuthenticationMiddleware 依赖它），但内容只存在于本次请求
+    """
+
+    def load(self):
+        return {}
+
+    def exists(self, session_key):
+        return False
+
+    def create(self):
+        self._session_key = None
+
+    def save(self, must_create=False):
+        pass
+
+    def delete(self, session_key=None):
+        pass
+
+    @classmethod
+    def clear_expired(cls):
+        pass
+
+
+class ApiAwareSessionMiddleware(SessionMiddleware):
+    """
+    按路径区分的会话中间件
+    SESSION_SKIP_PATH_PREFIXES 下的请求（默认 /api/，使用 Token 认证）完全跳过会话的读取和保存，
+    SESSION_KEEP_PATH_PREFIXES 下的请求（默认 /api/admin/）仍使用正常会话
+    """
+
+    def skip_session(self, request):
+        path = request.path_info
+        keep_prefixes = getattr(settings, 'SESSION_KEEP_PATH_PREFIXES', ('/api/admin/',))
+        if any(path.startswith(prefix) for prefix in keep_prefixes):
+            return False
+        skip_prefixes = getattr(settings, 'SESSION_SKIP_PATH_PREFIXES', ('/api/',))
+        return any(path.startswith(prefix) for prefix in skip_prefixes)
+
+    def process_request(self, request):
+        if self.skip_session(request):
+            request.session = NullSession()
+            return
+        super().process_request(request)
+
+    def process_response(self, request, response):
+        if isinstance(getattr(request, 'session', None), NullSession):
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,20 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from middleware.token import token_cache
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def invalidate_token_cache(sender, instance, **kwargs):
+    """token 重新签发、刷新或删除时失效缓存"""
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=get_user_model())
+def invalidate_user_token_cache(sender, instance, created, **kwargs):
+    """用户信息变更（如被禁用）时失效该用户的 token 缓存"""
+    if not created:
+        token_cache.invalidate_user(instance.pk)
@@ -1,14 +1,138 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+
+def get_token_lifetime():
+    """Token 有效期，读取 TOKEN_EXPIRE_AFTER_HOURS 配置"""
+    return timedelta(hours=getattr(settings, 'TOKEN_EXPIRE_AFTER_HOURS', 4))
+
+
+class TokenCache:
+    """
+    Token 认证缓存（进程内 LRU + TTL，可选 Django 缓存作为二级缓存）
+    key -> (用户快照, token, token过期时间, 缓存失效时间)
+    缓存失效时间不会超过 token 本身的过期时间；用户禁用、重新登录时通过信号失效
+    多进程部署时，其他进程的进程内缓存最多保留 TOKEN_CACHE_TTL 秒，以此控制禁用用户的生效延迟
+    """
+    cache_prefix = 'auth:token:'
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'TOKEN_CACHE_ENABLED', True)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_CACHE_TTL', 60)
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_CACHE_MAX_SIZE', 10000)
+
+    @property
+    def use_django_cache(self):
+        return getattr(settings, 'TOKEN_CACHE_USE_DJANGO_CACHE', False)
+
+    def get(self, key):
+        """返回 (user, token, expires_at)，未命中返回 None"""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[3] > now:
+                    self._entries.move_to_end(key)
+                    return entry[0], entry[1], entry[2]
+                del self._entries[key]
+        if self.use_django_cache:
+            shared = cache.get(self.cache_prefix + key)
+            if shared is not None:
+                user, token, expires_at = shared
+                self._store_local(key, user, token, expires_at)
+                return user, token, expires_at
+        return None
+
+    def set(self, key, user, token, expires_at):
+        if not self.enabled:
+            return
+        self._store_local(key, user, token, expires_at)
+        if self.use_django_cache:
+            timeout = self._timeout(expires_at)
+            if timeout > 0:
+                cache.set(self.cache_prefix + key, (user, token, expires_at), timeout)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.use_django_cache:
+            cache.delete(self.cache_prefix + key)
+
+    def invalidate_user(self, user_id):
+        """失效某个用户的全部 token 缓存"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry[0].pk == user_id]
+            for key in keys:
+                del self._entries[key]
+        if self.use_django_cache:
+            from rest_framework.authtoken.models import Token
+            cache.delete_many([self.cache_prefix + key for key in
+                               Token.objects.filter(user_id=user_id).values_list('key', flat=True)])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _timeout(self, expires_at):
+        return min(self.ttl, int((expires_at - timezone.now()).total_seconds()))
+
+    def _store_local(self, key, user, token, expires_at):
+        timeout = self._timeout(expires_at)
+        if timeout <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (user, token, expires_at, time.monotonic() + timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
 class ExpiringTokenAuthentication(TokenAuthentication):
     """
     自定义Token认证类，支持token过期机制
+    认证结果经过 token_cache 缓存，避免每个请求都查询 authtoken_token
     """
 
     def authenticate_credentials(self, key):
+        cached = token_cache.get(key)
+        if cached is not None:
+            user, token, expires_at = cached
+            # 缓存命中时同样检查过期时间
+            if timezone.now() > expires_at:
+                token_cache.invalidate(key)
+                raise AuthenticationFailed({
+                    'code': 401,
+                    'message': 'Token已过期，请重新登录',
+                    'data': {}
+                })
+            # 返回副本，避免请求之间共享同一个用户对象
+            return (copy.copy(user), token)
+
         model = self.get_model()
         try:
             token = model.objects.select_related('user').get(key=key)
@@ -24,11 +148,13 @@ class ExpiringTokenAuthentication(TokenAuthentication):
                 'message': '用户账户已被禁用',
                 'data': {}
             })
-        # 检查token是否过期（4小时）
-        if timezone.now() > token.created + timedelta(hours=4):
+        # 检查token是否过期（默认4小时）
+        expires_at = token.created + get_token_lifetime()
+        if timezone.now() > expires_at:
             raise AuthenticationFailed({
                 'code': 401,
                 'message': 'Token已过期，请重新登录',
                 'data': {}
             })
-        return (token.user, token)
+        token_cache.set(key, token.user, token, expires_at)
+        return (copy.copy(token.user), token)
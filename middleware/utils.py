@@ -1,4 +1,16 @@
-from django.core.paginator import EmptyPage
+import base64
+import datetime
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import EmptyPage, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
 from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
@@ -31,28 +43,142 @@ class ApiResponse(Response):
 
 
 
+class UncappedPageMixin:
+    """页码只校验格式和下限，不按总页数截断（总数为估算值或未计算时使用）"""
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            return super().validate_number(number)
+        if number < 1:
+            return super().validate_number(number)
+        return number
+
+
+class EstimatedCountPaginator(UncappedPageMixin, Paginator):
+    """
+    估算总数的分页器
+    优先使用缓存的精确总数（按去掉排序后的SQL作为筛选条件的归一化键，带TTL）；
+    缓存未命中时，PostgreSQL 规划器估算超过阈值则直接使用估算值，否则执行一次 COUNT 并缓存
+    """
+    total_type = 'exact'
+
+    @cached_property
+    def count(self):
+        object_list = self.object_list
+        if not hasattr(object_list, 'query'):
+            return len(object_list)
+        cache_key = self.get_cache_key(object_list)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            self.total_type = 'cached'
+            return cached
+        estimate = self.planner_estimate(object_list)
+        if estimate is not None and estimate >= getattr(settings, 'PAGINATION_ESTIMATE_THRESHOLD', 10000):
+            self.total_type = 'estimate'
+            return estimate
+        total = object_list.count()
+        cache.set(cache_key, total, getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 60))
+        return total
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+    @staticmethod
+    def get_cache_key(queryset):
+        sql, params = queryset.order_by().query.sql_with_params()
+        digest = hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+        return f'pagination:count:{queryset.model._meta.label_lower}:{digest}'
+
+    @staticmethod
+    def planner_estimate(queryset):
+        """读取 PostgreSQL 规划器的行数估算，其他数据库返回 None"""
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class NoCountPaginator(UncappedPageMixin, Paginator):
+    """
+    不计算总数的分页器：多取一条判断是否有下一页
+    count 只是已知的下限，不会出现在响应里
+    """
+    total_type = 'none'
+    has_more = False
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        self.has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        self.count = bottom + len(rows) + (1 if self.has_more else 0)
+        return self._get_page(rows, number, self)
+
+
 class CustomPagination(PageNumberPagination):
     page_size = 20  # 默认每页条数
     page_query_param = 'currentPage'  # 关键：匹配前端的 "currentPage" 参数（指定页码）
     page_size_query_param = 'pageSize'  # 匹配前端的 "pageSize" 参数（指定每页条数）
     max_page_size = 999  # 最大每页条数限制
+    # 游标分页参数：视图设置 cursor_pagination = True 且请求带上 cursor 参数（首页传空值）时启用
+    cursor_query_param = 'cursor'
+    cursor_mode = False
+    # 总数计算方式：?total=exact(精确) | estimate(估算/缓存) | none(不返回)，视图可用 pagination_total_mode 设置默认值
+    total_query_param = 'total'
+    total_paginator_classes = {
+        'exact': Paginator,
+        'estimate': EstimatedCountPaginator,
+        'none': NoCountPaginator,
+    }
 
     def get_paginated_response(self, data):
+        if self.cursor_mode:
+            return self.get_cursor_paginated_response(data)
+        paginator = self.page.paginator
+        total_type = getattr(paginator, 'total_type', 'exact')
+        if total_type == 'none':
+            total = total_pages = None
+            has_next = paginator.has_more
+        else:
+            total = paginator.count
+            total_pages = paginator.num_pages
+            has_next = self.page.number < total_pages
         # 现在这个方法会在分页生效时被自动调用
         return ApiResponse({
             'pagination': {
                 'page': self.page.number,  # 当前页码
-                'page_size': self.page.paginator.per_page,  # 使用实际的page_size参数
-                'total': self.page.paginator.count,  # 总记录数
-                'total_pages': self.page.paginator.num_pages  # 总页数
+                'page_size': paginator.per_page,  # 使用实际的page_size参数
+                'total': total,  # 总记录数
+                'total_pages': total_pages,  # 总页数
+                'total_type': total_type,  # 总数类型：exact、cached、estimate、none
+                'has_next': has_next
             },
             'results': data
         })
 
+    def get_total_mode(self, request, view):
+        mode = request.query_params.get(self.total_query_param) or \
+            getattr(view, 'pagination_total_mode', 'exact')
+        return mode if mode in self.total_paginator_classes else 'exact'
+
     def paginate_queryset(self, queryset, request, view=None):
         """
         处理超出范围的页码请求
         """
+        if self.use_cursor(request, view):
+            return self.paginate_queryset_by_cursor(queryset, request, view=view)
+        self.django_paginator_class = self.total_paginator_classes[self.get_total_mode(request, view)]
         try:
             return super().paginate_queryset(queryset, request, view=view)
         except Exception as e:
@@ -62,13 +188,179 @@ class CustomPagination(PageNumberPagination):
                 self.request = request
                 # 创建一个空的分页结果
                 page_size = self.get_page_size(request) or self.page_size
-                from django.core.paginator import Paginator
                 empty_paginator = Paginator([], page_size)
                 self.page = empty_paginator.page(1)
                 return []
             # 如果是其他异常，重新抛出
             raise e
 
+    # ---------------- 游标（keyset）分页 ----------------
+
+    def use_cursor(self, request, view):
+        """视图开启了游标分页，且请求携带 cursor 参数"""
+        return bool(getattr(view, 'cursor_pagination', False)) and \
+            self.cursor_query_param in request.query_params
+
+    def paginate_queryset_by_cursor(self, queryset, request, view=None):
+        """
+        按 (排序字段, id) 做 keyset 分页，不执行 COUNT，也没有 OFFSET 扫描
+        多取一条用于判断是否还有下一页
+        """
+        self.cursor_mode = True
+        self.request = request
+        self.cursor_page_size = self.get_page_size(request) or self.page_size
+        field_name, descending = self.get_cursor_ordering(queryset)
+        self.cursor_field = field_name
+        self.cursor_descending = descending
+
+        cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param), queryset.model)
+        if cursor is False:
+            # 无效的游标与无效页码一致，返回空结果
+            self.has_next = self.has_previous = False
+            self.cursor_results = []
+            return []
+        reverse = bool(cursor and cursor['r'])
+
+        model_field = self.get_model_field(queryset.model, field_name)
+        nullable = bool(model_field is not None and model_field.null)
+        if cursor:
+            queryset = queryset.filter(self.cursor_filter(
+                field_name, descending, nullable, cursor['v'], cursor['id'], reverse
+            ))
+        queryset = queryset.order_by(*self.cursor_order_by(field_name, descending, nullable, reverse))
+
+        results = list(queryset[:self.cursor_page_size + 1])
+        has_more = len(results) > self.cursor_page_size
+        results = results[:self.cursor_page_size]
+        if reverse:
+            results.reverse()
+            self.has_previous = has_more
+            self.has_next = True
+        else:
+            self.has_next = has_more
+            self.has_previous = bool(cursor)
+        self.cursor_results = results
+        return results
+
+    def paginate_merged(self, request, model, fetch_page, view=None):
+        """
+        由调用方提供数据的游标分页，用于在内存中按 (create_time, id) 倒序合并多路数据的场景（如关注流推拉合并）
+        fetch_page(after, limit) 接收上一页最后一条的 (create_time, id)（首页为 None），
+        返回排在其后的最多 limit + 1 个对象；只支持向后翻页，不适用时（上一页游标、无效游标）返回 None
+        """
+        self.cursor_field = 'create_time'
+        self.cursor_descending = True
+        cursor = self.decode_cursor(request.query_params.get(self.cursor_query_param), model)
+        if cursor is False or (cursor and cursor['r']) or (cursor and cursor['v'] is None):
+            return None
+        self.cursor_mode = True
+        self.request = request
+        self.cursor_page_size = self.get_page_size(request) or self.page_size
+        results = list(fetch_page((cursor['v'], cursor['id']) if cursor else None, self.cursor_page_size))
+        self.has_next = len(results) > self.cursor_page_size
+        # 合并结果不提供上一页游标
+        self.has_previous = False
+        self.cursor_results = results[:self.cursor_page_size]
+        return self.cursor_results
+
+    def get_cursor_paginated_response(self, data):
+        results = self.cursor_results
+        next_cursor = prev_cursor = None
+        if results and self.has_next:
+            next_cursor = self.encode_cursor(results[-1], reverse=False)
+        if results and self.has_previous:
+            prev_cursor = self.encode_cursor(results[0], reverse=True)
+        return ApiResponse({
+            'pagination': {
+                'mode': 'cursor',
+                'page_size': self.cursor_page_size,
+                'next_cursor': next_cursor,  # 下一页游标，为空表示没有更多
+                'prev_cursor': prev_cursor,  # 上一页游标
+                'has_next': self.has_next,
+                'has_previous': self.has_previous
+            },
+            'results': data
+        })
+
+    def get_cursor_ordering(self, queryset):
+        """取查询集（OrderingFilter 或模型默认）的第一个排序字段作为游标键"""
+        ordering = [item for item in (queryset.query.order_by or queryset.model._meta.ordering or [])
+                    if isinstance(item, str)]
+        if not ordering:
+            return 'id', True
+        first = ordering[0]
+        field_name = first.lstrip('-')
+        if field_name == 'pk':
+            field_name = 'id'
+        return field_name, first.startswith('-')
+
+    def get_model_field(self, model, field_name):
+        try:
+            return model._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            return None
+
+    def cursor_order_by(self, field_name, descending, nullable, reverse):
+        """排序：NULL 始终排在正向顺序的末尾，反向翻页时整体倒转"""
+        if reverse:
+            descending = not descending
+        if field_name == 'id':
+            return ['-id' if descending else 'id']
+        expression = F(field_name)
+        # 正向时 NULL 在末尾；反向翻页时 NULL 在开头
+        nulls = {}
+        if nullable:
+            nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        order = expression.desc(**nulls) if descending else expression.asc(**nulls)
+        return [order, '-id' if descending else 'id']
+
+    def cursor_filter(self, field_name, descending, nullable, value, last_id, reverse):
+        """
+        构造 keyset 条件
+        正向：取排在 (value, last_id) 之后的数据；反向：取排在它之前的数据
+        """
+        after = descending != reverse
+        id_lookup = 'id__lt' if after else 'id__gt'
+        if field_name == 'id':
+            return Q(**{id_lookup: last_id})
+        value_lookup = f'{field_name}__lt' if after else f'{field_name}__gt'
+        if value is None:
+            same_value = Q(**{f'{field_name}__isnull': True, id_lookup: last_id})
+            # NULL 排在正向末尾：反向翻页时所有非 NULL 都在它之前
+            return same_value if not reverse else same_value | Q(**{f'{field_name}__isnull': False})
+        condition = Q(**{value_lookup: value}) | Q(**{field_name: value, id_lookup: last_id})
+        if nullable and not reverse:
+            condition |= Q(**{f'{field_name}__isnull': True})
+        return condition
+
+    def encode_cursor(self, instance, reverse):
+        value = getattr(instance, self.cursor_field)
+        if isinstance(value, (datetime.datetime, datetime.date)):
+            # 保留微秒精度，DjangoJSONEncoder 会截断到毫秒
+            value = value.isoformat()
+        payload = {
+            'v': value,
+            'id': instance.id,
+            'r': reverse,
+        }
+        raw = json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, encoded, model):
+        """解析游标；空值表示第一页，解析失败返回 False"""
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            model_field = self.get_model_field(model, self.cursor_field)
+            value = payload['v']
+            if value is not None and model_field is not None:
+                value = model_field.to_python(value)
+            return {'v': value, 'id': int(payload['id']), 'r': bool(payload.get('r'))}
+        except (ValueError, TypeError, KeyError, ValidationError):
+            return False
+
 def custom_exception_handler(exc, context):
     """
     自定义异常处理函数
@@ -0,0 +1,223 @@
+"""
+内容、动态浏览数统计
+同一观看者（登录用户或设备）同一天多次浏览同一条内容只计一次：
+每个 (类型, ID, 日期) 使用一个可扩容的布隆过滤器判断是否已经计过，
+判重通过后增量进入 middleware.counter_buffer，由缓冲批量写入 t_content / t_social_dynamic。
+请求路径只做内存操作（哈希 + 位运算），不查询、不锁定内容行。
+判重状态在进程内存中，多进程部署时每个进程各自判重，同一观看者最多被每个进程各计一次。
+"""
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema, OpenApiExample
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from .counter_buffer import counter_buffer
+from .utils import ApiResponse
+
+
+def get_view_model(target_type):
+    """浏览事件中的 type 对应的模型"""
+    if target_type == 'content':
+        from contents.models import Content
+        return Content
+    if target_type == 'dynamic':
+        from societies.models import Dynamic
+        return Dynamic
+    return None
+
+
+class BloomFilter:
+    """固定容量的布隆过滤器，使用 blake2b 摘要做双重哈希"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def hashes(key):
+        """元素的两个64位哈希值，同一元素在各个过滤器中复用"""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+    def _positions(self, hashes):
+        first, second = hashes
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def contains(self, hashes):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(hashes))
+
+    def add(self, hashes):
+        """加入元素，返回加入前是否（可能）已经存在"""
+        exists = True
+        for position in self._positions(hashes):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                exists = False
+                self.bits[position >> 3] |= mask
+        if not exists:
+            self.count += 1
+        return exists
+
+
+class ScalableBloomFilter:
+    """
+    可扩容的布隆过滤器：初始容量很小，写满后追加一个容量翻倍、误判率减半的过滤器，
+    冷门内容只占用几十字节，热门内容按实际观看人数增长，总误判率不超过 2 * error_rate
+    """
+
+    def __init__(self, initial_capacity, error_rate):
+        self.error_rate = error_rate
+        self.filters = [BloomFilter(initial_capacity, error_rate / 2)]
+
+    def add(self, key):
+        """加入元素，返回加入前是否（可能）已经存在"""
+        hashes = BloomFilter.hashes(key)
+        if any(bloom.contains(hashes) for bloom in self.filters):
+            return True
+        current = self.filters[-1]
+        if current.count >= current.capacity:
+            current = BloomFilter(current.capacity * 2, self.error_rate / 2 ** (len(self.filters) + 1))
+            self.filters.append(current)
+        return current.add(hashes)
+
+    @property
+    def nbytes(self):
+        return sum(len(bloom.bits) for bloom in self.filters)
+
+
+class ViewTracker:
+    """
+    按 (类型, ID, 日期) 保存布隆过滤器，最多保留 VIEW_TRACKER_MAX_FILTERS 个，
+    超出时淘汰最久未访问的过滤器（被淘汰的内容当天可能重复计数）
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filters = OrderedDict()
+        self._day = None
+
+    @property
+    def max_filters(self):
+        return getattr(settings, 'VIEW_TRACKER_MAX_FILTERS', 50000)
+
+    def _get_filter(self, key, day):
+        if day != self._day:
+            # 跨天后旧日期的过滤器不再需要
+            self._filters.clear()
+            self._day = day
+        bloom = self._filters.get(key)
+        if bloom is None:
+            bloom = ScalableBloomFilter(
+                getattr(settings, 'VIEW_TRACKER_INITIAL_CAPACITY', 64),
+                getattr(settings, 'VIEW_TRACKER_ERROR_RATE', 0.01),
+            )
+            self._filters[key] = bloom
+            while len(self._filters) > self.max_filters:
+                self._filters.popitem(last=False)
+        else:
+            self._filters.move_to_end(key)
+        return bloom
+
+    def record(self, model, pk, viewer):
+        """记录一次浏览，当天首次浏览时计数并返回 True"""
+        day = timezone.localdate()
+        with self._lock:
+            seen = self._get_filter((model, pk), day).add(viewer)
+        if seen:
+            return False
+        counter_buffer.add(model, pk, 'view_count')
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                'day': str(self._day) if self._day else None,
+                'filters': len(self._filters),
+                'bytes': sum(bloom.nbytes for bloom in self._filters.values()),
+            }
+
+
+view_tracker = ViewTracker()
+
+
+def get_viewer_key(request):
+    """观看者标识：登录用户ID，未登录时使用设备ID，没有设备ID时使用IP和User-Agent"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return f'u:{user.pk}'
+    device_id = request.META.get('HTTP_X_DEVICE_ID')
+    data = getattr(request, 'data', None)
+    if not device_id and hasattr(data, 'get'):
+        device_id = data.get('device_id')
+    if device_id:
+        return f'd:{device_id}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    ip = forwarded.split(',')[0].strip() if forwarded else request.META.get('REMOTE_ADDR', '')
+    return f'a:{ip}:{request.META.get("HTTP_USER_AGENT", "")}'
+
+
+def track_view(request, model, pk):
+    """在详情接口中记录浏览"""
+    return view_tracker.record(model, pk, get_viewer_key(request))
+
+
+class ViewEventView(APIView):
+    """
+    浏览事件上报
+    客户端在内容、动态曝光或播放时上报，允许未登录用户（按设备判重）
+    """
+    permission_classes = [permissions.AllowAny]
+    max_events = 100
+
+    @extend_schema(
+        summary='上报浏览事件',
+        tags=['浏览统计'],
+        request={
+            'application/json': {
+                'type': 'object',
+                'properties': {
+                    'type': {'type': 'string', 'enum': ['content', 'dynamic'], 'description': '类型'},
+                    'id': {'type': 'integer', 'description': '内容或动态ID'},
+                    'device_id': {'type': 'string', 'description': '设备ID（未登录时用于判重，也可放在 X-Device-Id 请求头）'},
+                    'events': {
+                        'type': 'array',
+                        'description': '批量上报，每项包含 type 和 id，最多100条',
+                        'items': {'type': 'object', 'properties': {'type': {'type': 'string'}, 'id': {'type': 'integer'}}},
+                    },
+                },
+            }
+        },
+        examples=[OpenApiExample('批量上报', value={'events': [{'type': 'content', 'id': 1}, {'type': 'dynamic', 'id': 2}]})],
+    )
+    def post(self, request):
+        events = request.data.get('events')
+        if events is None:
+            events = [{'type': request.data.get('type'), 'id': request.data.get('id')}]
+        if not isinstance(events, list) or not events:
+            return ApiResponse(code=400, message="缺少浏览事件")
+        if len(events) > self.max_events:
+            return ApiResponse(code=400, message=f"单次最多上报{self.max_events}条浏览事件")
+
+        parsed = []
+        for event in events:
+            model = get_view_model(event.get('type')) if isinstance(event, dict) else None
+            try:
+                pk = int(event.get('id'))
+            except (AttributeError, TypeError, ValueError):
+                pk = None
+            if model is None or pk is None or pk <= 0:
+                return ApiResponse(code=400, message="浏览事件的 type 或 id 无效")
+            parsed.append((model, pk))
+
+        viewer = get_viewer_key(request)
+        counted = sum(view_tracker.record(model, pk, viewer) for model, pk in parsed)
+        return ApiResponse(data={'received': len(parsed), 'counted': counted}, message="上报成功")
@@ -0,0 +1,104 @@
+"""
+当前登录用户对一页数据的互动状态解析
+只针对当前页出现的目标ID和作者ID查询，每种关系一条有界查询，返回集合（set）
+用于 is_liked / is_favourites / is_follower / is_downvoted 以及用户自己的评分
+"""
+
+ALL_RELATIONS = ('follow', 'like', 'favourite', 'downvote', 'rating')
+
+
+def empty_viewer_context(request):
+    """未登录或当前页为空时使用的上下文"""
+    return {
+        'request': request,
+        'followed_user_ids': set(),
+        'liked_dynamic_ids': set(),
+        'favourite_dynamic_ids': set(),
+        'downvoted_content_ids': set(),
+        'liked_comment_ids': set(),
+        'user_scores': {},
+    }
+
+
+def resolve_viewer_state(request, target_type, target_ids=(), author_ids=(), relations=ALL_RELATIONS):
+    """
+    解析当前用户对给定目标的互动状态
+    target_type: 点赞/收藏/点踩表中的 type 值（content、dynamic、comment）
+    target_ids: 当前页的目标ID
+    author_ids: 当前页目标的作者ID（用于关注状态）
+    relations: 需要解析的关系，默认全部
+    """
+    context_data = empty_viewer_context(request)
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated:
+        return context_data
+
+    target_ids = {target_id for target_id in target_ids if target_id is not None}
+    author_ids = {author_id for author_id in author_ids if author_id is not None}
+
+    if 'follow' in relations and author_ids:
+        from follows.models import Follow
+        context_data['followed_user_ids'] = set(Follow.objects.filter(
+            follower_id=user.id,
+            followee_id__in=author_ids,
+            status='active'
+        ).values_list('followee_id', flat=True))
+
+    if not target_ids:
+        return context_data
+
+    if 'like' in relations:
+        from likes.models import Like
+        liked_ids = set(Like.objects.filter(
+            user_id=user.id,
+            type=target_type,
+            target_id__in=target_ids,
+            status='active'
+        ).values_list('target_id', flat=True))
+        if target_type == 'comment':
+            context_data['liked_comment_ids'] = liked_ids
+        else:
+            context_data['liked_dynamic_ids'] = liked_ids
+
+    if 'favourite' in relations:
+        from favourites.models import Favorite
+        context_data['favourite_dynamic_ids'] = set(Favorite.objects.filter(
+            user_id=user.id,
+            type=target_type,
+            target_id__in=target_ids,
+            status='active'
+        ).values_list('target_id', flat=True))
+
+    if 'downvote' in relations:
+        from favourites.models import Downvote
+        context_data['downvoted_content_ids'] = set(Downvote.objects.filter(
+            user_id=user.id,
+            type=target_type,
+            target_id__in=target_ids,
+            status='active'
+        ).values_list('target_id', flat=True))
+
+    if 'rating' in relations and target_type == 'content':
+        from rating.models import Rating
+        context_data['user_scores'] = dict(Rating.objects.filter(
+            user_id=user.id,
+            content_id__in=target_ids
+        ).values_list('content_id', 'score'))
+
+    return context_data
+
+
+def build_viewer_context(request, target_type, instances, author_field=None, relations=ALL_RELATIONS):
+    """
+    从当前页的对象中提取目标ID和作者ID，再解析互动状态
+    instances: 当前页的模型实例（列表、单个实例或查询集）
+    author_field: 作者ID字段名，例如 author_id、user_id
+    """
+    if instances is None:
+        instances = []
+    elif not isinstance(instances, (list, tuple)) and not hasattr(instances, '__iter__'):
+        instances = [instances]
+    instances = list(instances)
+    target_ids = [instance.id for instance in instances]
+    author_ids = [getattr(instance, author_field, None) for instance in instances] if author_field else []
+    return resolve_viewer_state(request, target_type, target_ids, author_ids, relations=relations)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class NotificationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'notifications'
+
+    def ready(self):
+        # 注册信号（写入、删除通知和互动消息时维护未读数）
+        from notifications import signals  # noqa: F401
@@ -0,0 +1,149 @@
+"""
+通知发送
+- 定向发送：请求内只保存一个 NotificationBatch，提交后由后台线程分块 bulk_create，每块一次性累加接收者的未读数
+- 全局广播：只保存一行 user 为空的通知，读取收件箱时按用户的注册时间决定是否可见（读时扇出），不逐用户写入
+- 定时发送：send_time 在未来的通知和任务先保存为未发送，由 dispatch_notifications 到期后领取发送
+  （SELECT ... FOR UPDATE SKIP LOCKED，多个进程并行时不会重复发送）
+"""
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from middleware.background import submit_on_commit
+from notifications import inbox
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FIELDS = ('app_name', 'type', 'content', 'is_active')
+DISPATCHED_COUNTER = 'dispatched'
+
+
+def chunk_size():
+    return getattr(settings, 'NOTIFICATION_BATCH_CHUNK_SIZE', 1000)
+
+
+def is_scheduled(send_time):
+    return send_time is not None and send_time > timezone.now()
+
+
+def send_to_users(template, user_ids, send_time=None):
+    """创建定向发送任务（去重并保持顺序），立即发送的在事务提交后由后台发送"""
+    from notifications.models import NotificationBatch
+    user_ids = list(dict.fromkeys(user_ids))
+    batch = NotificationBatch.objects.create(
+        user_ids=user_ids, total=len(user_ids), scheduled_time=send_time if is_scheduled(send_time) else None,
+        **{field: template[field] for field in TEMPLATE_FIELDS if field in template}
+    )
+    if batch.scheduled_time is None:
+        submit_on_commit(deliver_batch, batch.pk)
+    return batch
+
+
+def broadcast(template, send_time=None):
+    """发送全局广播：一行通知，广播总数在发送时累加（立即发送的由 notifications.signals 累加）"""
+    from notifications.models import Notification
+    scheduled = is_scheduled(send_time)
+    return Notification.objects.create(
+        user=None, is_sent=not scheduled, send_time=send_time if scheduled else timezone.now(),
+        **{field: template[field] for field in TEMPLATE_FIELDS if field in template}
+    )
+
+
+def deliver_chunk(batch_id, skip_locked=False):
+    """
+    发送下一块，返回处理的用户数（0 表示已经发送完成）
+    锁住任务行后从 sent_count 继续，多个进程同时处理同一任务时不会重复写入；skip_locked 时任务正被其他进程处理则返回 0
+    """
+    from notifications.models import Notification, NotificationBatch
+    from user.models import User
+    with transaction.atomic():
+        batch = NotificationBatch.objects.select_for_update(skip_locked=skip_locked).filter(pk=batch_id).first()
+        if batch is None or batch.is_sent:
+            return 0
+        user_ids = batch.user_ids[batch.sent_count:batch.sent_count + chunk_size()]
+        # 跳过已经不存在的用户，避免整块因外键约束失败
+        existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+        now = timezone.now()
+        Notification.objects.bulk_create([
+            Notification(user_id=user_id, is_sent=True, send_time=now,
+                         **{field: getattr(batch, field) for field in TEMPLATE_FIELDS})
+            for user_id in user_ids if user_id in existing
+        ])
+        if batch.is_active:
+            inbox.add_unread(inbox.CATEGORY_SYSTEM, dict.fromkeys(existing, 1))
+        batch.sent_count += len(user_ids)
+        update_fields = ['sent_count', 'update_time']
+        if batch.sent_count >= batch.total:
+            batch.is_sent, batch.send_time = True, now
+            update_fields += ['is_sent', 'send_time']
+        batch.save(update_fields=update_fields)
+        return len(user_ids)
+
+
+def deliver_batch(batch_id):
+    """逐块发送直到完成（后台任务）"""
+    chunks = 0
+    while deliver_chunk(batch_id):
+        chunks += 1
+    logger.info('通知批量发送完成: batch=%s，本进程发送 %s 块', batch_id, chunks)
+
+
+def dispatch_due(limit):
+    """
+    领取并发送最多 limit 条到期的定时通知，返回每条的发送延迟（秒）
+    领取、标记已发送和累加未读数在同一事务内，被其他进程锁住的行直接跳过
+    """
+    from notifications.models import Notification
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(is_sent=False, send_time__lte=now).order_by('send_time')
+            .only('id', 'user_id', 'send_time', 'is_active', 'is_deleted')[:limit]
+        )
+        if not rows:
+            return []
+        Notification.objects.filter(pk__in=[row.pk for row in rows]).update(is_sent=True, update_time=now)
+        # 通知ID在创建时分配，发送前已经全部已读的用户不计入未读（见 inbox.add_dispatched）
+        visible = [row for row in rows if row.is_active and not row.is_deleted]
+        inbox.add_dispatched(inbox.CATEGORY_SYSTEM, [(row.user_id, row.pk) for row in visible if row.user_id])
+        inbox.add_dispatched_broadcasts([row for row in visible if not row.user_id])
+        inbox.increment_counter(DISPATCHED_COUNTER, len(rows))
+    return [(now - row.send_time).total_seconds() for row in rows]
+
+
+def dispatch_due_batches(limit):
+    """
+    发送到期的定时任务（以及立即发送但被中断的任务）各一块，返回 [(写入的用户数, 延迟秒数)]
+    """
+    from notifications.models import NotificationBatch
+    now = timezone.now()
+    due = NotificationBatch.objects.filter(is_sent=False).filter(
+        Q(scheduled_time__lte=now) | Q(scheduled_time__isnull=True)
+    ).order_by('id').values_list('id', 'scheduled_time', 'create_time')[:limit]
+    results = []
+    for batch_id, scheduled_time, create_time in due:
+        processed = deliver_chunk(batch_id, skip_locked=True)
+        if processed:
+            inbox.increment_counter(DISPATCHED_COUNTER, processed)
+            results.append((processed, (now - (scheduled_time or create_time)).total_seconds()))
+    return results
+
+
+def dispatcher_stats():
+    """定时发送的积压和延迟（管理接口、dispatch_notifications 使用）"""
+    from notifications.models import Notification, NotificationBatch, NotificationCounter
+    now = timezone.now()
+    due = Notification.objects.filter(is_sent=False, send_time__lte=now)
+    oldest = due.aggregate(value=Min('send_time'))['value']
+    return {
+        'pending': due.count(),
+        'scheduled': Notification.objects.filter(is_sent=False, send_time__gt=now).count(),
+        'oldest_lag_seconds': round((now - oldest).total_seconds(), 3) if oldest else 0,
+        'pending_batches': NotificationBatch.objects.filter(is_sent=False).count(),
+        'dispatched_total': NotificationCounter.objects.filter(name=DISPATCHED_COUNTER)
+        .values_list('value', flat=True).first() or 0,
+    }
@@ -0,0 +1,219 @@
+"""
+收件箱已读状态和未读数
+- 系统通知（Notification）和互动消息（societies.Activity）各有一个已读游标，ID 不大于游标的视为已读
+- 未读数在写入时原子累加（INSERT ... ON CONFLICT DO UPDATE），读取未读数只查用户的状态行和广播总数，不扫描通知表
+- 全局广播（user 为空的通知）只累加全局的广播总数，用户的广播未读数 = 广播总数 - broadcast_seen
+- 全部已读是一条 upsert：游标移到当前最大ID，未读数清零
+- 定时发送的通知在发送时（notifications.delivery.dispatch_due）才计入未读；它的ID在创建时分配，
+  发送前用户已经全部已读（游标越过了它的ID）的，发送后仍然显示为已读，不计入未读（add_dispatched / add_dispatched_broadcasts）
+- 通知被删除、隐藏或恢复时按可见性的变化增减未读数（add_notification / remove_notification）；
+  broadcast_seen 是已读游标越过的和注册前发送的广播数，广播增减时这些用户的 broadcast_seen 同步增减
+"""
+from collections import defaultdict
+
+from django.db import connection
+from django.db.models import F, Max, Q, Value
+from django.db.models.functions import Greatest
+
+CATEGORY_SYSTEM = 'system'
+CATEGORY_INTERACTION = 'interaction'
+CATEGORIES = (CATEGORY_SYSTEM, CATEGORY_INTERACTION)
+BROADCAST_COUNTER = 'broadcast'
+
+
+def is_visible(notification):
+    """通知是否出现在收件箱中（已发送、有效、未删除）"""
+    return bool(notification.is_sent) and bool(notification.is_active) and not notification.is_deleted
+
+
+def add_unread(category, counts):
+    """累加未读数，counts 为 {用户ID: 增量}"""
+    counts = {user_id: count for user_id, count in counts.items() if user_id and count}
+    if not counts:
+        return
+    placeholders = ', '.join(['(%s, %s, 0, %s, 0, now())'] * len(counts))
+    params = []
+    for user_id, count in counts.items():
+        params.extend([user_id, category, count])
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO t_notification_read_state '
+            '(user_id, category, last_read_id, unread_count, broadcast_seen, update_time) '
+            f'VALUES {placeholders} '
+            'ON CONFLICT (user_id, category) DO UPDATE SET '
+            'unread_count = t_notification_read_state.unread_count + EXCLUDED.unread_count, '
+            'update_time = EXCLUDED.update_time',
+            params,
+        )
+
+
+def add_dispatched(category, items):
+    """
+    定时通知发送时累加未读数，items 为 [(用户ID, 通知ID)]
+    锁住这些用户的状态行后比较已读游标，ID 不大于游标的视为已读，与收件箱的 is_read 一致
+    """
+    from notifications.models import NotificationReadState
+    user_ids = sorted({user_id for user_id, _ in items if user_id})
+    if not user_ids:
+        return
+    cursors = dict(NotificationReadState.objects.select_for_update()
+                   .filter(user_id__in=user_ids, category=category).order_by('user_id')
+                   .values_list('user_id', 'last_read_id'))
+    counts = defaultdict(int)
+    for user_id, item_id in items:
+        if user_id and item_id > cursors.get(user_id, 0):
+            counts[user_id] += 1
+    add_unread(category, counts)
+
+
+def remove_unread(category, user_id, item_id):
+    """删除一条通知或互动消息，它还未读时未读数减一"""
+    from notifications.models import NotificationReadState
+    NotificationReadState.objects.filter(user_id=user_id, category=category, last_read_id__lt=item_id) \
+        .update(unread_count=Greatest(F('unread_count') - 1, Value(0)))
+
+
+def increment_counter(name, count=1):
+    """全局计数加 count（t_notification_counter，不存在时创建）"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO t_notification_counter (name, value, update_time) VALUES (%s, %s, now()) '
+            'ON CONFLICT (name) DO UPDATE SET value = t_notification_counter.value + EXCLUDED.value, '
+            'update_time = EXCLUDED.update_time',
+            [name, count],
+        )
+
+
+def add_broadcast(count=1):
+    """广播总数加 count"""
+    increment_counter(BROADCAST_COUNTER, count)
+
+
+def move_broadcast(notification, delta):
+    """
+    广播变为可见（delta=1）或不可见（delta=-1）时广播总数加 delta；
+    已读游标越过它、或注册晚于它发送的用户（收件箱中显示为已读或不显示）broadcast_seen 同时加 delta，这些用户的未读数不变
+    """
+    from notifications.models import NotificationReadState
+    increment_counter(BROADCAST_COUNTER, delta)
+    seen = Q(last_read_id__gte=notification.pk)
+    if notification.send_time is not None:
+        seen |= Q(user__date_joined__gt=notification.send_time)
+    NotificationReadState.objects.filter(seen, category=CATEGORY_SYSTEM) \
+        .update(broadcast_seen=Greatest(F('broadcast_seen') + delta, Value(0)))
+
+
+def add_dispatched_broadcasts(notifications):
+    """定时广播发送时逐条累加广播总数，发送前已读游标已经越过它的用户收件箱中显示为已读，未读数不变"""
+    for notification in notifications:
+        move_broadcast(notification, 1)
+
+
+def add_notification(notification):
+    """已有的通知变为可见（恢复删除、重新激活）：计入接收用户或全部用户的未读数，已读游标越过它的不计入"""
+    if notification.user_id:
+        add_dispatched(CATEGORY_SYSTEM, [(notification.user_id, notification.pk)])
+    else:
+        move_broadcast(notification, 1)
+
+
+def remove_notification(notification):
+    """可见的通知被删除或隐藏：从接收用户或全部用户的未读数中减去"""
+    if notification.user_id:
+        remove_unread(CATEGORY_SYSTEM, notification.user_id, notification.pk)
+    else:
+        move_broadcast(notification, -1)
+
+
+def init_user(user_id):
+    """新注册的用户：注册前的广播不可见，也不计入未读"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO t_notification_read_state '
+            '(user_id, category, last_read_id, unread_count, broadcast_seen, update_time) '
+            'VALUES (%s, %s, 0, 0, COALESCE((SELECT value FROM t_notification_counter WHERE name = %s), 0), now()) '
+            'ON CONFLICT (user_id, category) DO NOTHING',
+            [user_id, CATEGORY_SYSTEM, BROADCAST_COUNTER],
+        )
+
+
+# 注册前发送的广播：收件箱不显示（send_time 早于 date_joined），broadcast_seen 按它们的数量初始化
+INIT_USERS_SQL = """
+    INSERT INTO t_notification_read_state (user_id, category, last_read_id, unread_count, broadcast_seen, update_time)
+    SELECT u.id, %s, 0, 0, (
+        SELECT COUNT(*) FROM t_notifications n
+        WHERE n.user_id IS NULL AND n.is_sent AND n.is_active AND NOT COALESCE(n.is_deleted, false)
+          AND n.send_time < u.date_joined
+    ), now()
+    FROM custom_user u WHERE u.id BETWEEN %s AND %s
+    ON CONFLICT (user_id, category) DO UPDATE SET
+        broadcast_seen = EXCLUDED.broadcast_seen, update_time = EXCLUDED.update_time
+    WHERE t_notification_read_state.last_read_id = 0
+"""
+
+
+def init_users(first_id, last_id):
+    """
+    批量初始化 ID 在 [first_id, last_id] 的用户（COPY 写入的用户不触发 post_save）；
+    没有全部已读过的用户重新按注册时间计算 broadcast_seen，与收件箱的 date_joined 过滤一致
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(INIT_USERS_SQL, [CATEGORY_SYSTEM, first_id, last_id])
+        return cursor.rowcount
+
+
+def get_read_state(user_id, category):
+    """(已读游标, 广播已读数)，没有状态时为 (0, 0)"""
+    from notifications.models import NotificationReadState
+    row = NotificationReadState.objects.filter(user_id=user_id, category=category) \
+        .values_list('last_read_id', 'broadcast_seen').first()
+    return row or (0, 0)
+
+
+def get_broadcast_total():
+    """已发送的广播总数"""
+    from notifications.models import NotificationCounter
+    return NotificationCounter.objects.filter(name=BROADCAST_COUNTER).values_list('value', flat=True).first() or 0
+
+
+def unread_counts(user_id):
+    """各分类的未读数和总数（两次主键/唯一索引查询）"""
+    from notifications.models import NotificationReadState
+    states = {category: (unread, seen) for category, unread, seen in
+              NotificationReadState.objects.filter(user_id=user_id)
+              .values_list('category', 'unread_count', 'broadcast_seen')}
+    broadcast_total = get_broadcast_total()
+    counts = {}
+    for category in CATEGORIES:
+        unread, seen = states.get(category, (0, 0))
+        if category == CATEGORY_SYSTEM:
+            unread += max(broadcast_total - seen, 0)
+        counts[category] = unread
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def mark_all_read(user_id, categories=CATEGORIES):
+    """把游标移到当前最大ID并清零未读数（每个分类一行 upsert，合并为一条语句）"""
+    from notifications.models import Notification
+    from societies.models import Activity
+    latest = {
+        CATEGORY_SYSTEM: lambda: Notification.objects.aggregate(value=Max('id'))['value'],
+        CATEGORY_INTERACTION: lambda: Activity.objects.aggregate(value=Max('id'))['value'],
+    }
+    broadcast_total = get_broadcast_total()
+    params = []
+    for category in categories:
+        params.extend([user_id, category, latest[category]() or 0,
+                       broadcast_total if category == CATEGORY_SYSTEM else 0])
+    placeholders = ', '.join(['(%s, %s, %s, 0, %s, now())'] * len(categories))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO t_notification_read_state '
+            '(user_id, category, last_read_id, unread_count, broadcast_seen, update_time) '
+            f'VALUES {placeholders} '
+            'ON CONFLICT (user_id, category) DO UPDATE SET '
+            'last_read_id = GREATEST(t_notification_read_state.last_read_id, EXCLUDED.last_read_id), '
+            'unread_count = 0, broadcast_seen = EXCLUDED.broadcast_seen, update_time = EXCLUDED.update_time',
+            params,
+        )
@@ -0,0 +1,70 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from middleware.profiling import profile_registry
+from notifications import delivery
+
+# 发送延迟直方图分桶（秒）
+LAG_SECONDS_BUCKETS = (1, 5, 15, 30, 60, 300, 900, 3600)
+
+
+class Command(BaseCommand):
+    help = '发送到期的定时通知和批量发送任务（可以作为常驻进程运行，多个进程并行时用 SKIP LOCKED 领取，不会重复发送）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每次领取的通知数')
+        parser.add_argument('--interval', type=float, default=1, help='没有到期通知时的轮询间隔（秒）')
+        parser.add_argument('--report-interval', type=float, default=60, help='输出吞吐、延迟和积压的间隔（秒）')
+        parser.add_argument('--once', action='store_true', help='发送完当前到期的通知后退出')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size 必须大于0')
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        started = window_start = time.monotonic()
+        total = window_sent = 0
+        window_lags = []
+        while not self.stopping:
+            close_old_connections()
+            lags = delivery.dispatch_due(batch_size)
+            batches = delivery.dispatch_due_batches(batch_size)
+            sent = len(lags) + sum(count for count, _ in batches)
+            lags += [lag for _, lag in batches]
+            for lag in lags:
+                profile_registry.observe('notifications.dispatch_lag_seconds', lag, LAG_SECONDS_BUCKETS)
+            total += sent
+            window_sent += sent
+            window_lags += lags
+
+            now = time.monotonic()
+            if now - window_start >= options['report_interval'] or (options['once'] and not sent):
+                self.report(window_sent, now - window_start, window_lags)
+                window_start, window_sent, window_lags = now, 0, []
+            if not sent:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f'共发送 {total} 条，耗时 {time.monotonic() - started:.2f}s'))
+
+    def stop(self, signum, frame):
+        # 处理完当前一批后退出
+        self.stopping = True
+
+    def report(self, sent, elapsed, lags):
+        stats = delivery.dispatcher_stats()
+        lags = sorted(lags)
+        p50 = lags[len(lags) // 2] if lags else 0
+        self.stdout.write(
+            f'吞吐 {sent / elapsed if elapsed else 0:.1f} 条/秒（{sent} 条 / {elapsed:.1f}s），'
+            f'延迟 p50 {p50:.2f}s、最大 {lags[-1] if lags else 0:.2f}s，'
+            f'积压 {stats["pending"]} 条（最早到期 {stats["oldest_lag_seconds"]}s 前），'
+            f'未完成任务 {stats["pending_batches"]} 个，定时 {stats["scheduled"]} 条'
+        )
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_initial'),
+        ('societies', '0005_activity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 't_notification_counter',
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationReadState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('system', '系统通知'), ('interaction', '互动消息')], max_length=20)),
+                ('last_read_id', models.BigIntegerField(default=0, verbose_name='已读游标')),
+                ('unread_count', models.IntegerField(default=0, verbose_name='未读数（不含广播）')),
+                ('broadcast_seen', models.BigIntegerField(default=0, verbose_name='上次全部已读时的广播总数')),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 't_notification_read_state',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-id'], name='t_notification_user_id_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationreadstate',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_read_states', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddConstraint(
+            model_name='notificationreadstate',
+            constraint=models.UniqueConstraint(fields=('user', 'category'), name='t_notification_read_state_uniq'),
+        ),
+        # 按已有数据初始化未读数（此前没有已读状态，全部视为未读）
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO t_notification_read_state (user_id, category, last_read_id, unread_count, broadcast_seen, update_time)
+                SELECT user_id, 'system', 0, COUNT(*), 0, now() FROM t_notifications
+                WHERE user_id IS NOT NULL AND is_active AND NOT COALESCE(is_deleted, false)
+                GROUP BY user_id
+                UNION ALL
+                SELECT recipient_id, 'interaction', 0, COUNT(*), 0, now() FROM t_social_activity
+                WHERE recipient_id IN (SELECT id FROM custom_user)
+                GROUP BY recipient_id;
+                INSERT INTO t_notification_counter (name, value, update_time)
+                SELECT 'broadcast', COUNT(*), now() FROM t_notifications
+                WHERE user_id IS NULL AND is_active AND NOT COALESCE(is_deleted, false);
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:21
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_inbox_read_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_name', models.CharField(blank=True, max_length=255, null=True)),
+                ('type', models.CharField(blank=True, max_length=255, null=True)),
+                ('content', models.TextField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('user_ids', django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), default=list, size=None, verbose_name='接收用户ID（去重后）')),
+                ('total', models.IntegerField(default=0, verbose_name='接收用户数')),
+                ('sent_count', models.IntegerField(default=0, verbose_name='已处理的用户数')),
+                ('is_sent', models.BooleanField(default=False, verbose_name='是否发送完成')),
+                ('send_time', models.DateTimeField(blank=True, null=True, verbose_name='发送完成时间')),
+                ('create_time', models.DateTimeField(auto_now_add=True)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 't_notification_batch',
+                'ordering': ['-id'],
+            },
+        ),
+    ]
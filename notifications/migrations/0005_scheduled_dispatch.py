@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0004_notificationbatch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # 此前 send_time / is_sent 没有生效，已有的通知都已经展示给用户，标记为已发送（未读数在 0003 中已经计入）
+        migrations.RunSQL(
+            sql="""
+                UPDATE t_notifications SET is_sent = true, send_time = COALESCE(send_time, create_time)
+                WHERE NOT COALESCE(is_sent, false)
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddField(
+            model_name='notificationbatch',
+            name='scheduled_time',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='定时发送时间，为空表示立即发送'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_sent', False)), fields=['send_time'], name='t_notification_due_idx'),
+        ),
+    ]
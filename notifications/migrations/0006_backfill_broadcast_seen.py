@@ -0,0 +1,28 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_scheduled_dispatch'),
+    ]
+
+    # 0003 中已有用户的 broadcast_seen 为 0，而收件箱不显示注册前发送的广播，未读数多算了这些广播；
+    # 与 notifications.inbox.init_users 相同：没有全部已读过的用户按注册前发送的广播数初始化
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO t_notification_read_state (user_id, category, last_read_id, unread_count, broadcast_seen, update_time)
+                SELECT u.id, 'system', 0, 0, (
+                    SELECT COUNT(*) FROM t_notifications n
+                    WHERE n.user_id IS NULL AND n.is_sent AND n.is_active AND NOT COALESCE(n.is_deleted, false)
+                      AND n.send_time < u.date_joined
+                ), now()
+                FROM custom_user u
+                ON CONFLICT (user_id, category) DO UPDATE SET
+                    broadcast_seen = EXCLUDED.broadcast_seen, update_time = EXCLUDED.update_time
+                WHERE t_notification_read_state.last_read_id = 0
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,4 +1,7 @@
+from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.utils import timezone
+
 from user.models import User
 
 class Notification(models.Model):
@@ -15,4 +18,76 @@ class Notification(models.Model):
 
     class Meta:
         db_table = 't_notifications'
-        ordering = ['create_time']
\ No newline at end of file
+        ordering = ['create_time']
+        indexes = [
+            # 收件箱：指定用户的通知按ID倒序游标分页
+            models.Index(fields=['user', '-id'], name='t_notification_user_id_idx'),
+            # 定时发送：只索引未发送的通知（dispatch_notifications 按 send_time 领取）
+            models.Index(fields=['send_time'], condition=models.Q(is_sent=False), name='t_notification_due_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # 没有指定发送时间的通知立即发送；指定了发送时间的由 dispatch_notifications 到期后发送
+        if self._state.adding and not self.is_sent and self.send_time is None:
+            self.is_sent = True
+            self.send_time = timezone.now()
+        super().save(*args, **kwargs)
+
+
+class NotificationReadState(models.Model):
+    """
+    用户收件箱的已读游标和未读数（每个用户、每个分类一行）
+    ID 不大于 last_read_id 的通知视为已读；unread_count 在写入通知、互动消息时原子累加（notifications.inbox），
+    全局广播不逐用户累加：系统通知未读数 = unread_count + 广播总数 - broadcast_seen
+    """
+    CATEGORY_CHOICES = (
+        ('system', '系统通知'),
+        ('interaction', '互动消息'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_read_states')
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
+    last_read_id = models.BigIntegerField(default=0, verbose_name="已读游标")
+    unread_count = models.IntegerField(default=0, verbose_name="未读数（不含广播）")
+    broadcast_seen = models.BigIntegerField(default=0, verbose_name="上次全部已读时的广播总数")
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 't_notification_read_state'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category'], name='t_notification_read_state_uniq'),
+        ]
+
+
+class NotificationCounter(models.Model):
+    """通知相关的全局计数：广播总数 broadcast、定时发送累计数 dispatched"""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 't_notification_counter'
+
+
+class NotificationBatch(models.Model):
+    """
+    定向批量发送任务：请求内只保存一行，由后台按 NOTIFICATION_BATCH_CHUNK_SIZE 分块 bulk_create（notifications.delivery）
+    指定了 scheduled_time 的任务到期后由 dispatch_notifications 发送
+    sent_count 是已处理的用户数，每块与写入的通知在同一事务内更新，中断后从这里继续；全部写入后 is_sent 为真，send_time 为完成时间
+    """
+    app_name = models.CharField(max_length=255, blank=True, null=True)
+    type = models.CharField(max_length=255, blank=True, null=True)
+    content = models.TextField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    user_ids = ArrayField(models.BigIntegerField(), default=list, verbose_name="接收用户ID（去重后）")
+    total = models.IntegerField(default=0, verbose_name="接收用户数")
+    scheduled_time = models.DateTimeField(blank=True, null=True, verbose_name="定时发送时间，为空表示立即发送")
+    sent_count = models.IntegerField(default=0, verbose_name="已处理的用户数")
+    is_sent = models.BooleanField(default=False, verbose_name="是否发送完成")
+    send_time = models.DateTimeField(blank=True, null=True, verbose_name="发送完成时间")
+    create_time = models.DateTimeField(auto_now_add=True)
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 't_notification_batch'
+        ordering = ['-id']
\ No newline at end of file
@@ -1,6 +1,6 @@
 # user/serializers.py
 from rest_framework import serializers
-from notifications.models import Notification
+from notifications.models import Notification, NotificationBatch
 from user.models import User
 
 
@@ -18,6 +18,14 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class InboxNotificationSerializer(NotificationSerializer):
+    """收件箱中的通知，is_read 由已读游标（context['last_read_id']）判断"""
+    is_read = serializers.SerializerMethodField()
+
+    def get_is_read(self, obj):
+        return obj.id <= self.context.get('last_read_id', 0)
+
+
 class NotificationCreateSerializer(serializers.ModelSerializer):
     # 支持单个用户ID或多个用户ID
     user_ids = serializers.ListField(
@@ -33,3 +41,11 @@ class NotificationCreateSerializer(serializers.ModelSerializer):
         extra_kwargs = {
             'user': {'read_only': True}
         }
+
+
+class NotificationBatchSerializer(serializers.ModelSerializer):
+    """定向发送任务的进度（不返回接收用户列表）"""
+
+    class Meta:
+        model = NotificationBatch
+        exclude = ['user_ids']
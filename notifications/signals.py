@@ -0,0 +1,68 @@
+"""
+写入、修改、删除通知和互动消息时维护收件箱未读数（notifications.inbox）
+queryset.update / bulk_create 不会触发信号，批量发送时由调用方直接累加
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from notifications import inbox
+from notifications.models import Notification
+from societies.models import Activity
+from user.models import User
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        inbox.init_user(instance.pk)
+
+
+def _inbox_state(notification):
+    """影响未读数的字段：接收用户、发送时间（广播按它判断注册前后）和是否可见"""
+    return notification.user_id, notification.send_time, inbox.is_visible(notification)
+
+
+@receiver(pre_save, sender=Notification)
+def notification_saving(sender, instance, raw=False, **kwargs):
+    # 修改已有的通知时记录修改前的状态，post_save 中按可见性的变化增减未读数
+    if not raw and not instance._state.adding:
+        instance._inbox_previous = Notification.objects.filter(pk=instance.pk) \
+            .only('user_id', 'send_time', 'is_sent', 'is_active', 'is_deleted').first()
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if not inbox.is_visible(instance):
+            return
+        if instance.user_id:
+            inbox.add_unread(inbox.CATEGORY_SYSTEM, {instance.user_id: 1})
+        else:
+            inbox.add_broadcast()
+        return
+    previous = instance.__dict__.pop('_inbox_previous', None)
+    if previous is None or _inbox_state(previous) == _inbox_state(instance):
+        return
+    if inbox.is_visible(previous):
+        inbox.remove_notification(previous)
+    if inbox.is_visible(instance):
+        inbox.add_notification(instance)
+
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    if inbox.is_visible(instance):
+        inbox.remove_notification(instance)
+
+
+@receiver(post_save, sender=Activity)
+def activity_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        inbox.add_unread(inbox.CATEGORY_INTERACTION, {instance.recipient_id: 1})
+
+
+@receiver(post_delete, sender=Activity)
+def activity_deleted(sender, instance, **kwargs):
+    inbox.remove_unread(inbox.CATEGORY_INTERACTION, instance.recipient_id, instance.pk)
@@ -1,3 +1,72 @@
+import unittest
+
+from django.db import connection
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from notifications import inbox
+from notifications.models import Notification
+from user.models import User
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', '未读数 upsert 需要 PostgreSQL')
+class UnreadCountTests(TestCase):
+    """删除、隐藏、恢复通知后未读数与收件箱一致"""
+
+    def setUp(self):
+        self.user = User.objects.create(username='unread_user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return inbox.unread_counts(self.user.pk)['system']
+
+    def inbox_unread(self):
+        results = self.client.get('/api/notifications/inbox/').json()['data']['results']
+        return sum(1 for item in results if not item['is_read'])
+
+    def assertUnread(self, expected):
+        self.assertEqual(self.unread(), expected)
+        self.assertEqual(self.inbox_unread(), expected)
+
+    def test_delete_broadcast(self):
+        broadcast = Notification.objects.create(content='广播')
+        self.assertUnread(1)
+        broadcast.delete()
+        self.assertUnread(0)
+
+    def test_hide_and_restore_notification(self):
+        for user in (self.user, None):
+            notification = Notification.objects.create(user=user, content='通知')
+            notification.is_deleted = True
+            notification.save()
+            self.assertUnread(0)
+            notification.is_deleted = False
+            notification.save()
+            self.assertUnread(1)
+            notification.is_active = False
+            notification.save()
+            self.assertUnread(0)
+
+    def test_hide_read_broadcast(self):
+        broadcast = Notification.objects.create(content='广播')
+        inbox.mark_all_read(self.user.pk)
+        broadcast.is_active = False
+        broadcast.save()
+        self.assertUnread(0)
+        # 已读的广播隐藏后 broadcast_seen 同步减一，之后的广播仍计入未读
+        Notification.objects.create(content='新广播')
+        self.assertUnread(1)
+        broadcast.is_active = True
+        broadcast.save()
+        self.assertUnread(1)
 
-# Create your tests here.
+    def test_delete_broadcast_sent_before_joining(self):
+        broadcast = Notification.objects.create(content='注册前的广播')
+        self.user = User.objects.create(username='unread_new_user')
+        self.client.force_authenticate(self.user)
+        self.assertUnread(0)
+        broadcast.delete()
+        self.assertUnread(0)
+        Notification.objects.create(content='广播')
+        self.assertUnread(1)
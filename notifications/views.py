@@ -1,11 +1,16 @@
+from django.db.models import Q
 from django_filters.rest_framework import DjangoFilterBackend
 
 from rest_framework import viewsets, filters
+from rest_framework.decorators import action
 
 from middleware.base_views import BaseViewSet
+from middleware.permissions import IsAdminRole
 from middleware.utils import CustomPagination, ApiResponse
-from notifications.models import Notification
-from notifications.serializers import NotificationSerializer, NotificationCreateSerializer
+from notifications import delivery, inbox
+from notifications.models import Notification, NotificationBatch
+from notifications.serializers import (NotificationSerializer, NotificationCreateSerializer,
+                                       InboxNotificationSerializer, NotificationBatchSerializer)
 from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiParameter
 
 @extend_schema_view(
@@ -24,6 +29,8 @@ class NotificationViewSet(BaseViewSet):
     pagination_class = CustomPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['type', 'is_active']
+    # 收件箱支持 ?cursor= 游标分页
+    cursor_pagination = True
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -46,28 +53,34 @@ class NotificationViewSet(BaseViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        user_ids = serializer.validated_data.get('user_ids', [])
-        notifications = []
+        notification_data = serializer.validated_data.copy()
+        user_ids = notification_data.pop('user_ids', None)
+        # send_time 在未来时定时发送（dispatch_notifications 到期后发送）
+        send_time = notification_data.pop('send_time', None)
 
         if user_ids:
-            # 为每个指定的用户创建通知
-            for user_id in user_ids:
-                notification_data = serializer.validated_data.copy()
-                notification_data.pop('user_ids', None)
-                notification_data['user_id'] = user_id
-                notification = Notification.objects.create(**notification_data)
-                notifications.append(notification)
-        else:
-            # 如果没有指定用户，创建一个通用通知（不关联特定用户）
-            notification_data = serializer.validated_data.copy()
-            notification_data.pop('user_ids', None)
-            notification = Notification.objects.create(**notification_data)
-            notifications.append(notification)
+            # 指定用户：保存发送任务后立即返回，由后台分块写入，进度通过 batches/<id>/ 查询
+            batch = delivery.send_to_users(notification_data, user_ids, send_time=send_time)
+            return ApiResponse(NotificationBatchSerializer(batch).data, message="已提交发送", code=201)
 
-        # 序列化结果
-        result_serializer = NotificationSerializer(notifications, many=True)
+        # 没有指定用户：全局广播只保存一条通知，用户读取收件箱时可见
+        notification = delivery.broadcast(notification_data, send_time=send_time)
+        result_serializer = NotificationSerializer([notification], many=True)
         return ApiResponse(result_serializer.data, message="创建成功", code=201)
 
+    @extend_schema(summary='定时发送积压和延迟', tags=['消息中心'])
+    @action(detail=False, methods=['get'], url_path='dispatcher-stats', permission_classes=[IsAdminRole])
+    def dispatcher_stats(self, request):
+        return ApiResponse(delivery.dispatcher_stats())
+
+    @extend_schema(summary='定向发送任务进度', tags=['消息中心'])
+    @action(detail=False, methods=['get'], url_path=r'batches/(?P<batch_id>\d+)')
+    def batch(self, request, batch_id=None):
+        batch = NotificationBatch.objects.filter(pk=batch_id).first()
+        if batch is None:
+            return ApiResponse(code=404, message="发送任务不存在")
+        return ApiResponse(NotificationBatchSerializer(batch).data)
+
     def list(self, request, *args, **kwargs):
         # 获取过滤后的查询集
         queryset = self.filter_queryset(self.get_queryset())
@@ -80,3 +93,47 @@ class NotificationViewSet(BaseViewSet):
         # 如果没有分页，返回普通响应
         serializer = self.get_serializer(queryset, many=True)
         return ApiResponse(serializer.data)
+
+    @extend_schema(
+        summary='我的收件箱（系统通知，含全局广播）',
+        tags=['消息中心'],
+        parameters=[
+            OpenApiParameter(name='type', description='type字段过滤'),
+            OpenApiParameter(name='cursor', description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor', required=False),
+        ]
+    )
+    @action(detail=False, methods=['get'], url_path='inbox')
+    def inbox(self, request):
+        if not request.user.is_authenticated:
+            return ApiResponse(code=401, message="用户未认证")
+        # 全局广播读时扇出：注册之后发送的广播对该用户可见
+        visible = Q(user=request.user) | Q(user__isnull=True, send_time__gte=request.user.date_joined)
+        queryset = Notification.objects.filter(visible, is_sent=True, is_active=True) \
+            .exclude(is_deleted=True).select_related('user').order_by('-id')
+        queryset = self.filter_queryset(queryset)
+        last_read_id, _ = inbox.get_read_state(request.user.id, inbox.CATEGORY_SYSTEM)
+        page = self.paginate_queryset(queryset)
+        serializer = InboxNotificationSerializer(page, many=True, context={'last_read_id': last_read_id})
+        return self.get_paginated_response(serializer.data)
+
+    @extend_schema(summary='未读数（系统通知、互动消息）', tags=['消息中心'])
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        if not request.user.is_authenticated:
+            return ApiResponse(code=401, message="用户未认证")
+        return ApiResponse(inbox.unread_counts(request.user.id))
+
+    @extend_schema(
+        summary='全部标记为已读',
+        tags=['消息中心'],
+        parameters=[OpenApiParameter(name='category', description='system(系统通知), interaction(互动消息)，默认全部')]
+    )
+    @action(detail=False, methods=['post'], url_path='mark-all-read')
+    def mark_all_read(self, request):
+        if not request.user.is_authenticated:
+            return ApiResponse(code=401, message="用户未认证")
+        category = request.data.get('category') or request.query_params.get('category')
+        if category and category not in inbox.CATEGORIES:
+            return ApiResponse(code=400, message="不支持的分类")
+        inbox.mark_all_read(request.user.id, [category] if category else inbox.CATEGORIES)
+        return ApiResponse(inbox.unread_counts(request.user.id), message="已全部标记为已读")
@@ -1,6 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from user.models import User
 from contents.models import Content
+from middleware.counters import apply_counter_deltas
 
 
 class Rating(models.Model):
@@ -33,39 +34,22 @@ class Rating(models.Model):
         unique_together = ('user', 'content')
 
     def save(self, *args, **kwargs):
-        # 检查是否是更新操作
-        old_score = None
-        if self.pk:
-            try:
-                old_rating = Rating.objects.get(pk=self.pk)
-                old_score = old_rating.score
-            except Rating.DoesNotExist:
-                pass
+        # 评分和内容的评分统计在同一事务内更新，锁住原记录读取旧评分
+        with transaction.atomic():
+            old_score = None
+            if self.pk:  # 检查是否是更新操作
+                old_score = Rating.objects.select_for_update().filter(pk=self.pk).values_list('score', flat=True).first()
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
 
-        # 更新内容的评分统计
-        try:
-            content = Content.objects.get(id=self.content.id)
+            # 更新内容的评分统计：新评分增加计数和总分，更新评分只调整总分
             if old_score is None:
-                # 新评分，增加计数和总分
-                content.score_total += self.score
-                content.score_count += 1
+                apply_counter_deltas(Content, self.content_id, score_total=self.score, score_count=1)
             else:
-                # 更新评分，调整总分
-                content.score_total = content.score_total - old_score + self.score
-            content.save(update_fields=['score_total', 'score_count'])
-        except Content.DoesNotExist:
-            pass
+                apply_counter_deltas(Content, self.content_id, score_total=self.score - old_score)
 
     def delete(self, *args, **kwargs):
         # 删除评分时减少内容的评分统计
-        try:
-            content = Content.objects.get(id=self.content.id)
-            content.score_total -= self.score
-            content.score_count = max(0, content.score_count - 1)
-            content.save(update_fields=['score_total', 'score_count'])
-        except Content.DoesNotExist:
-            pass
-
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            apply_counter_deltas(Content, self.content_id, score_total=-self.score, score_count=-1)
+            super().delete(*args, **kwargs)
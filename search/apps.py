@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'search'
+
+    def ready(self):
+        # 注册信号（保存、删除时更新搜索索引和联想索引）
+        from search import signals  # noqa: F401
+        # 热度计数变化后刷新联想索引中的排序
+        from search import suggest
+        suggest.connect()
@@ -0,0 +1,191 @@
+"""
+搜索后端
+SEARCH_BACKEND 指定后端类的路径，默认 PostgresSearchBackend（t_search_document + GIN 倒排索引）；
+设为空字符串时关闭全文搜索，search= 退回 DRF SearchFilter 的 ILIKE 查询。
+自定义后端继承 BaseSearchBackend 并实现 index / remove / filter / search。
+"""
+import time
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Cast
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+from . import tokenizer
+from .registry import get_spec
+
+
+class BaseSearchBackend:
+
+    def index(self, doc_type, rows):
+        """写入或更新索引，rows 为 [(ID, 标题, 正文)]"""
+        raise NotImplementedError
+
+    def remove(self, doc_type, object_ids):
+        raise NotImplementedError
+
+    def filter(self, queryset, doc_type, text, field='pk', ranked=True):
+        """把查询集过滤为匹配 text 的对象（field 为对象ID所在字段），ranked 时按相关度排序"""
+        raise NotImplementedError
+
+    def search(self, doc_type, text):
+        """按相关度排序的匹配文档（SearchDocument 查询集，带 rank 字段）"""
+        raise NotImplementedError
+
+    def highlight(self, text, query, length=None):
+        """截取 text 中第一个命中附近的片段，命中的词用 <em> 标出（其余内容做 HTML 转义）"""
+        text = text or ''
+        length = length or getattr(settings, 'SEARCH_SNIPPET_LENGTH', 80)
+        normalized = tokenizer.normalize(text)
+        # NFKC 可能改变长度（如连字），此时不做高亮，直接截取
+        if len(normalized) != len(text):
+            return escape(text[:length])
+        spans = []
+        for term in tokenizer.highlight_terms(query):
+            start = normalized.find(term)
+            while start != -1:
+                end = start + len(term)
+                if not any(start < span_end and end > span_start for span_start, span_end in spans):
+                    spans.append((start, end))
+                start = normalized.find(term, end)
+        spans.sort()
+        begin = max(0, min(spans[0][0] - length // 4, len(text) - length)) if spans else 0
+        finish = begin + length
+        parts, cursor = [], begin
+        for start, end in spans:
+            if start < begin or end > finish:
+                continue
+            parts.append(escape(text[cursor:start]))
+            parts.append(f'<em>{escape(text[start:end])}</em>')
+            cursor = end
+        parts.append(escape(text[cursor:finish]))
+        return ('…' if begin > 0 else '') + ''.join(parts) + ('…' if finish < len(text) else '')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """PostgreSQL 全文搜索：词项由 search.tokenizer 生成，simple 配置不再做词形处理"""
+    config = 'simple'
+
+    @property
+    def max_text_length(self):
+        return getattr(settings, 'SEARCH_MAX_TEXT_LENGTH', 10000)
+
+    def index(self, doc_type, rows, chunk_size=500):
+        rows = list(rows)
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                placeholders = ', '.join(
+                    "(%s, %s, %s, %s, setweight(to_tsvector('simple', %s), 'A') || "
+                    "setweight(to_tsvector('simple', %s), 'B'), now())" for _ in chunk
+                )
+                params = []
+                for object_id, title, body in chunk:
+                    title, body = (title or '')[:self.max_text_length], (body or '')[:self.max_text_length]
+                    params.extend([doc_type, object_id, title, body,
+                                   ' '.join(tokenizer.index_tokens(title)), ' '.join(tokenizer.index_tokens(body))])
+                cursor.execute(
+                    'INSERT INTO t_search_document (type, object_id, title, body, vector, update_time) '
+                    f'VALUES {placeholders} '
+                    'ON CONFLICT (type, object_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, '
+                    'vector = EXCLUDED.vector, update_time = EXCLUDED.update_time',
+                    params,
+                )
+        return len(rows)
+
+    def remove(self, doc_type, object_ids):
+        from .models import SearchDocument
+        return SearchDocument.objects.filter(type=doc_type, object_id__in=list(object_ids)).delete()[0]
+
+    def get_query(self, text):
+        tokens = tokenizer.query_tokens(text)
+        if not tokens:
+            return None
+        # 全部词项都需要匹配；字母数字按前缀匹配（t25 可以匹配 t250），词项只含字母数字和汉字，不需要转义
+        terms = [f"'{token}'" if tokenizer.CJK_PATTERN.match(token) else f"'{token}':*" for token in tokens]
+        return SearchQuery(' & '.join(terms), config=self.config, search_type='raw')
+
+    def documents(self, doc_type, query):
+        from .models import SearchDocument
+        return SearchDocument.objects.filter(type=doc_type, vector=query)
+
+    def filter(self, queryset, doc_type, text, field='pk', ranked=True):
+        query = self.get_query(text)
+        if query is None:
+            return queryset.none()
+        documents = self.documents(doc_type, query)
+        queryset = queryset.filter(**{f'{field}__in': documents.values('object_id')})
+        if ranked:
+            # ts_rank 返回 real，转为 double precision：游标分页把相关度作为浮点数传回比较，
+            # real 与参数比较时精度不同，相同相关度的行会被当作仍在游标之后，每页都返回同样的数据
+            rank = documents.filter(object_id=OuterRef(field)) \
+                .annotate(rank=Cast(SearchRank(F('vector'), query), FloatField())).values('rank')[:1]
+            queryset = queryset.annotate(search_rank=Subquery(rank, output_field=FloatField())) \
+                .order_by('-search_rank', f'-{field}')
+        return queryset
+
+    def search(self, doc_type, text):
+        query = self.get_query(text)
+        if query is None:
+            from .models import SearchDocument
+            return SearchDocument.objects.none()
+        return self.documents(doc_type, query).annotate(rank=SearchRank(F('vector'), query)) \
+            .order_by('-rank', '-object_id')
+
+
+_backend = None
+
+
+def get_backend():
+    """当前配置的搜索后端，未配置时返回 None"""
+    global _backend
+    path = getattr(settings, 'SEARCH_BACKEND', 'search.backends.PostgresSearchBackend')
+    if not path:
+        return None
+    if _backend is None or _backend.__class__.__module__ + '.' + _backend.__class__.__name__ != path:
+        _backend = import_string(path)()
+    return _backend
+
+
+def index_objects(doc_type, object_ids):
+    """按ID重新读取对象并更新索引，已经不存在的对象从索引中删除"""
+    backend, spec = get_backend(), get_spec(doc_type)
+    if backend is None or spec is None:
+        return 0
+    object_ids = set(object_ids)
+    rows = []
+    for values in spec.model.objects.filter(pk__in=object_ids).values_list('pk', *spec.fields):
+        rows.append((values[0], *spec.split(values[1:])))
+    missing = object_ids - {row[0] for row in rows}
+    if missing:
+        backend.remove(doc_type, missing)
+    return backend.index(doc_type, rows)
+
+
+def rebuild_index(doc_type, model=None, first_id=None, batch_size=2000, sleep=0):
+    """
+    按主键区间（每批 batch_size）重建 doc_type 的索引，返回索引的条数
+    first_id 指定时只处理主键不小于它的对象；model 默认为注册的模型，迁移中传入历史模型
+    """
+    backend, spec = get_backend(), get_spec(doc_type)
+    if backend is None or spec is None:
+        return 0
+    model = model or spec.model
+    queryset = model.objects.all() if first_id is None else model.objects.filter(pk__gte=first_id)
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return 0
+    indexed = 0
+    for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+        rows = [
+            (values[0], *spec.split(values[1:]))
+            for values in model.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+            .order_by('pk').values_list('pk', *spec.fields)
+        ]
+        indexed += backend.index(doc_type, rows)
+        if sleep:
+            time.sleep(sleep)
+    return indexed
@@ -0,0 +1,30 @@
+from rest_framework import filters
+from rest_framework.settings import api_settings
+
+from .backends import get_backend
+from .registry import get_spec_for_model
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    search= 参数走搜索索引（search.backends），默认按相关度排序，传了 ordering 时按 ordering 排序
+    视图可以用 search_type 指定索引类型（默认按模型查找），search_field 指定对象ID所在的字段（默认主键）
+    模型没有被索引或关闭全文搜索时退回 SearchFilter（按 search_fields 做 ILIKE）
+    需要放在排序过滤器之后，否则相关度排序会被视图的默认排序覆盖
+    """
+
+    def get_search_type(self, queryset, view):
+        search_type = getattr(view, 'search_type', None)
+        if search_type:
+            return search_type
+        spec = get_spec_for_model(queryset.model)
+        return spec.type if spec else None
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        backend = get_backend()
+        search_type = self.get_search_type(queryset, view)
+        if not text or backend is None or search_type is None:
+            return super().filter_queryset(request, queryset, view)
+        ranked = not request.query_params.get(api_settings.ORDERING_PARAM)
+        return backend.filter(queryset, search_type, text, field=getattr(view, 'search_field', 'pk'), ranked=ranked)
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from search.backends import get_backend, rebuild_index
+from search.models import SearchDocument
+from search.registry import SEARCH_SPECS
+
+
+class Command(BaseCommand):
+    help = '按主键区间重建搜索索引（首次部署、批量导入数据或修改分词/索引字段后执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--type', action='append', choices=sorted(SEARCH_SPECS),
+                            help='只重建指定类型，可重复指定，默认全部')
+        parser.add_argument('--batch-size', type=int, default=2000, help='每批处理的ID区间大小')
+        parser.add_argument('--sleep', type=float, default=0, help='每批之间暂停的秒数，降低对数据库的压力')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError('--batch-size 必须大于0')
+        backend = get_backend()
+        if backend is None:
+            raise CommandError('SEARCH_BACKEND 未配置，全文搜索已关闭')
+
+        for search_type in options['type'] or list(SEARCH_SPECS):
+            spec = SEARCH_SPECS[search_type]
+            model = spec.model
+            begin = time.monotonic()
+            indexed = rebuild_index(search_type, batch_size=batch_size, sleep=options['sleep'])
+            # 删除源数据已经不存在的文档
+            stale = SearchDocument.objects.filter(type=search_type) \
+                .exclude(object_id__in=model.objects.values('pk'))
+            removed = stale.delete()[0]
+            self.stdout.write(self.style.SUCCESS(
+                f'[{search_type}] 已索引 {indexed} 条，删除 {removed} 条过期文档，耗时 {time.monotonic() - begin:.2f}s'
+            ))
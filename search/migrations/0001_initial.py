@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:11
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+                ('vector', django.contrib.postgres.search.SearchVectorField(null=True)),
+                ('update_time', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 't_search_document',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='t_search_document_vector_gin')],
+                'constraints': [models.UniqueConstraint(fields=('type', 'object_id'), name='t_search_document_type_object_uniq')],
+            },
+        ),
+    ]
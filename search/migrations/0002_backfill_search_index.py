@@ -0,0 +1,27 @@
+from django.db import migrations
+
+
+def backfill_search_index(apps, schema_editor):
+    from search.backends import rebuild_index
+    from search.registry import SEARCH_SPECS
+    for spec in SEARCH_SPECS.values():
+        rebuild_index(spec.type, model=apps.get_model(spec.model_label))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+        ('advertisement', '0001_initial'),
+        ('chat', '0001_initial'),
+        ('comments', '0001_initial'),
+        ('contents', '0002_initial'),
+        ('goods', '0001_initial'),
+        ('societies', '0002_initial'),
+        ('user', '0001_initial'),
+    ]
+
+    # 索引表创建时为空，search= 会全部查不到；按已有数据建立索引（与 rebuild_search_index 相同）
+    operations = [
+        migrations.RunPython(backfill_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    搜索索引文档：每个被索引的对象一行（类型见 search.registry）
+    vector 由 search.tokenizer 切分后的词项生成（标题权重 A、正文权重 B），GIN 索引支持 @@ 查询
+    title、body 保存原文，用于高亮
+    """
+    type = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    title = models.TextField(blank=True, default='')
+    body = models.TextField(blank=True, default='')
+    vector = SearchVectorField(null=True)
+    update_time = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 't_search_document'
+        constraints = [
+            models.UniqueConstraint(fields=['type', 'object_id'], name='t_search_document_type_object_uniq'),
+        ]
+        indexes = [
+            GinIndex(fields=['vector'], name='t_search_document_vector_gin'),
+        ]
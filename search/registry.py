@@ -0,0 +1,51 @@
+"""
+被索引的模型：类型 -> 模型、标题字段（权重 A）、正文字段（权重 B）
+public 为 True 的类型可以通过 /api/search/ 直接搜索，私信等只在各自的列表接口中按 search= 过滤
+新增类型后执行 rebuild_search_index --type <类型> 建立已有数据的索引
+"""
+from django.apps import apps
+
+
+class SearchSpec:
+    def __init__(self, doc_type, model_label, title_fields, body_fields, public=True):
+        self.type = doc_type
+        self.model_label = model_label
+        self.title_fields = title_fields
+        self.body_fields = body_fields
+        self.public = public
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    @property
+    def fields(self):
+        return self.title_fields + self.body_fields
+
+    def split(self, values):
+        """按字段顺序的取值拆分为 (标题, 正文)"""
+        title = ' '.join(str(value) for value in values[:len(self.title_fields)] if value)
+        body = ' '.join(str(value) for value in values[len(self.title_fields):] if value)
+        return title, body
+
+
+SEARCH_SPECS = {spec.type: spec for spec in (
+    SearchSpec('content', 'contents.Content', ['title'], ['description']),
+    SearchSpec('dynamic', 'societies.Dynamic', ['title'], ['content']),
+    SearchSpec('comment', 'comments.Comment', ['user_nickname'], ['content']),
+    SearchSpec('user', 'user.User', ['user_nickname'], ['user_bio']),
+    SearchSpec('good', 'goods.Good', ['name'], ['description']),
+    SearchSpec('advertisement', 'advertisement.Advertisement', ['name', 'title'], ['description']),
+    SearchSpec('message', 'chat.Message', [], ['content'], public=False),
+)}
+
+
+def get_spec(doc_type):
+    return SEARCH_SPECS.get(doc_type)
+
+
+def get_spec_for_model(model):
+    for spec in SEARCH_SPECS.values():
+        if spec.model is model:
+            return spec
+    return None
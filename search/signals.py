@@ -0,0 +1,53 @@
+"""
+保存、删除被索引的对象后在后台更新搜索索引，并在事务提交后更新本进程的联想索引
+queryset.update / bulk_create 不会触发信号，批量导入数据后执行 rebuild_search_index
+"""
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from middleware.background import submit_on_commit
+
+from .backends import get_backend, index_objects
+from .registry import SEARCH_SPECS
+from .suggest import SUGGEST_SOURCES, suggest_service
+
+
+def make_handlers(spec):
+    def on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+        if raw or get_backend() is None:
+            return
+        # 只更新了与搜索无关的字段（如登录时间、计数）时不需要重建索引
+        if update_fields is not None and not set(update_fields).intersection(spec.fields):
+            return
+        submit_on_commit(index_objects, spec.type, [instance.pk])
+
+    def on_delete(sender, instance, **kwargs):
+        backend = get_backend()
+        if backend is not None:
+            submit_on_commit(backend.remove, spec.type, [instance.pk])
+
+    return on_save, on_delete
+
+
+for _spec in SEARCH_SPECS.values():
+    _on_save, _on_delete = make_handlers(_spec)
+    post_save.connect(_on_save, sender=_spec.model, weak=False, dispatch_uid=f'search_index_{_spec.type}')
+    post_delete.connect(_on_delete, sender=_spec.model, weak=False, dispatch_uid=f'search_remove_{_spec.type}')
+
+
+def suggest_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not raw:
+        transaction.on_commit(partial(suggest_service.on_save, instance, update_fields))
+
+
+def suggest_on_delete(sender, instance, **kwargs):
+    transaction.on_commit(partial(suggest_service.on_delete, instance))
+
+
+for _suggest_type, (_model_label, _, _) in SUGGEST_SOURCES.items():
+    _model = apps.get_model(_model_label)
+    post_save.connect(suggest_on_save, sender=_model, dispatch_uid=f'suggest_save_{_suggest_type}')
+    post_delete.connect(suggest_on_delete, sender=_model, dispatch_uid=f'suggest_remove_{_suggest_type}')
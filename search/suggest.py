@@ -0,0 +1,296 @@
+"""
+搜索框联想（前缀补全）
+内容标题、标签名、用户昵称各保存一个进程内的前缀索引，查询不访问数据库：
+- 每个对象生成若干个键：规范化后的原文，安装了 pypinyin 时再加全拼和拼音首字母（“小明” -> xiaoming、xm）
+- 键按 (键, ID) 排序保存在数组中，查询时 bisect 定位前缀区间，最多扫描 SUGGEST_SCAN_LIMIT 个键
+- 长度不超过 SUGGEST_TOP_PREFIX_LENGTH 的短前缀命中的对象太多，预先保存按热度排好的前 SUGGEST_TOP_K 个
+- 热度：内容点赞数、标签使用次数、用户粉丝数
+更新：
+- 保存、删除对象时（search.signals）直接更新本进程的索引
+- 热度计数经 middleware.counters 更新后标记，由计数缓冲的后台线程批量读取新的热度
+- 每 SUGGEST_REBUILD_INTERVAL 秒在后台整体重建一次，同步其他进程中的修改
+- 首次查询时在后台构建（扫描数据并转换拼音，耗时数秒），构建完成前返回空结果，请求线程不等待、不查询数据库
+"""
+import bisect
+import heapq
+import logging
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+
+from middleware.background import submit
+from middleware.counter_buffer import counter_buffer
+from middleware.counters import counter_listeners
+
+from . import tokenizer
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 没有安装 pypinyin 时只按原文匹配
+    lazy_pinyin = Style = None
+
+logger = logging.getLogger(__name__)
+
+# 类型 -> (模型, 文本字段, 热度字段)
+SUGGEST_SOURCES = {
+    'content': ('contents.Content', 'title', 'like_count'),
+    'tag': ('tags.Tag', 'name', 'usage_count'),
+    'user': ('user.User', 'user_nickname', 'followers_count'),
+}
+
+
+def normalize_key(text):
+    return ''.join(tokenizer.normalize(text).split())
+
+
+def suggest_keys(text):
+    """对象的全部键（去重）"""
+    keys = {normalize_key(text)}
+    if lazy_pinyin is not None and tokenizer.CJK_PATTERN.search(text):
+        keys.add(normalize_key(''.join(lazy_pinyin(text))))
+        keys.add(normalize_key(''.join(lazy_pinyin(text, style=Style.FIRST_LETTER))))
+    keys.discard('')
+    return keys
+
+
+class PrefixIndex:
+    """单一类型的前缀索引"""
+
+    def __init__(self, top_prefix_length, top_k):
+        self.top_prefix_length = top_prefix_length
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self.items = {}  # ID -> (文本, 热度, 键)
+        self.keys = []  # [(键, ID)]，有序
+        self.top = {}  # 短前缀 -> [(-热度, ID)]，有序
+
+    def load(self, rows):
+        """用 [(ID, 文本, 热度)] 整体构建"""
+        items, keys, heaps = {}, [], {}
+        for pk, text, weight in rows:
+            if not text:
+                continue
+            item_keys = suggest_keys(text)
+            items[pk] = (text, weight or 0, item_keys)
+            keys.extend((key, pk) for key in item_keys)
+            for prefix in self._short_prefixes(item_keys):
+                heap = heaps.setdefault(prefix, [])
+                entry = (weight or 0, -pk)
+                if len(heap) < self.top_k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+        keys.sort()
+        top = {prefix: sorted((-weight, -negative_pk) for weight, negative_pk in heap)
+               for prefix, heap in heaps.items()}
+        with self._lock:
+            self.items, self.keys, self.top = items, keys, top
+
+    def _short_prefixes(self, keys):
+        return {key[:length] for key in keys for length in range(1, min(len(key), self.top_prefix_length) + 1)}
+
+    def _scan(self, prefix, limit=None):
+        """前缀区间内的ID，limit 限制扫描的键数量"""
+        start = bisect.bisect_left(self.keys, (prefix,))
+        end = bisect.bisect_left(self.keys, (prefix + '\U0010ffff',), start)
+        if limit is not None:
+            end = min(end, start + limit)
+        return {pk for _, pk in self.keys[start:end]}
+
+    def _rebuild_top(self, prefix):
+        found = self._scan(prefix)
+        if found:
+            self.top[prefix] = sorted((-self.items[pk][1], pk) for pk in found)[:self.top_k]
+        else:
+            self.top.pop(prefix, None)
+
+    def _update_top(self, prefix, pk, weight, old_weight):
+        entries = self.top.setdefault(prefix, [])
+        if old_weight is not None and (-old_weight, pk) in entries:
+            entries.remove((-old_weight, pk))
+            if weight < old_weight and len(entries) >= self.top_k - 1:
+                # 热度下降后可能有列表外的对象排到它前面，重新扫描该前缀
+                self._rebuild_top(prefix)
+                return
+        bisect.insort(entries, (-weight, pk))
+        del entries[self.top_k:]
+
+    def upsert(self, pk, text, weight):
+        if not text:
+            self.remove(pk)
+            return
+        weight = weight or 0
+        item_keys = suggest_keys(text)
+        with self._lock:
+            old = self.items.get(pk)
+            old_keys = old[2] if old else set()
+            old_weight = old[1] if old else None
+            self.items[pk] = (text, weight, item_keys)
+            for key in old_keys - item_keys:
+                index = bisect.bisect_left(self.keys, (key, pk))
+                if index < len(self.keys) and self.keys[index] == (key, pk):
+                    del self.keys[index]
+            for key in item_keys - old_keys:
+                bisect.insort(self.keys, (key, pk))
+            old_prefixes, new_prefixes = self._short_prefixes(old_keys), self._short_prefixes(item_keys)
+            for prefix in old_prefixes - new_prefixes:
+                if (-old_weight, pk) in self.top.get(prefix, ()):
+                    self._rebuild_top(prefix)
+            for prefix in new_prefixes:
+                self._update_top(prefix, pk, weight, old_weight if prefix in old_prefixes else None)
+
+    def set_weight(self, pk, weight):
+        with self._lock:
+            item = self.items.get(pk)
+        if item is not None and item[1] != (weight or 0):
+            self.upsert(pk, item[0], weight)
+
+    def remove(self, pk):
+        with self._lock:
+            old = self.items.pop(pk, None)
+            if old is None:
+                return
+            text, weight, item_keys = old
+            for key in item_keys:
+                index = bisect.bisect_left(self.keys, (key, pk))
+                if index < len(self.keys) and self.keys[index] == (key, pk):
+                    del self.keys[index]
+            for prefix in self._short_prefixes(item_keys):
+                if (-weight, pk) in self.top.get(prefix, ()):
+                    self._rebuild_top(prefix)
+
+    def lookup(self, query, limit, scan_limit):
+        """前缀匹配 query 的对象 [(ID, 文本, 热度)]，按热度倒序"""
+        prefix = normalize_key(query)
+        if not prefix:
+            return []
+        with self._lock:
+            if len(prefix) <= self.top_prefix_length:
+                best = [(pk, -negative_weight) for negative_weight, pk in self.top.get(prefix, [])[:limit]]
+            else:
+                best = [(pk, self.items[pk][1]) for pk in
+                        heapq.nsmallest(limit, self._scan(prefix, scan_limit), key=lambda pk: (-self.items[pk][1], pk))]
+            return [(pk, self.items[pk][0], weight) for pk, weight in best]
+
+    def __len__(self):
+        return len(self.items)
+
+
+class SuggestService:
+    """各类型的前缀索引，首次查询时在后台构建，之后在后台定期重建"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._built_at = None
+        self._rebuilding = False
+        self._dirty = {}
+
+    @property
+    def rebuild_interval(self):
+        return getattr(settings, 'SUGGEST_REBUILD_INTERVAL', 600)
+
+    def new_index(self):
+        return PrefixIndex(getattr(settings, 'SUGGEST_TOP_PREFIX_LENGTH', 2), getattr(settings, 'SUGGEST_TOP_K', 20))
+
+    def rebuild(self):
+        begin = time.monotonic()
+        indexes = {}
+        for suggest_type, (model_label, text_field, weight_field) in SUGGEST_SOURCES.items():
+            model = apps.get_model(model_label)
+            rows = model.objects.exclude(**{f'{text_field}__isnull': True}).exclude(**{text_field: ''}) \
+                .order_by(f'-{weight_field}').values_list('pk', text_field, weight_field)
+            index = self.new_index()
+            index.load(rows[:getattr(settings, 'SUGGEST_MAX_ITEMS', 200000)].iterator(chunk_size=10000))
+            indexes[suggest_type] = index
+        with self._lock:
+            self._indexes, self._built_at, self._rebuilding = indexes, time.monotonic(), False
+        logger.info('联想索引重建完成: %s，耗时 %.2fs',
+                    {name: len(index) for name, index in indexes.items()}, time.monotonic() - begin)
+
+    def _background_rebuild(self):
+        try:
+            self.rebuild()
+        finally:
+            self._rebuilding = False
+
+    def ensure_built(self):
+        """索引未构建或已过期时提交后台重建（同一时间只有一个），期间继续使用旧索引或返回空结果"""
+        built_at = self._built_at
+        if built_at is not None and time.monotonic() - built_at < self.rebuild_interval:
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        submit(self._background_rebuild)
+
+    def get_index(self, suggest_type):
+        self.ensure_built()
+        return self._indexes.get(suggest_type)
+
+    def suggest(self, query, types=None, limit=10):
+        scan_limit = getattr(settings, 'SUGGEST_SCAN_LIMIT', 2000)
+        results = []
+        for suggest_type in types or SUGGEST_SOURCES:
+            index = self.get_index(suggest_type)
+            if index is None:
+                continue
+            results.extend({'type': suggest_type, 'id': pk, 'text': text, 'weight': weight}
+                           for pk, text, weight in index.lookup(query, limit, scan_limit))
+        results.sort(key=lambda item: -item['weight'])
+        return results[:limit]
+
+    def source_for_model(self, model):
+        for suggest_type, (model_label, text_field, weight_field) in SUGGEST_SOURCES.items():
+            if model._meta.label == model_label:
+                return suggest_type, text_field, weight_field
+        return None
+
+    def on_save(self, instance, update_fields=None):
+        """对象保存后更新本进程的索引（尚未构建时忽略）"""
+        source = self.source_for_model(type(instance))
+        if source is None or self._built_at is None:
+            return
+        suggest_type, text_field, weight_field = source
+        if update_fields is not None and not {text_field, weight_field}.intersection(update_fields):
+            return
+        self._indexes[suggest_type].upsert(instance.pk, getattr(instance, text_field), getattr(instance, weight_field))
+
+    def on_delete(self, instance):
+        source = self.source_for_model(type(instance))
+        if source is not None and self._built_at is not None:
+            self._indexes[source[0]].remove(instance.pk)
+
+    def on_counter_change(self, model, pk, fields):
+        """middleware.counters 的回调：热度字段变化后标记，由计数缓冲的后台线程批量刷新"""
+        source = self.source_for_model(model)
+        if source is not None and source[2] in fields and self._built_at is not None:
+            with self._lock:
+                self._dirty.setdefault(source[0], set()).add(pk)
+            counter_buffer.ensure_started()
+
+    def refresh_weights(self, flushed=None):
+        """读取被标记对象的最新热度（计数缓冲写入后调用）"""
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+        for suggest_type, pks in dirty.items():
+            model_label, text_field, weight_field = SUGGEST_SOURCES[suggest_type]
+            index = self._indexes.get(suggest_type)
+            if index is None:
+                continue
+            model = apps.get_model(model_label)
+            for pk, weight in model.objects.filter(pk__in=pks).values_list('pk', weight_field):
+                index.set_weight(pk, weight)
+
+
+suggest_service = SuggestService()
+
+
+def connect():
+    """注册热度计数变化和计数缓冲写入的回调（SearchConfig.ready 中调用）"""
+    if suggest_service.on_counter_change not in counter_listeners:
+        counter_listeners.append(suggest_service.on_counter_change)
+    counter_buffer.register_flush_hook(suggest_service.refresh_weights)
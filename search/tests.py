@@ -0,0 +1,36 @@
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from contents.models import Content
+from search.backends import index_objects
+from user.models import User
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', '全文搜索需要 PostgreSQL')
+class SearchCursorPaginationTests(TestCase):
+    """search= 按相关度排序时游标分页能翻完所有数据，相同相关度的行不会重复返回"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username='search_cursor_user'))
+        # 标题相同，相关度全部相同
+        self.contents = [Content.objects.create(title='旅行日记', description='周末') for _ in range(7)]
+        index_objects('content', [content.pk for content in self.contents])
+
+    def walk(self, page_size):
+        ids, cursor = [], ''
+        for _ in range(len(self.contents) + 1):
+            data = self.client.get('/api/contents/', {'search': '旅行', 'cursor': cursor, 'pageSize': page_size}).json()['data']
+            ids.extend(item['id'] for item in data['results'])
+            cursor = data['pagination']['next_cursor']
+            if cursor is None:
+                break
+        return ids
+
+    def test_cursor_pages_through_ties(self):
+        ids = self.walk(page_size=3)
+        self.assertEqual(len(ids), len(set(ids)))
+        self.assertEqual(sorted(ids), sorted(content.pk for content in self.contents))
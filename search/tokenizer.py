@@ -0,0 +1,59 @@
+"""
+中文分词（不依赖词典）
+- 连续的汉字：索引时写入单字和相邻两字（二元组），查询时使用二元组（单个汉字时用单字），
+  查询“数据库”即要求文档同时包含“数据”和“据库”
+- 字母数字：按连续的字母数字切分，统一小写
+切分结果用空格拼接后交给 PostgreSQL 的 simple 配置生成 tsvector / tsquery
+"""
+import re
+import unicodedata
+
+CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+TOKEN_PATTERN = re.compile(f'[{CJK_RANGES}]+|[0-9a-z]+')
+CJK_PATTERN = re.compile(f'[{CJK_RANGES}]')
+
+
+def normalize(text):
+    """全角转半角、统一小写"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def split_runs(text):
+    return TOKEN_PATTERN.findall(normalize(text))
+
+
+def bigrams(run):
+    return [run[index:index + 2] for index in range(len(run) - 1)]
+
+
+def index_tokens(text):
+    """文档的词项"""
+    tokens = []
+    for run in split_runs(text):
+        if CJK_PATTERN.match(run):
+            tokens.extend(run)
+            tokens.extend(bigrams(run))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_tokens(text):
+    """查询的词项（全部需要匹配），去重并保持顺序"""
+    tokens = []
+    for run in split_runs(text):
+        if CJK_PATTERN.match(run) and len(run) > 1:
+            tokens.extend(bigrams(run))
+        else:
+            tokens.append(run)
+    return list(dict.fromkeys(tokens))
+
+
+def highlight_terms(text):
+    """高亮时需要标出的词：查询中的完整片段和它的二元组，长的优先"""
+    terms = set()
+    for run in split_runs(text):
+        terms.add(run)
+        if CJK_PATTERN.match(run):
+            terms.update(bigrams(run))
+    return sorted(terms, key=len, reverse=True)
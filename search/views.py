@@ -0,0 +1,84 @@
+from django.conf import settings
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+from rest_framework.views import APIView
+
+from middleware.utils import ApiResponse, CustomPagination
+
+from .backends import get_backend
+from .registry import SEARCH_SPECS
+from .suggest import SUGGEST_SOURCES, suggest_service
+
+
+class SearchView(APIView):
+    """
+    全文搜索
+    按相关度返回匹配的对象ID，标题和正文片段中命中的词用 <em> 标出，客户端再按ID取详情
+    """
+    pagination_class = CustomPagination
+
+    @extend_schema(
+        summary='全文搜索（带高亮）',
+        tags=['搜索'],
+        parameters=[
+            OpenApiParameter(name='q', description='搜索词', required=True, type=str),
+            OpenApiParameter(name='type', description='搜索类型: ' + ', '.join(
+                spec_type for spec_type, spec in SEARCH_SPECS.items() if spec.public) + '（默认 content）', type=str),
+            OpenApiParameter(name='currentPage', description='当前页码', type=int, default=1),
+            OpenApiParameter(name='pageSize', description='每页数量', type=int, default=20),
+        ]
+    )
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        search_type = request.query_params.get('type', 'content')
+        spec = SEARCH_SPECS.get(search_type)
+        if not text:
+            return ApiResponse(code=400, message="缺少搜索词")
+        if spec is None or not spec.public:
+            return ApiResponse(code=400, message="不支持的搜索类型")
+        backend = get_backend()
+        if backend is None:
+            return ApiResponse(code=400, message="全文搜索未开启")
+
+        paginator = self.pagination_class()
+        documents = backend.search(search_type, text).only('object_id', 'title', 'body')
+        page = paginator.paginate_queryset(documents, request, view=self)
+        results = [{
+            'type': search_type,
+            'id': document.object_id,
+            'title': backend.highlight(document.title, text),
+            'body': backend.highlight(document.body, text),
+            'rank': round(document.rank, 6),
+        } for document in page]
+        return paginator.get_paginated_response(results)
+
+
+class SuggestView(APIView):
+    """
+    搜索框联想
+    按前缀匹配内容标题、标签名、用户昵称（支持拼音全拼和首字母），按热度排序
+    结果来自进程内的联想索引（search.suggest），不查询数据库，适合每次输入都请求
+    """
+
+    @extend_schema(
+        summary='搜索联想（前缀、拼音补全）',
+        tags=['搜索'],
+        parameters=[
+            OpenApiParameter(name='q', description='已输入的前缀', required=True, type=str),
+            OpenApiParameter(name='type', description='联想类型，逗号分隔: ' + ', '.join(SUGGEST_SOURCES) + '（默认全部）',
+                             type=str),
+            OpenApiParameter(name='limit', description='返回数量', type=int, default=10),
+        ]
+    )
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return ApiResponse(data=[])
+        types = [item for item in request.query_params.get('type', '').split(',') if item]
+        if any(item not in SUGGEST_SOURCES for item in types):
+            return ApiResponse(code=400, message="不支持的联想类型")
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return ApiResponse(code=400, message="limit 必须是整数")
+        limit = max(1, min(limit, getattr(settings, 'SUGGEST_TOP_K', 20)))
+        return ApiResponse(data=suggest_service.suggest(text, types, limit))
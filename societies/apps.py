@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class SocietiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'societies'
+
+    def ready(self):
+        # 注册信号（点赞、评论时写入互动消息流）
+        from societies import signals  # noqa: F401
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('societies', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dynamic',
+            index=models.Index(fields=['-create_time', '-id'], name='t_dynamic_ctime_id_idx'),
+        ),
+    ]
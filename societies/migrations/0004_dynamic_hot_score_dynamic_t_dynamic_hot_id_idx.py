@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 12:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('societies', '0003_dynamic_t_dynamic_ctime_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dynamic',
+            name='hot_score',
+            field=models.FloatField(default=0, verbose_name='热度分（middleware.hot_score 计算）'),
+        ),
+        migrations.AddIndex(
+            model_name='dynamic',
+            index=models.Index(fields=['-hot_score', '-id'], name='t_dynamic_hot_id_idx'),
+        ),
+    ]
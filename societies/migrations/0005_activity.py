@@ -0,0 +1,54 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('societies', '0004_dynamic_hot_score_dynamic_t_dynamic_hot_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Activity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient_id', models.IntegerField(verbose_name='接收者（动态作者）ID')),
+                ('actor_id', models.IntegerField(verbose_name='操作者ID')),
+                ('actor_nickname', models.CharField(blank=True, max_length=255, null=True)),
+                ('actor_avatar', models.CharField(blank=True, max_length=255, null=True)),
+                ('verb', models.CharField(choices=[('like', '点赞'), ('comment', '评论')], max_length=20)),
+                ('target_type', models.CharField(default='dynamic', max_length=20)),
+                ('target_id', models.IntegerField()),
+                ('target_title', models.CharField(blank=True, max_length=255, null=True)),
+                ('source_id', models.IntegerField(verbose_name='点赞或评论ID')),
+                ('snippet', models.TextField(blank=True, null=True, verbose_name='片段（评论内容或动态正文前100字）')),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 't_social_activity',
+                'ordering': ['-create_time', '-id'],
+                'indexes': [models.Index(fields=['recipient_id', '-create_time', '-id'], name='t_activity_recipient_idx'), models.Index(fields=['target_type', 'target_id'], name='t_activity_target_idx')],
+                'constraints': [models.UniqueConstraint(fields=('verb', 'source_id'), name='t_activity_verb_source_uniq')],
+            },
+        ),
+        # 回填已有的点赞和评论（只包括他人对动态的互动，与互动消息接口一致）
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO t_social_activity (recipient_id, actor_id, actor_nickname, actor_avatar, verb, target_type,
+                                               target_id, target_title, source_id, snippet, create_time)
+                SELECT d.user_id, l.user_id, l.user_nickname, l.user_avatar, 'like', 'dynamic',
+                       l.target_id, COALESCE(l.target_title, d.title), l.id, LEFT(d.content, 100), l.create_time
+                FROM t_like l JOIN t_social_dynamic d ON d.id = l.target_id
+                WHERE l.type = 'dynamic' AND l.status = 'active' AND l.user_id <> d.user_id
+                UNION ALL
+                SELECT d.user_id, c.user_id, c.user_nickname, c.user_avatar, 'comment', 'dynamic',
+                       c.target_id, d.title, c.id, LEFT(c.content, 100), c.create_time
+                FROM t_comment c JOIN t_social_dynamic d ON d.id = c.target_id
+                WHERE c.type = 'dynamic' AND c.user_id IS NOT NULL AND c.user_id <> d.user_id
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def backfill_hot_score(apps, schema_editor):
+    from middleware.hot_score import hot_score_expression
+    Dynamic = apps.get_model('societies', 'Dynamic')
+    Dynamic.objects.update(hot_score=hot_score_expression(Dynamic))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('societies', '0005_activity'),
+    ]
+
+    # 0004 加入的 hot_score 默认为0，已有动态按当前计数计算一次，否则热度排序中全部排在新动态之后
+    operations = [
+        migrations.RunPython(backfill_hot_score, migrations.RunPython.noop),
+    ]
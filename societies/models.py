@@ -2,6 +2,7 @@ import uuid
 
 from django.contrib.postgres.fields import ArrayField
 from django.db import models
+from django.utils import timezone
 
 from user.models import User
 
@@ -46,13 +47,57 @@ class Dynamic(models.Model):
     create_time = models.DateTimeField(auto_now_add=True)
     update_time = models.DateTimeField(auto_now=True)
     view_count = models.IntegerField(blank=True, null=True, default=0)
+    hot_score = models.FloatField(default=0, verbose_name="热度分（middleware.hot_score 计算）")
 
     class Meta:
         db_table = 't_social_dynamic'
         ordering = ['-create_time']
+        indexes = [
+            # 游标分页 (create_time, id)
+            models.Index(fields=['-create_time', '-id'], name='t_dynamic_ctime_id_idx'),
+            # ordering=hot 热度排序
+            models.Index(fields=['-hot_score', '-id'], name='t_dynamic_hot_id_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.prefixed_id:
             self.prefixed_id = f"d_{uuid.uuid4().hex}"
         super().save(*args, **kwargs)
 
+
+
+class Activity(models.Model):
+    """
+    互动消息流（只追加）：其他用户点赞、评论当前用户的动态时写入一条（societies.signals）
+    冗余保存操作者和片段，互动消息接口按 (recipient_id, create_time, id) 游标分页读取
+    取消点赞、删除评论或动态时删除对应记录
+    """
+    VERB_CHOICES = (
+        ('like', '点赞'),
+        ('comment', '评论'),
+    )
+
+    recipient_id = models.IntegerField(verbose_name="接收者（动态作者）ID")
+    actor_id = models.IntegerField(verbose_name="操作者ID")
+    actor_nickname = models.CharField(max_length=255, blank=True, null=True)
+    actor_avatar = models.CharField(max_length=255, blank=True, null=True)
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    target_type = models.CharField(max_length=20, default='dynamic')
+    target_id = models.IntegerField()
+    target_title = models.CharField(max_length=255, blank=True, null=True)
+    source_id = models.IntegerField(verbose_name="点赞或评论ID")
+    snippet = models.TextField(blank=True, null=True, verbose_name="片段（评论内容或动态正文前100字）")
+    create_time = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 't_social_activity'
+        ordering = ['-create_time', '-id']
+        indexes = [
+            # 互动消息游标分页 (recipient_id, create_time, id)
+            models.Index(fields=['recipient_id', '-create_time', '-id'], name='t_activity_recipient_idx'),
+            # 删除动态时清理
+            models.Index(fields=['target_type', 'target_id'], name='t_activity_target_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['verb', 'source_id'], name='t_activity_verb_source_uniq'),
+        ]
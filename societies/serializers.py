@@ -35,8 +35,8 @@ class SocialDynamicWithFollowSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             # 从上下文中获取当前用户关注的用户ID列表
-            followed_user_ids = self.context.get('followed_user_ids', [])
-            return obj.user.id in followed_user_ids
+            followed_user_ids = self.context.get('followed_user_ids', set())
+            return obj.user_id in followed_user_ids
         return False
 
     def get_is_liked(self, obj):
@@ -45,7 +45,7 @@ class SocialDynamicWithFollowSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            liked_dynamic_ids = self.context.get('liked_dynamic_ids', [])
+            liked_dynamic_ids = self.context.get('liked_dynamic_ids', set())
             return obj.id in liked_dynamic_ids
         return False
 
@@ -55,6 +55,6 @@ class SocialDynamicWithFollowSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            favourite_dynamic_ids = self.context.get('favourite_dynamic_ids', [])
+            favourite_dynamic_ids = self.context.get('favourite_dynamic_ids', set())
             return obj.id in favourite_dynamic_ids
         return False
@@ -0,0 +1,66 @@
+"""
+互动消息流（Activity）的写入和清理
+点赞、评论写入时追加一条记录；取消点赞、删除评论或动态时删除对应记录
+queryset.update / bulk_create 不会触发信号
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from comments.models import Comment
+from likes.models import Like
+from societies.models import Activity, Dynamic
+
+
+def record_activity(verb, source, dynamic_id, snippet_from_dynamic=False):
+    """为点赞或评论追加互动记录，自己对自己动态的互动不记录"""
+    dynamic = Dynamic.objects.filter(pk=dynamic_id).values('user_id', 'title', 'content').first()
+    if dynamic is None or not source.user_id or source.user_id == dynamic['user_id']:
+        return
+    snippet = dynamic['content'] if snippet_from_dynamic else source.content
+    # 重复点赞由唯一约束 (verb, source_id) 去重，新记录的 post_save 会累加接收者的未读数
+    Activity.objects.get_or_create(verb=verb, source_id=source.pk, defaults=dict(
+        recipient_id=dynamic['user_id'],
+        actor_id=source.user_id,
+        actor_nickname=source.user_nickname,
+        actor_avatar=source.user_avatar,
+        target_type='dynamic',
+        target_id=dynamic_id,
+        target_title=getattr(source, 'target_title', None) or dynamic['title'],
+        snippet=(snippet or '')[:100],
+        # 使用写入时间：取消后重新点赞的 Like 保留原来的 create_time，新记录需要出现在消息流顶部
+        create_time=timezone.now(),
+    ))
+
+
+@receiver(post_save, sender=Like)
+def like_saved(sender, instance, raw=False, **kwargs):
+    if raw or instance.type != 'dynamic':
+        return
+    if instance.status == 'active':
+        record_activity('like', instance, instance.target_id, snippet_from_dynamic=True)
+    else:
+        Activity.objects.filter(verb='like', source_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw and instance.type == 'dynamic' and instance.target_id:
+        record_activity('comment', instance, instance.target_id)
+
+
+@receiver(post_delete, sender=Like)
+def like_deleted(sender, instance, **kwargs):
+    if instance.type == 'dynamic':
+        Activity.objects.filter(verb='like', source_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.type == 'dynamic':
+        Activity.objects.filter(verb='comment', source_id=instance.pk).delete()
+
+
+@receiver(post_delete, sender=Dynamic)
+def dynamic_deleted(sender, instance, **kwargs):
+    Activity.objects.filter(target_type='dynamic', target_id=instance.pk).delete()
@@ -3,12 +3,16 @@ from drf_spectacular.utils import extend_schema_view, extend_schema, OpenApiPara
 from rest_framework import filters
 from rest_framework.decorators import action
 
-from comments.models import Comment
-from follows.models import Follow
-from likes.models import Like
+from follows.feed import followed_queryset, paginate_followed
 from middleware.base_views import BaseViewSet
+from middleware.counter_buffer import counter_buffer
+from middleware.hot_score import HotOrderingFilter
+from middleware.view_tracker import track_view
 from middleware.utils import CustomPagination, ApiResponse
-from societies.models import Dynamic
+from middleware.viewer_state import resolve_viewer_state, build_viewer_context
+from notifications import inbox
+from search.filters import FullTextSearchFilter
+from societies.models import Activity, Dynamic
 from societies.serializers import SocialDynamicSerializer, SocialDynamicWithFollowSerializer
 
 @extend_schema(tags=["社区动态"])
@@ -16,7 +20,9 @@ from societies.serializers import SocialDynamicSerializer, SocialDynamicWithFoll
     list=extend_schema(summary='获取动态视频列表，关注点赞收藏',
         parameters=[OpenApiParameter(name='type', description='视频分类 长短视频'),
         OpenApiParameter(name='tabs', description='暂时不用'),
-        OpenApiParameter(name='ordering',description='排序字段，例如: -like_count(最热), -create_time(最新)'),]
+        OpenApiParameter(name='ordering',description='排序字段，例如: hot(最热，按热度分), -like_count(点赞最多), -create_time(最新)'),
+        OpenApiParameter(name='cursor', description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor', required=False),
+        OpenApiParameter(name='total', description='总数计算方式: exact(精确，默认), estimate(估算/缓存), none(不返回总数)', required=False),]
     ),
     retrieve=extend_schema(summary='获取动态视频详情'),
     create=extend_schema(summary='创建动态视频'),
@@ -28,48 +34,18 @@ class DynamicViewSet(BaseViewSet):
     queryset = Dynamic.objects.all()
     serializer_class = SocialDynamicSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, HotOrderingFilter]
     filterset_fields = ['type', 'tabs', 'user']
 
-    ordering_fields = ['create_time', 'like_count', 'comment_count', 'favorite_count']
+    ordering_fields = ['create_time', 'like_count', 'comment_count', 'favorite_count', 'hot_score']
     ordering = ['-create_time']
-    def get_user_context_data(self, request):
-        """获取当前用户的相关数据"""
-        context_data = {
-            'request': request,
-            'followed_user_ids': [],
-            'liked_dynamic_ids': [],
-            'favourite_dynamic_ids': []
-        }
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
 
-        if request.user.is_authenticated:
-            # 获取关注数据 - 当前用户关注的用户ID列表
-            from follows.models import Follow
-            followed_users = Follow.objects.filter(
-                follower_id=request.user.id,
-                status='active'
-            ).values_list('followee_id', flat=True)
-            context_data['followed_user_ids'] = list(followed_users)
-
-            # 获取点赞数据 - 当前用户点赞的动态ID列表
-            from likes.models import Like
-            liked_dynamics = Like.objects.filter(
-                user_id=request.user.id,
-                type='dynamic',
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_dynamic_ids'] = list(liked_dynamics)
-
-            # 获取收藏数据 - 当前用户收藏的动态ID列表
-            from favourites.models import Favorite
-            favourite_dynamics = Favorite.objects.filter(
-                user_id=request.user.id,
-                target_id__isnull=False,
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['favourite_dynamic_ids'] = list(favourite_dynamics)
-
-        return context_data
+    def get_user_context_data(self, request, instances=None):
+        """获取当前用户对当前页动态的相关数据（关注、点赞、收藏）"""
+        return build_viewer_context(request, 'dynamic', instances, author_field='user_id',
+                                    relations=('follow', 'like', 'favourite'))
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -88,25 +64,31 @@ class DynamicViewSet(BaseViewSet):
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
 
-        # 获取当前用户的相关数据
-        context_data = self.get_user_context_data(request)
-
         # 获取分页器实例
         page = self.paginate_queryset(queryset)
         if page is not None:
+            # 叠加尚未写入数据库的浏览数、分享数
+            counter_buffer.apply_pending(page)
+            # 获取当前用户对当前页动态的相关数据
+            context_data = self.get_user_context_data(request, page)
             serializer = SocialDynamicWithFollowSerializer(page, many=True, context=context_data)
             # 使用自定义分页响应
             return self.get_paginated_response(serializer.data)
 
         # 如果没有分页，返回普通响应
+        queryset = list(queryset)
+        context_data = self.get_user_context_data(request, queryset)
         serializer = SocialDynamicWithFollowSerializer(queryset, many=True, context=context_data)
         return ApiResponse(serializer.data)
 
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
+        # 同一观看者当天只计一次浏览，浏览数先进入写后缓冲，定期批量写入
+        track_view(request, Dynamic, instance.pk)
+        counter_buffer.apply_pending(instance)
 
         # 获取当前用户的相关数据
-        context_data = self.get_user_context_data(request)
+        context_data = self.get_user_context_data(request, [instance])
 
         # 使用带状态的序列化器
         serializer = SocialDynamicWithFollowSerializer(instance, context=context_data)
@@ -132,16 +114,17 @@ class DynamicViewSet(BaseViewSet):
         if not dynamic_id:
             return ApiResponse(code=400, message="缺少动态ID参数")
 
-        try:
-            dynamic = Dynamic.objects.get(id=dynamic_id)
-            dynamic.share_count = dynamic.share_count + 1
-            dynamic.save(update_fields=['share_count'])
-            return ApiResponse(
-                data={'share_count': dynamic.share_count},
-                message="分享成功"
-            )
-        except Dynamic.DoesNotExist:
+        row = Dynamic.objects.filter(id=dynamic_id).values_list('id', 'share_count').first()
+        if row is None:
             return ApiResponse(code=400, message="动态不存在")
+        # 分享数先进入写后缓冲，返回值叠加尚未写入的增量，保证单调递增
+        dynamic_id, share_count = row
+        counter_buffer.add(Dynamic, dynamic_id, 'share_count')
+        share_count = (share_count or 0) + counter_buffer.pending(Dynamic, dynamic_id, 'share_count')
+        return ApiResponse(
+            data={'share_count': share_count},
+            message="分享成功"
+        )
 
 @extend_schema(tags=["社区动态"])
 @extend_schema_view(
@@ -155,49 +138,18 @@ class FollowedDynamicViewSet(BaseViewSet):
     queryset = Dynamic.objects.all()
     serializer_class = SocialDynamicSerializer
     pagination_class = CustomPagination
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter]
     filterset_fields = ['type', 'tabs']
     search_fields = ['title', 'content']
     ordering_fields = ['create_time', 'update_time', 'like_count', 'comment_count']
     ordering = ['-create_time']
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
 
-    def get_user_context_data(self, request):
-        """获取当前用户的相关数据"""
-        context_data = {
-            'request': request,
-            'followed_user_ids': [],
-            'liked_dynamic_ids': [],
-            'favourite_dynamic_ids': []
-        }
-
-        if request.user.is_authenticated:
-            # 获取关注数据 - 当前用户关注的用户ID列表
-            from follows.models import Follow
-            followed_users = Follow.objects.filter(
-                follower_id=request.user.id,
-                status='active'
-            ).values_list('followee_id', flat=True)
-            context_data['followed_user_ids'] = list(followed_users)
-
-            # 获取点赞数据 - 当前用户点赞的动态ID列表
-            from likes.models import Like
-            liked_dynamics = Like.objects.filter(
-                user_id=request.user.id,
-                type='dynamic',
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_dynamic_ids'] = list(liked_dynamics)
-
-            # 获取收藏数据 - 当前用户收藏的动态ID列表
-            from favourites.models import Favorite
-            favourite_dynamics = Favorite.objects.filter(
-                user_id=request.user.id,
-                target_id__isnull=False,
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['favourite_dynamic_ids'] = list(favourite_dynamics)
-
-        return context_data
+    def get_user_context_data(self, request, instances=None):
+        """获取当前用户对当前页动态的相关数据（关注、点赞、收藏）"""
+        return build_viewer_context(request, 'dynamic', instances, author_field='user_id',
+                                    relations=('follow', 'like', 'favourite'))
 
     def list(self, request, *args, **kwargs):
         # 检查用户是否已认证
@@ -207,200 +159,89 @@ class FollowedDynamicViewSet(BaseViewSet):
         # 获取当前用户ID
         current_user = request.user
 
-        # 获取该用户关注的用户ID列表
-        followed_users = Follow.objects.filter(
-            follower_id=current_user.id,
-            status='active'
-        ).values_list('followee_id', flat=True)
+        # 默认排序的游标分页：收件箱与粉丝数很多的作者的最近动态合并
+        page = paginate_followed(self, request, 'dynamic')
+        if page is not None:
+            context_data = self.get_user_context_data(request, page)
+            serializer = SocialDynamicWithFollowSerializer(page, many=True, context=context_data)
+            return self.get_paginated_response(serializer.data)
 
-        # 获取关注用户发布的动态
-        queryset = Dynamic.objects.filter(user__in=followed_users)
+        # 关注的人发布的动态：从关注流收件箱读取，收件箱关闭时按关注的作者查询
+        queryset = followed_queryset(current_user.id, 'dynamic')
         queryset = self.filter_queryset(queryset)
 
-        # 获取当前登录用户的相关数据（用于显示是否关注、点赞、收藏等状态）
-        context_data = self.get_user_context_data(request)
-
         # 获取分页器实例
         page = self.paginate_queryset(queryset)
         if page is not None:
+            # 获取当前登录用户对当前页动态的相关数据（用于显示是否关注、点赞、收藏等状态）
+            context_data = self.get_user_context_data(request, page)
             serializer = SocialDynamicWithFollowSerializer(page, many=True, context=context_data)
             # 使用自定义分页响应
             return self.get_paginated_response(serializer.data)
 
         # 如果没有分页，返回普通响应
+        queryset = list(queryset)
+        context_data = self.get_user_context_data(request, queryset)
         serializer = SocialDynamicWithFollowSerializer(queryset, many=True, context=context_data)
         return ApiResponse(serializer.data)
 
 @extend_schema(tags=["社区动态"])
 @extend_schema_view(
-    list=extend_schema(summary='获取互动消息', tags=['社区动态'])
+    list=extend_schema(summary='获取互动消息', tags=['社区动态'],
+        parameters=[OpenApiParameter(name='cursor', description='游标分页：首页传空值，之后传返回的 next_cursor/prev_cursor', required=False),
+        OpenApiParameter(name='total', description='总数计算方式: exact(精确，默认), estimate(估算/缓存), none(不返回总数)', required=False),]
+    )
 )
 class InteractionMessageViewSet(BaseViewSet):
     """
     互动消息ViewSet
     获取用户的点赞 和 评论互动消息
+    从互动消息流 Activity 按 (create_time, id) 倒序读取，每页的动态用一次 id__in 查询取出
     """
     pagination_class = CustomPagination
-    def get_user_context_data(self, request):
-        """获取当前用户的相关数据"""
-        context_data = {
-            'request': request,
-            'followed_user_ids': [],
-            'liked_dynamic_ids': [],
-            'favourite_dynamic_ids': []
-        }
-
-        if request.user.is_authenticated:
-            # 获取关注数据 - 当前用户关注的用户ID列表
-            from follows.models import Follow
-            followed_users = Follow.objects.filter(
-                follower_id=request.user.id,
-                status='active'
-            ).values_list('followee_id', flat=True)
-            context_data['followed_user_ids'] = list(followed_users)
-
-            # 获取点赞数据 - 当前用户点赞的动态ID列表
-            from likes.models import Like
-            liked_dynamics = Like.objects.filter(
-                user_id=request.user.id,
-                type='dynamic',
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['liked_dynamic_ids'] = list(liked_dynamics)
-
-            # 获取收藏数据 - 当前用户收藏的动态ID列表
-            from favourites.models import Favorite
-            favourite_dynamics = Favorite.objects.filter(
-                user_id=request.user.id,
-                target_id__isnull=False,
-                status='active'
-            ).values_list('target_id', flat=True)
-            context_data['favourite_dynamic_ids'] = list(favourite_dynamics)
-        return context_data
+    # 支持 ?cursor= 游标分页
+    cursor_pagination = True
 
     def list(self, request, *args, **kwargs):
         # 检查用户是否已认证
         if not request.user.is_authenticated:
             return ApiResponse(code=401, message="用户未认证")
 
-        # 获取当前用户ID
-        current_user = request.user
-
-        # 获取点赞消息 - 其他用户点赞当前用户发布的内容
-        like_messages = Like.objects.filter(
-            target_author_id=current_user.id,
-            type='dynamic',
-            status='active'
-        ).exclude(user_id=current_user.id)
-
-        # 获取评论消息 - 其他用户评论当前用户发布的内容
-        # 首先获取当前用户发布的动态ID
-        user_dynamics = Dynamic.objects.filter(user=current_user).values_list('id', flat=True)  # 修改为'user=current_user'
-        comment_messages = Comment.objects.filter(
-            target_id__in=user_dynamics
-        ).exclude(user_id=current_user.id)
-
-        # 构建统一的消息格式
-        messages = []
-
-        # 处理点赞消息
-        for like in like_messages:
-            try:
-                dynamic = Dynamic.objects.get(id=like.target_id)
-                is_liked = like.status == 'active',
-                messages.append({
-                    'id': like.id,
-                    'type': 'like',
-                    'user_id': like.user_id,
-                    'user_nickname': like.user_nickname,
-                    'user_avatar': like.user_avatar,
-                    'target_id': like.target_id,
-                    'is_liked': is_liked,
-                    'target_title': like.target_title or dynamic.title,
-                    'target_content': getattr(dynamic, 'content', '')[:100] + '...' if getattr(dynamic, 'content','') else '',
-                    'create_time': like.create_time,
-                    'dynamic': SocialDynamicSerializer(dynamic).data
-                })
-            except Dynamic.DoesNotExist:
-                continue
-
-        # 处理评论消息
-        for comment in comment_messages:
-            try:
-                dynamic = Dynamic.objects.get(id=comment.target_id)
-                # 检查当前登录用户是否对这个动态点过赞
-                is_liked = False
-                if request.user.is_authenticated:
-                    try:
-                        # from likes.models import Like
-                        like = Like.objects.get(
-                            type='dynamic',
-                            target_id=comment.target_id,
-                            user_id=request.user.id
-                        )
-                        is_liked = like.status == 'active'
-                    except Like.DoesNotExist:
-                        pass
-                messages.append({
-                    'id': comment.id,
-                    'type': 'comment',
-                    'user_id': comment.user_id,
-                    'user_nickname': comment.user_nickname,
-                    'user_avatar': comment.user_avatar,
-                    'target_id': comment.target_id,
-                    'target_title': dynamic.title,
-                    'target_content': comment.content[:100] + '...' if comment.content else '',
-                    'is_liked': is_liked,
-                    'create_time': comment.create_time,
-                    'dynamic': SocialDynamicSerializer(dynamic).data
-                })
-            except Dynamic.DoesNotExist:
-                continue
-
-        # 按创建时间排序
-        messages.sort(key=lambda x: x['create_time'], reverse=True)
-        # 获取当前登录用户的相关数据（用于显示是否关注、点赞、收藏等状态）
-        context_data = self.get_user_context_data(request)
-        # 应用分页（将列表转换为可分页的对象）
-        from django.core.paginator import Paginator
-        from rest_framework.request import Request
-
-        # 获取分页参数
-        page_size = int(request.query_params.get('pageSize', 20))
-        current_page = int(request.query_params.get('currentPage', 1))
+        # 其他用户点赞、评论当前用户发布的动态（写入时已排除自己的互动）
+        queryset = Activity.objects.filter(recipient_id=request.user.id)
+        page = self.paginate_queryset(queryset)
+        last_read_id, _ = inbox.get_read_state(request.user.id, inbox.CATEGORY_INTERACTION)
 
-        # 手动分页
-        paginator = Paginator(messages, page_size)
-        page_obj = paginator.get_page(current_page)
+        target_ids = {activity.target_id for activity in page}
+        dynamics = Dynamic.objects.select_related('user').in_bulk(target_ids)
+        # 当前登录用户是否对被评论的动态点过赞，只查询当前页评论涉及的动态
+        liked_dynamic_ids = resolve_viewer_state(
+            request, 'dynamic', [activity.target_id for activity in page if activity.verb == 'comment'],
+            relations=('like',)
+        )['liked_dynamic_ids']
 
-        # 序列化分页数据
         result_data = []
-        for msg in page_obj.object_list:
+        for activity in page:
+            dynamic = dynamics.get(activity.target_id)
+            if dynamic is None:
+                continue
             result_data.append({
-                'id': msg['id'],
-                'type': msg['type'],
+                'id': activity.source_id,
+                'type': activity.verb,
                 'user': {
-                    'id': msg['user_id'],
-                    'nickname': msg['user_nickname'],
-                    'avatar': msg['user_avatar'],
+                    'id': activity.actor_id,
+                    'nickname': activity.actor_nickname,
+                    'avatar': activity.actor_avatar,
                 },
                 'target': {
-                    'id': msg['target_id'],
-                    'title': msg['target_title'],
-                    'content': msg['target_content'],
+                    'id': activity.target_id,
+                    'title': activity.target_title or dynamic.title,
+                    'content': activity.snippet + '...' if activity.snippet else '',
                 },
-                'is_liked': msg['is_liked'],
-                'dynamic': msg['dynamic'],
-                'create_time': msg['create_time'].strftime('%Y-%m-%d %H:%M:%S'),
+                # 点赞消息本身就是有效的点赞；评论消息显示当前用户是否点赞过该动态
+                'is_liked': activity.verb == 'like' or activity.target_id in liked_dynamic_ids,
+                'is_read': activity.id <= last_read_id,
+                'dynamic': SocialDynamicSerializer(dynamic).data,
+                'create_time': activity.create_time.strftime('%Y-%m-%d %H:%M:%S'),
             })
-
-        # 返回分页响应
-        return ApiResponse({
-            'pagination': {
-                'page': page_obj.number,
-                'page_size': page_size,
-                'total': paginator.count,
-                'total_pages': paginator.num_pages
-            },
-            'results': result_data
-        })
\ No newline at end of file
+        return self.get_paginated_response(result_data)
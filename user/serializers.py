@@ -51,6 +51,9 @@ class UserSerializer(serializers.ModelSerializer):
         """
         request = self.context.get('request')
         if request and request.user.is_authenticated:
+            # 列表/详情接口会在上下文中预先解析当前页用户的关注状态
+            if 'followed_user_ids' in self.context:
+                return obj.id in self.context['followed_user_ids']
             # 检查当前登录用户(request.user)是否关注了该用户(obj)
             return Follow.objects.filter(
                 follower_id=request.user.id,
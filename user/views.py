@@ -3,6 +3,7 @@ from drf_spectacular.utils import extend_schema, extend_schema_view, OpenApiPara
 from rest_framework import status, generics, permissions, viewsets
 from rest_framework.authtoken.views import ObtainAuthToken
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.utils import timezone
@@ -14,6 +15,7 @@ from middleware.permissions import IsAdminRole, IsCreator, IsAdminOrCreator
 from .serializers import UserRegisterSerializer, UserLoginSerializer, UserSerializer, GroupSerializer
 from rest_framework.authtoken.models import Token
 from middleware.utils import ApiResponse, CustomPagination
+from middleware.viewer_state import resolve_viewer_state
 
 User = get_user_model()
 
@@ -138,19 +140,42 @@ class UserViewSet(BaseViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    def get_user_context_data(self, request, instances=None):
+        """获取当前用户对当前页用户的关注状态"""
+        instances = list(instances or [])
+        context_data = self.get_serializer_context()
+        context_data.update(resolve_viewer_state(
+            request, 'user', author_ids=[instance.id for instance in instances], relations=('follow',)
+        ))
+        return context_data
+
     def list(self, request, *args, **kwargs):
         # 获取过滤后的查询集
         queryset = self.filter_queryset(self.get_queryset())
         # 获取分页器实例
         page = self.paginate_queryset(queryset)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
+            context_data = self.get_user_context_data(request, page)
+            serializer = self.get_serializer(page, many=True, context=context_data)
             # 使用自定义分页响应
             return self.get_paginated_response(serializer.data)
         # 如果没有分页，返回普通响应
-        serializer = self.get_serializer(queryset, many=True)
+        queryset = list(queryset)
+        context_data = self.get_user_context_data(request, queryset)
+        serializer = self.get_serializer(queryset, many=True, context=context_data)
         return ApiResponse(serializer.data)
 
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            instance = self.get_object()
+            context_data = self.get_user_context_data(request, [instance])
+            serializer = self.get_serializer(instance, context=context_data)
+            return ApiResponse(data=serializer.data, message="详情获取成功")
+        except ObjectDoesNotExist:
+            return ApiResponse(code=404, message="User不存在")
+        except Exception as e:
+            return ApiResponse(code=500, message=f"详情获取失败: {str(e)}")
+
 
 # 新增用户组管理视图集
 @extend_schema(tags=["用户组管理"])